@@ -0,0 +1,129 @@
+"""
+Compositing of post images: the previous per-icon bitwise-mask implementation
+against `Compositor`, on synthetic eyecatch photos of increasing size.
+
+Run from `postproduction/`:
+
+    python benchmarks/bench_compositing.py --repeat 20
+"""
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "py"))
+
+from Compositor import Compositor  # noqa: E402
+
+SIZES = [(1080, 1920), (4000, 6000), (6000, 9000)]
+
+
+# --- previous implementation (cv.py before the compositing engine) ---
+
+
+def legacy_reverse_image(im, mask, reverse):
+    if reverse:
+        mask = im | mask
+        im |= mask
+        return 255 - im
+    return im & mask
+
+
+def legacy_crop_circle(im, reverse=False):
+    h = im.shape[0]
+    center = int(h / 2)
+    mask = np.zeros(im.shape, np.uint8)
+    cv2.circle(
+        mask, (center, center), radius=center, color=(255, 255, 255), thickness=-1
+    )
+    return legacy_reverse_image(im, mask, reverse)
+
+
+def legacy_render(image, roi, logo, starrs, alpha=0.3):
+    x, y, size = roi
+    overlay = image.copy()
+    cv2.rectangle(overlay, (x, y), (x + size, y + size), (255, 255, 255), cv2.FILLED)
+    image = cv2.addWeighted(overlay, alpha, image, 1 - alpha, 0)
+    resized = cv2.resize(image[y : y + size, x : x + size], (1080, 1080))
+    resized[-(20 + logo.shape[0]) : -20, 30 : 30 + logo.shape[1]] = logo
+
+    result = resized.copy()
+    for i, starr in enumerate(starrs[::-1]):
+        y_end = -20
+        y_start = y_end - starr.shape[0]
+        x_end = -(40 + 168 * i)
+        x_start = x_end - starr.shape[1]
+        roi_image = result[y_start:y_end, x_start:x_end]
+        cropped_mask = legacy_crop_circle(starr.copy(), reverse=True)
+        masked_roi = cv2.bitwise_and(roi_image, cropped_mask)
+        result[y_start:y_end, x_start:x_end] = cv2.bitwise_or(masked_roi, starr)
+    return result
+
+
+# ---
+
+
+def make_icon(rng, side, circle):
+    """
+    A random BGRA icon with the same alpha as `IconCache.build`.
+    """
+    bgr = rng.integers(0, 256, (side, side, 3), np.uint8)
+    if not circle:
+        return np.dstack([bgr, np.full((side, side), 255, np.uint8)])
+    ys, xs = np.ogrid[:side, :side]
+    distance = np.hypot(ys - (side - 1) / 2, xs - (side - 1) / 2)
+    coverage = np.clip(side / 2 - distance + 0.5, 0, 1)
+    return np.dstack([bgr, (coverage * 255 + 0.5).astype(np.uint8)])
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--starrs", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    side = Compositor.ICON_SIDE
+    logo = make_icon(rng, side, circle=False)
+    starrs = [make_icon(rng, side, circle=True) for _ in range(args.starrs)]
+    # the legacy path wants BGR icons, black outside a hard circle
+    legacy_logo = logo[..., :3].copy()
+    legacy_starrs = [legacy_crop_circle(s[..., :3].copy()) for s in starrs]
+
+    print(
+        f"{'eyecatch': <14}{'legacy ms': >10}{'engine ms': >11}{'speedup': >9}"
+        f"{'mean diff': >11}"
+    )
+    compositor = Compositor()
+    for h, w in SIZES:
+        image = rng.integers(0, 256, (h, w, 3), np.uint8)
+        roi = (w // 4, 0, min(h, w))
+        legacy, expected = timed(
+            lambda: legacy_render(image, roi, legacy_logo, legacy_starrs), args.repeat
+        )
+        x, y, size = roi
+        engine, actual = timed(
+            lambda: compositor.compose(image[y : y + size, x : x + size], logo, starrs),
+            args.repeat,
+        )
+        print(
+            f"{f'{w}x{h}': <14}{legacy * 1000: >10.1f}{engine * 1000: >11.1f}"
+            f"{legacy / engine: >8.1f}x"
+            f"{np.abs(actual.astype(int) - expected).mean(): >11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
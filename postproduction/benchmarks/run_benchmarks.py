@@ -0,0 +1,302 @@
+"""
+Catalog benchmarks on a synthetic catalog of 1k, 10k or 100k episodes: JSON
+reads, the episode catalog and search, the marker table, transcripts, chapter
+tagging and post image compositing. Each benchmark reports its median time and
+the peak memory traced by `tracemalloc`, compared against a stored baseline.
+
+Run from `postproduction/`:
+
+    python benchmarks/run_benchmarks.py --scale 10k --save-baseline
+    python benchmarks/run_benchmarks.py --scale 10k
+
+The synthetic tree is generated once under `cache/bench/<scale>` (see
+`synthetic_catalog.py`). Baselines are machine specific: save one on the
+machine that compares against it. The exit status is 1 when a benchmark is
+slower or uses more memory than the baseline allows.
+"""
+import io
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import statistics
+import tracemalloc
+from contextlib import redirect_stdout
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "py"))
+sys.path.insert(0, HERE)
+
+from IOManager import IOManager  # noqa: E402
+from synthetic_catalog import HOST, GUESTS, episode_list, generate, scale  # noqa: E402
+
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+WORK_DIR = os.path.join("cache", "bench")
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+# a regression has to exceed the tolerance and these absolute floors, so
+# timer noise on millisecond benchmarks is not reported
+MIN_DELTA_SECONDS = 0.005
+MIN_DELTA_KB = 256
+
+
+def forget_instances():
+    """
+    Drop the per-process singletons so a load starts from its files again.
+    """
+    from EpisodeCatalog import EpisodeCatalog
+    from MarkerStore import MarkerStore
+    from IconCache import IconCache
+
+    for cls in (EpisodeCatalog, MarkerStore, IconCache):
+        cls._instances.clear()
+
+
+def remove(pattern):
+    for path in glob.glob(pattern, recursive=True):
+        os.remove(path)
+
+
+class Benchmarks:
+    """
+    The benchmarks of one synthetic catalog, run with `postproduction/` of
+    the synthetic tree as the working directory.
+
+    Every benchmark is a (setup, run) pair: `setup` puts the caches in the
+    state the benchmark measures and is not timed.
+    """
+
+    def __init__(self, episodes, sample):
+        self.episodes = [(t, stem) for t, stem, _ in episode_list(episodes)]
+        self.sample = self.episodes[:sample]
+
+    def all(self) -> dict:
+        return {
+            "io_read_json": (self.warm_catalog, self.read_json),
+            "catalog_cold": (self.cold_catalog, self.load_catalog),
+            "catalog_warm": (self.warm_catalog, self.load_catalog),
+            "search_episodes": (self.warm_catalog, self.search),
+            "markers_cold": (self.cold_markers, self.load_markers),
+            "markers_warm": (self.warm_markers, self.load_markers),
+            "transcript_sync": (self.cold_transcripts, self.sync_transcripts),
+            "transcript_open": (self.warm_transcripts, self.open_transcripts),
+            "tag_episode": (self.warm_markers, self.tag),
+            "compositing": (self.warm_catalog, self.composite),
+        }
+
+    # --- setup ---
+
+    @staticmethod
+    def cold_catalog():
+        forget_instances()
+        remove("cache/episode_catalog.json")
+
+    def warm_catalog(self):
+        forget_instances()
+        self.load_catalog()
+
+    @staticmethod
+    def cold_markers():
+        forget_instances()
+        remove("cache/markers.pkl")
+
+    def warm_markers(self):
+        forget_instances()
+        self.load_markers()
+
+    @staticmethod
+    def cold_transcripts():
+        remove("../transcripts/**/*.seg")
+
+    def warm_transcripts(self):
+        self.sync_transcripts()
+
+    # --- benchmarks ---
+
+    def read_json(self):
+        for episode_type, stem in self.episodes:
+            IOManager.read(f"json/{episode_type}/{stem}.json")
+
+    @staticmethod
+    def load_catalog():
+        from EpisodeCatalog import EpisodeCatalog
+
+        return EpisodeCatalog.load()
+
+    @staticmethod
+    def search():
+        from EpisodeSearcher import EpisodeSearcher
+
+        with redirect_stdout(io.StringIO()):
+            for guest in GUESTS[:10]:
+                EpisodeSearcher.search_episodes(
+                    {"episode-type": "concast", "starrs": [HOST, guest]}
+                )
+
+    @staticmethod
+    def load_markers():
+        from MarkerStore import MarkerStore
+
+        return MarkerStore.load()
+
+    @staticmethod
+    def sync_transcripts():
+        from TranscriptStore import TranscriptStore
+
+        TranscriptStore().sync()
+
+    def open_transcripts(self):
+        from TranscriptStore import TranscriptStore
+
+        store = TranscriptStore()
+        for episode_type, stem in self.episodes:
+            transcript = store.open(episode_type, stem)
+            transcript.segment(len(transcript) - 1)
+
+    def tag(self):
+        from tag_episode import AudioTagger
+
+        with redirect_stdout(io.StringIO()):
+            for episode_type, stem in self.sample:
+                AudioTagger(episode_type, stem).add_tags()
+
+    def composite(self):
+        from cv import ConcastImageEditor
+
+        root = os.path.abspath("..")
+        for episode_type, stem in self.sample:
+            editor = ConcastImageEditor(HOST, root, episode_type, stem)
+            editor.render(HOST, interactive=False)
+
+
+def measure(setup, run, repeat, memory=True) -> dict:
+    """
+    Returns:
+    - {"seconds": median, "min_seconds": fastest, "peak_kb": traced peak or None}.
+    """
+    times = []
+    for _ in range(repeat):
+        setup()
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+    result = {"seconds": statistics.median(times), "min_seconds": min(times)}
+
+    result["peak_kb"] = None
+    if memory:
+        # a separate pass: tracing slows the run down too much to time it
+        setup()
+        tracemalloc.start()
+        try:
+            run()
+            result["peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def compare(result, baseline, tolerance) -> list:
+    """
+    Returns:
+    - The ways `result` regressed against `baseline`, as messages.
+    """
+    if not baseline:
+        return []
+    regressions = []
+    seconds, base_seconds = result["seconds"], baseline["seconds"]
+    if (
+        seconds > base_seconds * (1 + tolerance)
+        and seconds - base_seconds > MIN_DELTA_SECONDS
+    ):
+        regressions.append(f"time {seconds / base_seconds:.2f}x")
+    peak, base_peak = result["peak_kb"], baseline.get("peak_kb")
+    if (
+        peak is not None
+        and base_peak is not None
+        and peak > base_peak * (1 + tolerance)
+        and peak - base_peak > MIN_DELTA_KB
+    ):
+        regressions.append(f"memory {peak / max(base_peak, 1):.2f}x")
+    return regressions
+
+
+def read_baseline(path) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", default="1k", help="1k, 10k, 100k or a number")
+    parser.add_argument("--sample", type=int, default=20, help="episodes to tag/draw")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="benchmark names to run")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc")
+    parser.add_argument("--root", help=f"synthetic tree, default {WORK_DIR}/<scale>")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%"
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store these results instead"
+    )
+    args = parser.parse_args()
+
+    episodes = SCALES.get(args.scale) or scale(args.scale)
+    root = os.path.abspath(args.root or os.path.join(WORK_DIR, args.scale))
+    baseline_path = os.path.abspath(args.baseline)
+    started = time.perf_counter()
+    if generate(root, episodes, args.sample):
+        print(f"Generated {episodes} episodes in {time.perf_counter() - started:.1f}s")
+
+    cwd = os.getcwd()
+    os.chdir(os.path.join(root, "postproduction"))
+    try:
+        benchmarks = Benchmarks(episodes, args.sample).all()
+        names = args.only or list(benchmarks)
+        unknown = set(names) - benchmarks.keys()
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+        baselines = read_baseline(baseline_path)
+        stored = baselines.get(args.scale, {})
+        results, regressed = {}, {}
+        print(
+            f"{'benchmark': <18}{'median ms': >11}{'min ms': >10}{'peak KB': >10}"
+            f"{'baseline ms': >13}  regression"
+        )
+        for name in names:
+            result = measure(*benchmarks[name], args.repeat, not args.no_memory)
+            results[name] = result
+            base = stored.get(name)
+            regressions = [] if args.save_baseline else compare(
+                result, base, args.tolerance
+            )
+            if regressions:
+                regressed[name] = regressions
+            peak = "-" if result["peak_kb"] is None else result["peak_kb"]
+            base_ms = f"{base['seconds'] * 1000:.1f}" if base else "-"
+            print(
+                f"{name: <18}{result['seconds'] * 1000: >11.1f}"
+                f"{result['min_seconds'] * 1000: >10.1f}{peak: >10}{base_ms: >13}"
+                f"  {', '.join(regressions)}"
+            )
+    finally:
+        os.chdir(cwd)
+
+    if args.save_baseline:
+        baselines[args.scale] = dict(stored, **results)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=4)
+            f.write("\n")
+        print(f"Saved the {args.scale} baseline to {baseline_path}")
+    elif regressed:
+        print(f"{len(regressed)} regressions against {baseline_path}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Synthetic catalog for benchmarks: episode JSONs, Zencastr marker CSVs,
+transcripts, starring photos, eyecatches and short MP3 stubs, laid out like
+the real repository under `<root>/`:
+
+    <root>/postproduction/{json,markers}/<type>/<n>.*
+    <root>/transcripts/<type>/<n>.csv
+    <root>/episodes/<type>/<n>.mp3        (first `--sample` episodes)
+    <root>/photos/eyecatch/<type>/<n>.jpg (first `--sample` episodes)
+    <root>/photos/starrings/<name>.jpg, <root>/concast.png
+
+Run from `postproduction/`:
+
+    python benchmarks/synthetic_catalog.py cache/bench/10k --episodes 10000
+
+The content is deterministic for a given seed, and a tree that was already
+generated with the same settings is left as it is.
+"""
+import os
+import json
+import random
+import shutil
+import argparse
+
+import cv2
+import numpy as np
+
+VERSION = 1
+STAMP = ".synthetic.json"
+HOST = "Gota"
+GUESTS = [f"Guest{i:02d}" for i in range(60)]
+WORDS = (
+    "サッカー 野球 ラグビー 旅行 映画 音楽 仕事 転職 留学 料理 ポーカー 筋トレ "
+    "サウナ 読書 ゲーム 漫画 お悩み相談 おたより 振り返り 予想 football data "
+    "podcast strategy transfer derby tactics training Paris Tokyo Berlin "
+    "history science startup coffee ramen marathon"
+).split()
+SEGMENTS = 20
+MARKERS = 8
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz frame header; 417-byte frames of silence
+MP3_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+MP3_FRAMES = 200
+
+
+def scale(value: str) -> int:
+    """
+    `1k`, `10k`, `100k` or a plain number.
+    """
+    value = value.lower()
+    return int(float(value[:-1]) * 1000) if value.endswith("k") else int(value)
+
+
+def episode_list(n: int) -> list:
+    """
+    (type, file stem, Number): nine concast episodes for each football one.
+    """
+    episodes = []
+    for i in range(1, n + 1):
+        if i % 10 == 0:
+            number = str(i // 10)
+            episodes.append(("football", number, f"football-{number}"))
+        else:
+            episodes.append(("concast", str(i), str(i)))
+    return episodes
+
+
+def timecode(ms: int) -> str:
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    seconds, ms = divmod(ms, 1000)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}.{ms:03d}"
+    return f"{minutes}:{seconds:02d}.{ms:03d}"
+
+
+def phrase(rng, words=3) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def write_text(path, text, encoding="utf-8", newline=None):
+    with open(path, "w", encoding=encoding, newline=newline) as f:
+        f.write(text)
+
+
+def write_image(path, image):
+    ok, encoded = cv2.imencode(os.path.splitext(path)[1], image)
+    if not ok:
+        raise ValueError(f"Could not encode {path}")
+    with open(path, "wb") as f:
+        f.write(encoded.tobytes())
+
+
+def make_photo(rng, h, w):
+    """
+    A smooth gradient with noise, so JPEG sizes and face/energy crops are
+    closer to a photo than flat colour or pure noise would be.
+    """
+    ys, xs = np.mgrid[0:h, 0:w]
+    base = np.dstack(
+        [
+            (xs * 255 / max(w - 1, 1)),
+            (ys * 255 / max(h - 1, 1)),
+            np.full((h, w), rng.randrange(256)),
+        ]
+    )
+    noise = np.random.default_rng(rng.randrange(1 << 30)).normal(0, 12, (h, w, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def episode_json(rng, number, guests, roi=None) -> dict:
+    return {
+        "Number": number,
+        "Genre": "con",
+        "GenreNumber": "n",
+        "Title": phrase(rng, 4),
+        "Starr": {HOST: "Gota Shirato", **{guest: guest for guest in guests}},
+        "Topics": [phrase(rng, 2) for _ in range(rng.randint(3, 8))],
+        "References": {
+            phrase(rng, 3): f"https://example.com/{number}/{i}"
+            for i in range(rng.randint(0, 6))
+        },
+        "Memo": "・".join(phrase(rng, 2) for _ in range(5)),
+        "ROI": roi,
+        "Edited": True,
+    }
+
+
+def markers_csv(rng) -> str:
+    # Zencastr export: BOM, tab separated, CRLF, newest cue first
+    starts = sorted(rng.sample(range(60_000, 3_600_000), MARKERS - 1)) + [0]
+    rows = ["Name\tStart\tDuration\tTime Format\tType\tDescription"]
+    for start in sorted(starts, reverse=True):
+        rows.append(f"{phrase(rng, 2)}\t{timecode(start)}\t0:00.000\tdecimal\tCue\t")
+    return "\r\n".join(rows) + "\r\n"
+
+
+def transcript_csv(rng) -> str:
+    rows, start = ["id,start,end,text"], 0.0
+    for i in range(SEGMENTS):
+        end = start + rng.uniform(2, 12)
+        rows.append(f"{i},{start:.1f},{end:.1f},{phrase(rng, 6)}")
+        start = end + rng.uniform(0, 1)
+    return "\n".join(rows) + "\n"
+
+
+def generate(root: str, episodes: int, sample: int = 50, seed: int = 0) -> bool:
+    """
+    Write the synthetic catalog to `root`, unless it is already there.
+
+    Returns:
+    - True if the tree was (re)generated.
+    """
+    settings = {
+        "version": VERSION,
+        "episodes": episodes,
+        "sample": sample,
+        "seed": seed,
+    }
+    stamp = os.path.join(root, STAMP)
+    if os.path.exists(stamp):
+        with open(stamp, "r", encoding="utf-8") as f:
+            if json.load(f) == settings:
+                return False
+        shutil.rmtree(root)
+
+    rng = random.Random(seed)
+    post = os.path.join(root, "postproduction")
+    for folder in ["json", "markers", "sns", os.path.join("cache", "icons")]:
+        os.makedirs(os.path.join(post, folder), exist_ok=True)
+    template = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "json")
+    shutil.copy(os.path.join(template, "template.json"), os.path.join(post, "json"))
+
+    starrings = os.path.join(root, "photos", "starrings")
+    os.makedirs(starrings, exist_ok=True)
+    for name in GUESTS + [HOST, f"{HOST}-1", f"{HOST}-2"]:
+        write_image(os.path.join(starrings, f"{name}.jpg"), make_photo(rng, 400, 400))
+    write_image(os.path.join(root, "concast.png"), make_photo(rng, 512, 512))
+
+    created = set()
+    for i, (episode_type, stem, number) in enumerate(episode_list(episodes)):
+        if episode_type not in created:
+            for folder in [
+                os.path.join(post, "json", episode_type),
+                os.path.join(post, "markers", episode_type),
+                os.path.join(root, "transcripts", episode_type),
+                os.path.join(root, "episodes", episode_type),
+                os.path.join(root, "photos", "eyecatch", episode_type),
+            ]:
+                os.makedirs(folder, exist_ok=True)
+            created.add(episode_type)
+
+        guests = rng.sample(GUESTS, rng.randint(1, 3))
+        sampled = i < sample
+        roi = [200, 100, 1000] if sampled else None
+        data = episode_json(rng, number, guests, roi)
+        write_text(
+            os.path.join(post, "json", episode_type, f"{stem}.json"),
+            json.dumps(data, indent=4, ensure_ascii=False),
+        )
+        write_text(
+            os.path.join(post, "markers", episode_type, f"{stem}.csv"),
+            markers_csv(rng),
+            encoding="utf-8-sig",
+            newline="",
+        )
+        write_text(
+            os.path.join(root, "transcripts", episode_type, f"{stem}.csv"),
+            transcript_csv(rng),
+        )
+        if sampled:
+            mp3_path = os.path.join(root, "episodes", episode_type, f"{stem}.mp3")
+            with open(mp3_path, "wb") as f:
+                f.write(MP3_FRAME * MP3_FRAMES)
+            write_image(
+                os.path.join(root, "photos", "eyecatch", episode_type, f"{stem}.jpg"),
+                make_photo(rng, 1200, 1600),
+            )
+
+    write_text(stamp, json.dumps(settings))
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic catalog.")
+    parser.add_argument("root", help="output directory, e.g. cache/bench/10k")
+    parser.add_argument("--episodes", type=scale, default=1000, help="e.g. 1k, 100k")
+    parser.add_argument(
+        "--sample", type=int, default=50, help="episodes with an MP3 and eyecatch"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if generate(args.root, args.episodes, args.sample, args.seed):
+        print(f"Generated {args.episodes} episodes in {args.root}")
+    else:
+        print(f"{args.root} is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import json
+import hashlib
+
+from IOManager import IOManager
+
+
+class BuildManifest:
+    """
+    Per-episode record of what each pipeline stage last consumed and produced.
+
+    A stage is rebuilt when it has never run, when the hash of one of its
+    inputs differs from the recorded one, or when one of its outputs is missing.
+    """
+
+    MANIFEST_DIR = "cache/manifest"
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, episode_type: str, episode_number: str, root: str = ".."):
+        self.episode_type = episode_type
+        self.episode_number = episode_number
+        self.root = root
+        self.path = os.path.join(
+            self.MANIFEST_DIR, episode_type, f"{episode_number}.json"
+        )
+        self.stages = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.stages = json.load(f)
+
+    @staticmethod
+    def hash_file(path: str):
+        if not os.path.exists(path):
+            return None
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(BuildManifest.CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_id3_tag(path: str):
+        """
+        Hash only the ID3v2 tag at the head of an MP3, not the audio payload.
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            header = f.read(10)
+            if len(header) < 10 or header[:3] != b"ID3":
+                return hashlib.sha256(b"").hexdigest()
+            # tag size is a 28-bit syncsafe integer
+            size = 0
+            for byte in header[6:10]:
+                size = (size << 7) | (byte & 0x7F)
+            return hashlib.sha256(header + f.read(size)).hexdigest()
+
+    def stage_files(self, stage: str):
+        """
+        Inputs and outputs of `stage` as {name: (path, hasher)} dicts.
+        """
+        t, n = self.episode_type, self.episode_number
+        markers = (f"markers/{t}/{n}.csv", self.hash_file)
+        episode_json = (f"json/{t}/{n}.json", self.hash_file)
+        mp3_tag = (self._from_root(f"episodes/{t}/{n}.mp3"), self.hash_id3_tag)
+
+        if stage == "tag_episode":
+            return {"markers": markers, "mp3-tag": mp3_tag}, {"mp3-tag": mp3_tag}
+        if stage == "create_episode_data":
+            # the JSON is read and merged into, so a hand edit is an input change
+            return {"markers": markers, "json": episode_json}, {"json": episode_json}
+        if stage == "clipboard":
+            return {"json": episode_json}, {}
+        if stage == "post":
+            return {"json": episode_json}, {
+                "sns": (f"sns/{t}/{n}.txt", self.hash_file)
+            }
+        if stage in ("cv", "cv_headless", "export_artwork"):
+            inputs = {
+                "json": episode_json,
+                "eyecatch": self._root_file(f"photos/eyecatch/{t}/{n}.jpg"),
+                "podcast-icon": self._root_file("concast.png"),
+            }
+            for starr in self._starrs(episode_json[0]):
+                for name in [starr, f"{starr}-1", f"{starr}-2"]:
+                    photo = self._root_file(f"photos/starrings/{name}.jpg")
+                    if name == starr or os.path.exists(photo[0]):
+                        inputs[f"starring:{name}"] = photo
+            if stage == "export_artwork":
+                # every target file is checked by export_artwork itself
+                return inputs, {
+                    "stamps": (f"cache/artwork/{t}/{n}.json", self.hash_file)
+                }
+            return inputs, {
+                "image": self._root_file(f"photos/edited-icon/{t}/{n}.jpg")
+            }
+        raise ValueError(f"Unknown stage: {stage}")
+
+    def _from_root(self, path: str) -> str:
+        return os.path.join(self.root, path)
+
+    def _root_file(self, path: str) -> tuple:
+        return self._from_root(path), self.hash_file
+
+    @staticmethod
+    def _starrs(episode_json: str) -> list:
+        if not os.path.exists(episode_json):
+            return []
+        with open(episode_json, "r") as f:
+            return list(json.load(f).get("Starr", {}))
+
+    @staticmethod
+    def _fingerprint(files: dict) -> dict:
+        return {name: hasher(path) for name, (path, hasher) in files.items()}
+
+    def input_hashes(self, stage: str) -> dict:
+        """
+        Current hash of every input of `stage`, by input name.
+        """
+        inputs, _ = self.stage_files(stage)
+        return self._fingerprint(inputs)
+
+    def explain(self, stage: str) -> list:
+        """
+        Reasons why `stage` would rebuild; an empty list means it is up to date.
+        """
+        record = self.stages.get(stage)
+        if record is None:
+            return ["never built"]
+
+        inputs, outputs = self.stage_files(stage)
+        reasons = []
+        current = self._fingerprint(inputs)
+        for name in sorted(set(current) | set(record["inputs"])):
+            if name not in record["inputs"]:
+                reasons.append(f"new input {name}")
+            elif name not in current:
+                reasons.append(f"input {name} dropped")
+            elif current[name] != record["inputs"][name]:
+                reasons.append(f"input {name} changed")
+        for name, (path, _) in outputs.items():
+            if not os.path.exists(path):
+                reasons.append(f"output {name} missing")
+        return reasons
+
+    def record(self, stage: str, inputs: dict) -> None:
+        """
+        Store `inputs` (hashed before the stage ran) and the current output
+        hashes of `stage`, then save the manifest.
+
+        An input that is also an output of the same stage (e.g. the MP3 tag)
+        is recorded as written, so the stage does not invalidate itself.
+        """
+        _, outputs = self.stage_files(stage)
+        produced = self._fingerprint(outputs)
+        self.stages[stage] = {
+            "inputs": {
+                name: produced.get(name, digest) for name, digest in inputs.items()
+            },
+            "outputs": produced,
+        }
+        self.save()
+
+    def run(self, stage: str, process, force: bool = False) -> bool:
+        """
+        Run `process(episode_type, episode_number)` unless `stage` is up to date.
+
+        The inputs are hashed before the stage runs: if the stage rewrites one
+        of them, the next run sees the change instead of trusting the new file.
+
+        Returns:
+        - True if the stage ran.
+        """
+        reasons = self.explain(stage)
+        if not reasons and not force:
+            print(f"{stage}: up to date, skipped.")
+            return False
+        inputs = self.input_hashes(stage)
+        process(self.episode_type, self.episode_number)
+        self.record(stage, inputs)
+        return True
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with IOManager.open_writer(self.path) as f:
+            json.dump(self.stages, f, indent=4, ensure_ascii=False)
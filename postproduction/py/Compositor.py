@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+
+
+class Compositor:
+    """
+    Builds a post image from an eyecatch crop and BGRA icons.
+
+    The crop is resized straight into the output frame, which is the only
+    full-size buffer: the white veil is blended into it in place, and the
+    podcast logo and starr icons are alpha-blended in place into views of
+    their own regions. Icons carry anti-aliased alpha (see `IconCache`).
+
+    Layout constants are for a `BASE_SIZE` square and scale with the output
+    height, so wide frames (e.g. OGP cards) keep the icons at the bottom edge.
+    """
+
+    BASE_SIZE = 1080
+    VEIL_ALPHA = 0.3
+    LOGO_OFFSET = (30, 20)  # from the left / bottom edge
+    STARR_OFFSET = (40, 20)  # from the right / bottom edge
+    STARR_STEP = 168
+    ICON_SIDE = 128
+
+    def __init__(self, size: int = BASE_SIZE, height: int = None):
+        self.width = size
+        self.height = height or size
+        self.scale = self.height / self.BASE_SIZE
+
+    def icon_resolution(self) -> int:
+        """
+        Pixel count to request icons at (`IconCache.get`) for this output size.
+        """
+        return round(self.ICON_SIDE * self.scale) ** 2
+
+    def _scaled(self, value: int) -> int:
+        return round(value * self.scale)
+
+    def layout(self, logo_shape, starr_shapes) -> list:
+        """
+        Top-left (x, y) of the logo, then of each starr icon.
+
+        Starr icons are laid out from the right edge, last starr rightmost.
+        """
+        bottom = self.height - self._scaled(self.LOGO_OFFSET[1])
+        positions = [(self._scaled(self.LOGO_OFFSET[0]), bottom - logo_shape[0])]
+        bottom = self.height - self._scaled(self.STARR_OFFSET[1])
+        step = self._scaled(self.STARR_STEP)
+        for i, shape in enumerate(starr_shapes):
+            index = len(starr_shapes) - 1 - i
+            right = self.width - (self._scaled(self.STARR_OFFSET[0]) + step * index)
+            positions.append((right - shape[1], bottom - shape[0]))
+        return positions
+
+    @staticmethod
+    def blend(frame: np.ndarray, icon: np.ndarray, x: int, y: int) -> None:
+        """
+        Alpha-blend the BGRA `icon` into `frame` at (x, y), in place.
+        """
+        h, w = icon.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, frame.shape[1]), min(y + h, frame.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return
+        region = frame[y0:y1, x0:x1]
+        icon = icon[y0 - y : y1 - y, x0 - x : x1 - x]
+        alpha = icon[..., 3:].astype(np.float32) * (1 / 255)
+        region[:] = icon[..., :3] * alpha + region * (1 - alpha) + 0.5
+
+    def compose(
+        self,
+        crop: np.ndarray,
+        logo: np.ndarray,
+        starrs: list,
+        veil_alpha: float = VEIL_ALPHA,
+    ) -> np.ndarray:
+        """
+        The post image: `crop` (a BGR view with the output's aspect ratio)
+        veiled in white, with the BGRA `logo` bottom-left and the BGRA `starrs`
+        icons bottom-right.
+        """
+        for starr in starrs:
+            if starr.shape[0] != starr.shape[1]:
+                raise ValueError(
+                    f"starr icon has to be square ({starr.shape[0]}!={starr.shape[1]})"
+                )
+
+        frame = cv2.resize(crop, (self.width, self.height))
+        cv2.addWeighted(frame, 1 - veil_alpha, frame, 0, 255 * veil_alpha, dst=frame)
+
+        icons = [logo] + list(starrs)
+        positions = self.layout(logo.shape, [starr.shape for starr in starrs])
+        for icon, (x, y) in zip(icons, positions):
+            self.blend(frame, icon, x, y)
+        return frame
@@ -0,0 +1,44 @@
+import os
+import hashlib
+
+from IOManager import IOManager
+
+
+class DiskCache:
+    """
+    Values stored under `cache/<name>/` by the SHA-256 of a string key.
+
+    Values are read and written through IOManager, so the extension picks the
+    format: bytes for images, dicts for `.json`. Writes are atomic, which lets
+    concurrent workers share a cache without locking.
+    """
+
+    ROOT = "cache"
+
+    def __init__(self, name: str, extension: str, root: str = ROOT):
+        self.directory = os.path.join(root, name)
+        self.extension = extension
+
+    @staticmethod
+    def key(*parts) -> str:
+        """
+        Digest of `parts`, e.g. model, settings and prompt.
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}{self.extension}")
+
+    def get(self, key: str):
+        path = self.path(key)
+        return IOManager.read(path) if os.path.exists(path) else None
+
+    def put(self, key: str, value) -> str:
+        path = self.path(key)
+        IOManager.exist_or_mkdir([os.path.dirname(path)])
+        IOManager.save(value, path)
+        return path
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+
+from IOManager import IOManager
+
+
+class EpisodeCatalog:
+    """
+    Indexed view over `json/<type>/*.json`.
+
+    Only Number/Title/Starr are kept for each episode. The catalog is persisted
+    to a snapshot file and refreshed by re-reading only the files whose
+    mtime or size changed since the snapshot was written.
+    """
+
+    SNAPSHOT_PATH = "cache/episode_catalog.json"
+    SNAPSHOT_VERSION = 1
+    TITLE_TYPES = ["hwn", "football", "weshow"]
+
+    _instances = {}
+
+    def __init__(self, json_dir="json", snapshot_path=SNAPSHOT_PATH):
+        self.json_dir = json_dir
+        self.snapshot_path = snapshot_path
+        self.entries = {}
+        self.by_starr = {}
+        self.by_type = {}
+        self.by_number = {}
+        self.title_matches = {}
+        self.rank = {}
+
+    @classmethod
+    def load(cls, json_dir="json", snapshot_path=SNAPSHOT_PATH):
+        """
+        Return the catalog for `json_dir`, refreshed against the files on disk.
+
+        The instance is kept for the lifetime of the process so repeated
+        lookups only pay for the stat calls of the refresh.
+        """
+        key = (json_dir, snapshot_path)
+        catalog = cls._instances.get(key)
+        if catalog is None:
+            catalog = cls(json_dir, snapshot_path)
+            catalog._read_snapshot()
+            cls._instances[key] = catalog
+        if catalog.refresh():
+            catalog._write_snapshot()
+        return catalog
+
+    @staticmethod
+    def natural_keys(number):
+        return [int(c) if c.isdigit() else c for c in re.split(r"(\d+)", number)]
+
+    def refresh(self) -> bool:
+        """
+        Re-read episode files whose mtime/size changed and drop deleted ones.
+
+        Returns:
+        - True if any entry was added, updated or removed.
+        """
+        seen = set()
+        changed = False
+        for episode_type, path, stat in self._scan():
+            seen.add(path)
+            entry = self.entries.get(path)
+            if (
+                entry is not None
+                and entry["mtime"] == stat.st_mtime_ns
+                and entry["size"] == stat.st_size
+            ):
+                continue
+            data = IOManager.read(path)
+            self.entries[path] = {
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "type": episode_type,
+                "number": data["Number"],
+                "title": data["Title"],
+                "starrs": list(data["Starr"]),
+            }
+            changed = True
+
+        for path in set(self.entries) - seen:
+            del self.entries[path]
+            changed = True
+
+        if changed or not self.rank:
+            self._build_indexes()
+        return changed
+
+    def find(self, episode_type: str, starrs: list) -> list:
+        """
+        Episodes of `episode_type` that belong to the same show or share a starr.
+
+        Returns:
+        - Catalog entries (with their `path`) in `natural_keys` order.
+        """
+        in_type = self.by_type.get(episode_type, set())
+        paths = set(self.title_matches.get(episode_type, set()))
+        for starr in starrs:
+            paths |= self.by_starr.get(starr, set()) & in_type
+        return [
+            dict(self.entries[path], path=path)
+            for path in sorted(paths, key=self.rank.__getitem__)
+        ]
+
+    def get(self, number: str):
+        path = self.by_number.get(number)
+        return None if path is None else dict(self.entries[path], path=path)
+
+    def _scan(self):
+        if not os.path.isdir(self.json_dir):
+            return
+        for type_dir in os.scandir(self.json_dir):
+            if not type_dir.is_dir():
+                continue
+            for file in os.scandir(type_dir.path):
+                if file.is_file() and file.name.endswith(".json"):
+                    yield type_dir.name, file.path, file.stat()
+
+    def _build_indexes(self):
+        self.by_starr, self.by_type, self.by_number = {}, {}, {}
+        self.title_matches = {}
+        for path, entry in self.entries.items():
+            episode_type = entry["type"]
+            self.by_type.setdefault(episode_type, set()).add(path)
+            self.by_number[entry["number"]] = path
+            for starr in entry["starrs"]:
+                self.by_starr.setdefault(starr, set()).add(path)
+            prefix = entry["number"].split("-")[0]
+            if prefix in self.TITLE_TYPES and prefix == episode_type:
+                self.title_matches.setdefault(episode_type, set()).add(path)
+
+        ordered = sorted(
+            self.entries, key=lambda p: self.natural_keys(self.entries[p]["number"])
+        )
+        self.rank = {path: i for i, path in enumerate(ordered)}
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        with open(self.snapshot_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot.get("version") == self.SNAPSHOT_VERSION:
+            self.entries = snapshot["entries"]
+
+    def _write_snapshot(self):
+        IOManager.exist_or_mkdir([os.path.dirname(self.snapshot_path) or "."])
+        with IOManager.open_writer(self.snapshot_path) as f:
+            json.dump(
+                {"version": self.SNAPSHOT_VERSION, "entries": self.entries},
+                f,
+                ensure_ascii=False,
+            )
@@ -1,9 +1,15 @@
+from html import escape
+
+from operate_filename import episode_id
+
+
 class EpisodeManager:
     @staticmethod
     def validate_episode(data, episode_type, episode_number):
         number = data["Number"]
         if episode_number:
-            if episode_number != number:
+            # other shows keep their type in the Number, e.g. "football-16-1"
+            if number not in (episode_number, episode_id(episode_type, episode_number)):
                 raise ValueError(
                     f"Episode number mismatch: {episode_number} != {number}"
                 )
@@ -22,7 +28,7 @@ class EpisodeManager:
 
     @staticmethod
     def format_comments(topics):
-        return "<ol>" + "".join([f"<li>{t}</li>" for t in topics]) + "</ol>"
+        return "<ol>" + "".join([f"<li>{escape(t)}</li>" for t in topics]) + "</ol>"
 
     @staticmethod
     def format_comments_sns(topics):
@@ -0,0 +1,302 @@
+import os
+import zlib
+
+import numpy as np
+
+from IOManager import IOManager
+from EpisodeCatalog import EpisodeCatalog
+from TranscriptStore import TranscriptStore
+from operate_filename import episode_id
+
+
+class EpisodeRanker:
+    """
+    Ranks related episodes by TF-IDF similarity plus guest overlap.
+
+    Text features are character 2/3-grams of the title, topics, marker names
+    and transcript, hashed into `DIM` buckets. Guests get their own IDF-weighted
+    vector, so a guest who is in almost every episode (the host) barely counts.
+    The top-`K` neighbours of every episode are precomputed and saved with the
+    raw term counts, so a changed episode only needs its own row recomputed.
+    """
+
+    TABLE_PATH = "cache/related_episodes.npz"
+    DIM = 1 << 14
+    NGRAMS = (2, 3)
+    K = 20
+    GUEST_WEIGHT = 0.3
+
+    def __init__(self, table_path=TABLE_PATH):
+        self.table_path = table_path
+        self.ids = []
+        self.types = []
+        self.titles = []
+        self.numbers = []
+        self.signatures = []
+        self.counts = np.zeros((0, self.DIM), np.float32)
+        self.guest_names = []
+        self.guests = np.zeros((0, 0), np.float32)
+        self.topk = np.zeros((0, self.K), np.int32)
+        self.scores = np.zeros((0, self.K), np.float32)
+
+    @classmethod
+    def load(cls, table_path=TABLE_PATH):
+        """
+        Load the saved table and bring it up to date with the catalog.
+        """
+        ranker = cls(table_path)
+        if os.path.exists(table_path):
+            ranker._read()
+        if ranker.update():
+            ranker._write()
+        return ranker
+
+    @staticmethod
+    def _signature(paths):
+        parts = []
+        for path in paths:
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+            else:
+                parts.append("-")
+        return "|".join(parts)
+
+    @staticmethod
+    def _sources(entry):
+        episode_type = entry["type"]
+        number = os.path.splitext(os.path.basename(entry["path"]))[0]
+        return [
+            entry["path"],
+            f"markers/{episode_type}/{number}.csv",
+            os.path.join("..", "transcripts", episode_type, f"{number}.csv"),
+        ]
+
+    def _text(self, entry, sources):
+        data = IOManager.read(sources[0])
+        parts = [data.get("Title", "")] + list(data.get("Topics", []))
+        if os.path.exists(sources[1]):
+            for row in IOManager.open_reader(sources[1], delimiter="\t"):
+                parts.append(row.get("Name") or "")
+        if os.path.exists(sources[2]):
+            number = os.path.splitext(os.path.basename(entry["path"]))[0]
+            transcript = TranscriptStore().open(entry["type"], number)
+            parts.extend(transcript.segment(i)["text"] for i in range(len(transcript)))
+        return " ".join(parts)
+
+    def _count_vector(self, text):
+        vector = np.zeros(self.DIM, np.float32)
+        text = "".join(text.lower().split())
+        buckets = [
+            zlib.crc32(text[i : i + n].encode("utf-8")) % self.DIM
+            for n in self.NGRAMS
+            for i in range(len(text) - n + 1)
+        ]
+        np.add.at(vector, np.array(buckets, np.int64), 1)
+        return vector
+
+    def update(self) -> bool:
+        """
+        Recompute rows of new or changed episodes and drop deleted ones.
+
+        Returns:
+        - True if the table changed.
+        """
+        catalog = EpisodeCatalog.load()
+        entries = sorted(catalog.entries.items(), key=lambda e: catalog.rank[e[0]])
+        index = {id_: i for i, id_ in enumerate(self.ids)}
+        ids, types, titles, numbers, signatures = [], [], [], [], []
+        rows, guests, changed = [], [], []
+        for path, entry in entries:
+            entry = dict(entry, path=path)
+            number = os.path.splitext(os.path.basename(path))[0]
+            id_ = episode_id(entry["type"], number)
+            sources = self._sources(entry)
+            signature = self._signature(sources)
+            old = index.get(id_)
+            if old is not None and self.signatures[old] == signature:
+                rows.append(self.counts[old])
+            else:
+                rows.append(self._count_vector(self._text(entry, sources)))
+                changed.append(len(ids))
+            ids.append(id_)
+            types.append(entry["type"])
+            titles.append(entry["title"])
+            numbers.append(entry["number"])
+            signatures.append(signature)
+            guests.append(entry["starrs"])
+
+        if not changed and ids == self.ids:
+            return False
+
+        # old row -> new row, -1 for episodes that were deleted
+        remap = np.full(len(self.ids), -1, np.int32)
+        new_index = {id_: i for i, id_ in enumerate(ids)}
+        for old, id_ in enumerate(self.ids):
+            remap[old] = new_index.get(id_, -1)
+
+        self.ids, self.titles, self.numbers = ids, titles, numbers
+        self.types = types
+        self.signatures = signatures
+        self.counts = np.vstack(rows) if rows else self.counts[:0]
+        self._set_guests(guests)
+        if (
+            (remap < 0).any()
+            or len(changed) > len(ids) // 4
+            or len(ids) <= self.K + 1
+            or self.topk.shape != (len(remap), self.K)
+        ):
+            self._rebuild()
+            return True
+
+        topk = np.full((len(ids), self.K), -1, np.int32)
+        scores = np.full((len(ids), self.K), -np.inf, np.float32)
+        topk[remap], scores[remap] = remap[self.topk], self.scores
+        self.topk, self.scores = topk, scores
+        for i in changed:
+            self._update_row(i)
+        return True
+
+    def _set_guests(self, guests):
+        self.guest_names = sorted({g for names in guests for g in names})
+        column = {name: j for j, name in enumerate(self.guest_names)}
+        self.guests = np.zeros((len(guests), len(self.guest_names)), np.float32)
+        for i, names in enumerate(guests):
+            self.guests[i, [column[name] for name in names]] = 1
+
+    @staticmethod
+    def _weighted(matrix):
+        """
+        TF-IDF weight and L2-normalise the rows of a count matrix.
+        """
+        df = np.count_nonzero(matrix, axis=0)
+        idf = np.log((1 + len(matrix)) / (1 + df)) + 1
+        weighted = np.log1p(matrix) * idf.astype(np.float32)
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        return weighted / np.maximum(norms, 1e-12)
+
+    def _similarity(self, rows=None):
+        text, guests = self._weighted(self.counts), self._weighted(self.guests)
+        if rows is not None:
+            sim = (1 - self.GUEST_WEIGHT) * (text[rows] @ text.T)
+            sim += self.GUEST_WEIGHT * (guests[rows] @ guests.T)
+            sim[np.arange(len(rows)), rows] = -np.inf
+        else:
+            sim = (1 - self.GUEST_WEIGHT) * (text @ text.T)
+            sim += self.GUEST_WEIGHT * (guests @ guests.T)
+            np.fill_diagonal(sim, -np.inf)
+        return sim
+
+    def _top(self, sim):
+        k = min(self.K, sim.shape[1] - 1)
+        if k <= 0:
+            return (
+                np.zeros((len(sim), 0), np.int32),
+                np.zeros((len(sim), 0), np.float32),
+            )
+        top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sim, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return (
+            np.take_along_axis(top, order, axis=1).astype(np.int32),
+            np.take_along_axis(top_scores, order, axis=1).astype(np.float32),
+        )
+
+    def _rebuild(self):
+        self.topk, self.scores = self._top(self._similarity())
+
+    def _update_row(self, i):
+        """
+        Refresh the neighbours of episode `i` and its score in every other row.
+
+        IDF weights drift slightly with each change; they are only recomputed
+        for the whole table on a rebuild.
+        """
+        sim = self._similarity(np.array([i]))[0]
+        top, top_scores = self._top(sim[None, :])
+        self.topk[i], self.scores[i] = top[0], top_scores[0]
+
+        stale = []
+        for j in range(len(self.ids)):
+            if j == i:
+                continue
+            members = self.topk[j] == i
+            if members.any():
+                if sim[j] < self.scores[j, members][0]:
+                    stale.append(j)  # i fell: another episode may now rank higher
+                    continue
+                self.scores[j, members] = sim[j]
+            elif sim[j] > self.scores[j, -1]:
+                self.topk[j, -1], self.scores[j, -1] = i, sim[j]
+            else:
+                continue
+            order = np.argsort(-self.scores[j])
+            self.topk[j], self.scores[j] = self.topk[j, order], self.scores[j, order]
+
+        if stale:
+            top, top_scores = self._top(self._similarity(np.array(stale)))
+            self.topk[stale], self.scores[stale] = top, top_scores
+
+    def related(self, episode_type, episode_number, n=10, same_type=True) -> list:
+        """
+        The `n` most similar episodes, best first.
+
+        With `same_type` only episodes of `episode_type` are ranked, so a
+        concast post does not link football or weshow episodes.
+
+        Returns:
+        - Dicts with id, number (the JSON `Number`), title and score.
+        """
+        i = self.ids.index(episode_id(episode_type, episode_number))
+        pairs = zip(self.topk[i], self.scores[i])
+        if same_type:
+            pairs = [(j, s) for j, s in pairs if self.types[j] == episode_type]
+            if len(pairs) < n and len(pairs) < self.types.count(episode_type) - 1:
+                # too few in the precomputed top-K: rank the whole row
+                sim = self._similarity(np.array([i]))[0]
+                sim[np.array(self.types) != episode_type] = -np.inf
+                order = np.argsort(-sim)[:n]
+                pairs = [(j, sim[j]) for j in order if np.isfinite(sim[j])]
+        return [
+            {
+                "id": self.ids[j],
+                "number": self.numbers[j],
+                "title": self.titles[j],
+                "score": float(score),
+            }
+            for j, score in list(pairs)[:n]
+        ]
+
+    def _read(self):
+        table = np.load(self.table_path, allow_pickle=False)
+        stored = ("types", "guests", "guest_names")
+        if table["counts"].shape[1:] != (self.DIM,) or any(
+            key not in table for key in stored
+        ):
+            return
+        self.ids = table["ids"].tolist()
+        self.types = table["types"].tolist()
+        self.titles = table["titles"].tolist()
+        self.numbers = table["numbers"].tolist()
+        self.signatures = table["signatures"].tolist()
+        self.counts = table["counts"]
+        self.guest_names = table["guest_names"].tolist()
+        self.guests = table["guests"]
+        self.topk, self.scores = table["topk"], table["scores"]
+
+    def _write(self):
+        IOManager.exist_or_mkdir([os.path.dirname(self.table_path) or "."])
+        with IOManager.open_writer(self.table_path) as f:
+            np.savez_compressed(
+                f,
+                ids=np.array(self.ids),
+                types=np.array(self.types),
+                titles=np.array(self.titles),
+                numbers=np.array(self.numbers),
+                signatures=np.array(self.signatures),
+                counts=self.counts,
+                guest_names=np.array(self.guest_names),
+                guests=self.guests,
+                topk=self.topk,
+                scores=self.scores,
+            )
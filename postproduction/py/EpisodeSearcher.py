@@ -1,7 +1,7 @@
 import re
-import glob
+from html import escape
 
-from IOManager import IOManager
+from EpisodeCatalog import EpisodeCatalog
 
 
 class EpisodeSearcher:
@@ -29,30 +29,42 @@ class EpisodeSearcher:
     @staticmethod
     def search_episodes(attrs: dict) -> list:
         results = []
-        to_show = []
-        count = 0
-        files = glob.glob(f"json/{attrs['episode-type']}/*.json")
+        catalog = EpisodeCatalog.load(json_dir="json")
         predefined_value_to_remove = "Gota"
         print()
-        for file_path in files:
-            episode_data = IOManager.read(file_path)
-            # remove 'Gota' from episode_data['Starr']
-            if predefined_value_to_remove in attrs["starrs"]:
-                attrs["starrs"].remove(predefined_value_to_remove)
-            if EpisodeSearcher.matches_title(
-                episode_data, attrs["episode-type"]
-            ) or EpisodeSearcher.matches_starr(episode_data, attrs["starrs"]):
-                number = episode_data["Number"]
-                to_show.append({"file": file_path, "name": episode_data["Title"]})
-                results.append(
-                    {
-                        "link": f'<li><a href="https://sports-con.xyz/concast-{number}/">[#{number}] {episode_data["Title"]}</a></li>',
-                        "number": number,
-                    }
-                )
-                count += 1
-
-        for entry in to_show:
-            print(f"{entry['file']: <30}{entry['name']}")
+        # remove 'Gota' from attrs['starrs']
+        if predefined_value_to_remove in attrs["starrs"]:
+            attrs["starrs"].remove(predefined_value_to_remove)
+        for entry in catalog.find(attrs["episode-type"], attrs["starrs"]):
+            number = entry["number"]
+            print(f"{entry['path']: <30}{entry['title']}")
+            results.append(EpisodeSearcher.format_link(number, entry["title"]))
 
         return results
+
+    @staticmethod
+    def format_link(number: str, title: str) -> dict:
+        number_html, title_html = escape(number), escape(title)
+        return {
+            "link": f'<li><a href="https://sports-con.xyz/concast-{number_html}/">[#{number_html}] {title_html}</a></li>',
+            "number": number,
+        }
+
+    @staticmethod
+    def rank_related_episodes(
+        episode_type: str, episode_number: str, n=10, same_type=True
+    ) -> list:
+        """
+        The `n` most similar episodes (topics, markers, transcript, guests), best first.
+
+        Only episodes of the same type are ranked unless `same_type` is False.
+        """
+        from EpisodeRanker import EpisodeRanker
+
+        ranker = EpisodeRanker.load()
+        print()
+        results = []
+        for entry in ranker.related(episode_type, episode_number, n, same_type):
+            print(f"{entry['id']: <30}{entry['score']:.3f} {entry['title']}")
+            results.append(EpisodeSearcher.format_link(entry["number"], entry["title"]))
+        return results
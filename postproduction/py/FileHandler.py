@@ -1,21 +1,115 @@
+import io
 import os
+import csv
 import json
-import pandas as pd
-import requests
+import uuid
+import shutil
+from contextlib import contextmanager
+
+# pandas and requests are imported inside the handlers that need them so that
+# text-only entry points do not pay for them at startup.
+
+@contextmanager
+def atomic_open(path, mode="w", encoding=None, newline=None):
+    """
+    Open a temporary file next to `path` and rename it over `path` on success.
+
+    Readers never see a half-written file; if the block raises, the target is
+    left untouched and the temporary file is removed. A replaced file keeps its
+    mode; a new one gets the mode `open()` would give it (0o666 minus umask).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = os.path.join(
+        directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp"
+    )
+    # the kernel applies the umask to 0o666, as for a file created by open()
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, mode, encoding=encoding, newline=newline) as f:
+            yield f
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 
 class FileHandler:
+    EXTENSIONS = []
+    CHUNK_SIZE = 1 << 16
+    ENCODING = "utf-8"
+    NEWLINE = None
+
     def read(self, path, template_path, use_template_if_absent):
         raise NotImplementedError
 
-    def save(self, content, path):
+    def dump(self, content, f):
+        """
+        Write `content` to the open file `f` returned by `open_writer`.
+        """
         raise NotImplementedError
 
+    def save(self, content, path):
+        with self.open_writer(path) as f:
+            self.dump(content, f)
+
+    def serialize(self, content) -> bytes:
+        """
+        The exact bytes `save` would write for `content`.
+        """
+        raw = io.BytesIO()
+        f = io.TextIOWrapper(raw, encoding=self.ENCODING, newline=self.NEWLINE)
+        self.dump(content, f)
+        f.flush()
+        data = raw.getvalue()
+        f.detach()
+        return data
+
     def exists(self, path):
         return os.path.exists(path)
 
+    def write_if_changed(self, content, path, dry_run=False):
+        """
+        Save `content` unless `path` already holds it, so unchanged files keep
+        their mtime. With `dry_run` only the status is computed.
+
+        Returns:
+        - "created", "updated" or "unchanged".
+        """
+        data = self.serialize(content)
+        if self.exists(path):
+            if os.path.getsize(path) == len(data):
+                with open(path, "rb") as f:
+                    if f.read() == data:
+                        return "unchanged"
+            status = "updated"
+        else:
+            status = "created"
+        if not dry_run:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with atomic_open(path, "wb") as f:
+                f.write(data)
+        return status
+
+    def open_reader(self, path):
+        """
+        Iterate over the lines of the text file, newline included.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            yield from f
+
+    def open_writer(self, path):
+        """
+        Context manager returning a text file that atomically replaces `path`.
+        """
+        return atomic_open(path, "w", encoding=self.ENCODING, newline=self.NEWLINE)
+
 
 class JsonHandler(FileHandler):
+    EXTENSIONS = [".json"]
+
     def read(self, path, template_path, use_template_if_absent):
         if self.exists(path):
             with open(path, "r") as f:
@@ -25,9 +119,8 @@ class JsonHandler(FileHandler):
         else:
             raise FileNotFoundError(f"{path} not found.")
 
-    def save(self, content, path):
-        with open(path, "w") as f:
-            json.dump(content, f, indent=4, ensure_ascii=False)
+    def dump(self, content, f):
+        json.dump(content, f, indent=4, ensure_ascii=False)
 
     def _use_template(self, path, template_path):
         if not self.exists(template_path):
@@ -39,7 +132,13 @@ class JsonHandler(FileHandler):
 
 
 class CsvHandler(FileHandler):
+    EXTENSIONS = [".csv"]
+    # the csv writer ends rows itself
+    NEWLINE = ""
+
     def read(self, path, template_path, use_template_if_absent):
+        import pandas as pd
+
         if self.exists(path):
             return pd.read_csv(path)
         elif use_template_if_absent:
@@ -47,18 +146,29 @@ class CsvHandler(FileHandler):
         else:
             raise FileNotFoundError(f"{path} not found.")
 
-    def save(self, content, path):
-        content.to_csv(path, index=False)
+    def dump(self, content, f):
+        content.to_csv(f, index=False)
+
+    def open_reader(self, path, delimiter=","):
+        """
+        Iterate over the rows as dicts keyed by the header (BOM stripped).
+        """
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            yield from csv.DictReader(f, delimiter=delimiter)
 
     def _use_template(self, path, template_path):
         if not self.exists(template_path):
             raise FileNotFoundError(f"Template {template_path} not found.")
+        import pandas as pd
+
         data = pd.read_csv(template_path)
         self.save(data, path)
         return data
 
 
 class TxtHandler(FileHandler):
+    EXTENSIONS = [".txt"]
+
     def read(self, path, template_path, use_template_if_absent):
         if self.exists(path):
             with open(path, "r", encoding="utf-8") as f:
@@ -68,9 +178,8 @@ class TxtHandler(FileHandler):
         else:
             raise FileNotFoundError(f"{path} not found.")
 
-    def save(self, content, path):
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
+    def dump(self, content, f):
+        f.write(content)
 
     def _use_template(self, path, template_path):
         if not self.exists(template_path):
@@ -81,35 +190,50 @@ class TxtHandler(FileHandler):
         return data
 
 
-class ImageHandler(FileHandler):
-    ALLOWED_EXTENSIONS = [".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".gif"]
-
+class BinaryHandler(FileHandler):
     def read(self, path, template_path, use_template_if_absent):
-        # Since reading image files directly may not be trivial,
-        # you might want to define what reading an image means.
-        # Perhaps, for your case, it can mean reading its binary content.
         if self.exists(path):
-            with open(path, "rb") as img_file:
-                return img_file.read()
+            with open(path, "rb") as f:
+                return f.read()
         elif use_template_if_absent:
             return self._use_template(path, template_path)
         else:
             raise FileNotFoundError(f"{path} not found.")
 
-    # def save(self, content, path):
-    #     # content is expected to be bytes
-    #     with open(path, "wb") as img_file:
-    #         img_file.write(content)
+    def dump(self, content, f):
+        f.write(content)
+
+    def open_reader(self, path):
+        """
+        Iterate over the file in binary chunks of `CHUNK_SIZE` bytes.
+        """
+        with open(path, "rb") as f:
+            while chunk := f.read(self.CHUNK_SIZE):
+                yield chunk
+
+    def open_writer(self, path):
+        """
+        Context manager returning a binary file that atomically replaces `path`.
+        """
+        return atomic_open(path, "wb")
+
+    def serialize(self, content) -> bytes:
+        return bytes(content)
 
     def _use_template(self, path, template_path):
         if not self.exists(template_path):
             raise FileNotFoundError(f"Template {template_path} not found.")
-        with open(template_path, "rb") as img_file:
-            data = img_file.read()
+        with open(template_path, "rb") as f:
+            data = f.read()
         self.save(data, path)
         return data
 
-    def save(self, url, filepath):
+
+class ImageHandler(BinaryHandler):
+    EXTENSIONS = [".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".gif", ".webp"]
+    ALLOWED_EXTENSIONS = EXTENSIONS
+
+    def download(self, url, filepath):
         """
         Saves the image from the provided URL.
 
@@ -120,21 +244,48 @@ class ImageHandler(FileHandler):
         Returns:
         - None.
         """
+        import requests
+
         response = requests.get(url, stream=True)
         response.raise_for_status()
         print(url, response)
-        with open(filepath, "wb") as file:
-            for chunk in response.iter_content(chunk_size=65536):
+        with self.open_writer(filepath) as file:
+            for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
                 file.write(chunk)
 
 
+class Mp3Handler(BinaryHandler):
+    EXTENSIONS = [".mp3"]
+
+
+_HANDLERS = {}
+
+
+def register_handler(handler, extensions=None):
+    """
+    Use `handler` for `extensions` (default: `handler.EXTENSIONS`).
+
+    Handlers are stateless singletons; registering an extension again replaces
+    the previous handler, which is how third parties override the defaults.
+    """
+    for extension in extensions or handler.EXTENSIONS:
+        _HANDLERS[extension.lower()] = handler
+
+
 def get_handler_for_extension(extension):
-    if extension == ".json":
-        return JsonHandler()
-    if extension == ".csv":
-        return CsvHandler()
-    if extension == ".txt":
-        return TxtHandler()
-    if extension in ImageHandler.ALLOWED_EXTENSIONS:
-        return ImageHandler()
-    raise ValueError(f"No handler for file type: {extension}")
+    handler = _HANDLERS.get(extension.lower())
+    if handler is None:
+        raise ValueError(f"No handler for file type: {extension}")
+    return handler
+
+
+for _handler in [
+    JsonHandler(),
+    CsvHandler(),
+    TxtHandler(),
+    ImageHandler(),
+    Mp3Handler(),
+]:
+    register_handler(_handler)
+# generated pages and feeds are written as encoded bytes; caches are binary blobs
+register_handler(BinaryHandler(), [".html", ".xml", ".npy", ".npz", ".pkl", ".seg"])
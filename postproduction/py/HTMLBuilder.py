@@ -1,22 +1,52 @@
+from html import escape
+from string import Template
 from typing import Dict, List
 
 
 class HTMLBuilder:
+    # fragments are compiled once; substitute() is all a page render pays for.
+    # Text and attribute values are escaped here; `$comments`, `$items` and
+    # `$body` take fragments that were built (and escaped) by this class.
+    HEADER = Template('<div class="content-head">\n$comments</div>')
+    COMMENTS = Template('<p class="comments">$comments</p>')
+    REFERENCES = Template(
+        '<div class="references">\n<ul class="list_test-wrap">\n$items</ul>\n</div>'
+    )
+    REFERENCE = Template('<li class="list_test"><a href="$link">$text</a></li>\n')
+    LINK_ITEM = Template('<li><a href="$href">$label</a></li>')
+    PAGE = Template(
+        """<!DOCTYPE html>
+<html lang="ja">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>$title</title>
+</head>
+<body>
+<nav><a href="$root/index.html">concast</a>$breadcrumb</nav>
+<h1>$title</h1>
+$body
+</body>
+</html>
+"""
+    )
+
     @staticmethod
     def create_header_html(comments=None) -> str:
-        result = '<div class="content-head">\n'
-        if comments:
-            result += f'<p class="comments">{comments}</p>'
-        result += "</div>"
-        return result
+        return HTMLBuilder.HEADER.substitute(
+            comments=HTMLBuilder.COMMENTS.substitute(comments=comments)
+            if comments
+            else ""
+        )
 
     @staticmethod
     def create_references_html(references_dict) -> str:
-        result = '<div class="references">\n<ul class="list_test-wrap">\n'
-        for text, link in references_dict.items():
-            result += f'<li class="list_test"><a href="{link}">{text}</a></li>\n'
-        result += "</ul>\n</div>"
-        return result
+        reference = HTMLBuilder.REFERENCE.substitute
+        items = [
+            reference(link=escape(link), text=escape(text))
+            for text, link in references_dict.items()
+        ]
+        return HTMLBuilder.REFERENCES.substitute(items="".join(items))
 
     @staticmethod
     def generate_related_episodes_header() -> str:
@@ -26,3 +56,32 @@ class HTMLBuilder:
     def generate_related_episodes_list(links: List[Dict[str, str]]) -> str:
         links_list = "\n".join([l["link"] for l in links])
         return f"<ul>\n{links_list}\n</ul>"
+
+    @staticmethod
+    def create_link_item(href: str, label: str) -> str:
+        return HTMLBuilder.LINK_ITEM.substitute(href=escape(href), label=escape(label))
+
+    @staticmethod
+    def create_breadcrumb(items) -> str:
+        """
+        ` / `-separated trail of (href, label) pairs; href None for plain text.
+        """
+        return "".join(
+            f' / <a href="{escape(href)}">{escape(label)}</a>'
+            if href
+            else f" / {escape(label)}"
+            for href, label in items
+        )
+
+    @staticmethod
+    def create_page(title: str, body: str, root=".", breadcrumb=()) -> str:
+        """
+        A standalone HTML document; `root` is the relative path to the site root
+        and `breadcrumb` the (href, label) pairs shown after the home link.
+        """
+        return HTMLBuilder.PAGE.substitute(
+            title=escape(title),
+            body=body,
+            root=escape(root),
+            breadcrumb=HTMLBuilder.create_breadcrumb(breadcrumb),
+        )
@@ -4,24 +4,60 @@ from FileHandler import get_handler_for_extension
 
 
 class IOManager:
+    @staticmethod
+    def _handler(path):
+        return get_handler_for_extension(os.path.splitext(path)[1])
+
     @staticmethod
     def read(path, template_path=None, use_template_if_absent=False):
-        handler = get_handler_for_extension(os.path.splitext(path)[1])
+        handler = IOManager._handler(path)
         return handler.read(path, template_path, use_template_if_absent)
 
     @staticmethod
     def save(content, path):
-        handler = get_handler_for_extension(os.path.splitext(path)[1])
+        handler = IOManager._handler(path)
         handler.save(content, path)
 
+    @staticmethod
+    def write_if_changed(content, path, dry_run=False):
+        """
+        Save `content` unless `path` already holds it.
+
+        Returns:
+        - "created", "updated" or "unchanged".
+        """
+        handler = IOManager._handler(path)
+        return handler.write_if_changed(content, path, dry_run)
+
     @staticmethod
     def exists(path):
-        handler = get_handler_for_extension(os.path.splitext(path)[1])
+        handler = IOManager._handler(path)
         return handler.exists(path)
 
+    @staticmethod
+    def open_reader(path, **kwargs):
+        """
+        Stream `path`: byte chunks for binary files, dict rows for CSV, lines otherwise.
+        """
+        return IOManager._handler(path).open_reader(path, **kwargs)
+
+    @staticmethod
+    def open_writer(path):
+        """
+        Context manager for a file that atomically replaces `path` when closed.
+        """
+        return IOManager._handler(path).open_writer(path)
+
+    @staticmethod
+    def download(url, path):
+        handler = IOManager._handler(path)
+        if not hasattr(handler, "download"):
+            raise ValueError(f"Cannot download to file type: {path}")
+        handler.download(url, path)
+
     @staticmethod
     def exist_or_mkdir(paths):
         for path in paths:
             if not os.path.exists(path):
-                os.makedirs(path)
+                os.makedirs(path, exist_ok=True)
                 print(f"Created {path}!")
@@ -0,0 +1,112 @@
+import os
+import hashlib
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from IOManager import IOManager
+
+
+class IconCache:
+    """
+    Ready-to-composite BGRA icons, resized and (optionally) circle-masked.
+
+    Icons are keyed by source path, mtime/size and target resolution, kept in
+    an in-process LRU and saved as raw `.npy` arrays under `cache/icons`, so a
+    warm render loads them without decoding or resizing any image. The disk
+    cache is trimmed to `MAX_FILES`, least recently used first.
+    """
+
+    CACHE_DIR = "cache/icons"
+    VERSION = 2  # bump when `build` changes
+    MAX_ENTRIES = 64
+    MAX_FILES = 1024
+
+    _instances = {}
+
+    def __init__(self, cache_dir=CACHE_DIR, max_entries=MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+
+    @classmethod
+    def load(cls, cache_dir=CACHE_DIR):
+        """
+        Return the cache for `cache_dir`, shared for the lifetime of the process.
+        """
+        cache = cls._instances.get(cache_dir)
+        if cache is None:
+            cache = cls._instances[cache_dir] = cls(cache_dir)
+        return cache
+
+    @staticmethod
+    def build(path: str, resolution: int, circle: bool) -> np.ndarray:
+        """
+        Decode `path`, scale it to about `resolution` pixels and add an alpha
+        channel: the inscribed circle with an anti-aliased edge if `circle`,
+        else fully opaque.
+        """
+        image = cv2.imread(path)
+        if image is None:
+            raise FileNotFoundError(f"{path} not found.")
+        h, w, _ = image.shape
+        scale = (resolution / (h * w)) ** 0.5
+        image = cv2.resize(image, None, fx=scale, fy=scale)
+
+        h, w = image.shape[:2]
+        alpha = np.full((h, w), 255, np.uint8)
+        if circle:
+            # coverage of each pixel by the circle, linear across its edge
+            ys, xs = np.ogrid[:h, :w]
+            distance = np.hypot(ys - (h - 1) / 2, xs - (w - 1) / 2)
+            coverage = np.clip(min(h, w) / 2 - distance + 0.5, 0, 1)
+            alpha = (coverage * 255 + 0.5).astype(np.uint8)
+        return np.dstack([image, alpha])
+
+    def get(self, path: str, resolution: int = 128**2, circle: bool = True):
+        """
+        The icon for `path`; the returned array is shared and read-only.
+        """
+        stat = os.stat(path)
+        key = "|".join(
+            [
+                os.path.abspath(path),
+                str(stat.st_mtime_ns),
+                str(stat.st_size),
+                str(resolution),
+                "circle" if circle else "square",
+                str(self.VERSION),
+            ]
+        )
+        icon = self._memory.get(key)
+        if icon is not None:
+            self._memory.move_to_end(key)
+            return icon
+
+        cache_file = os.path.join(
+            self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".npy"
+        )
+        if os.path.exists(cache_file):
+            icon = np.load(cache_file)
+            os.utime(cache_file)
+        else:
+            icon = self.build(path, resolution, circle)
+            self._write(cache_file, icon)
+
+        icon.flags.writeable = False
+        self._memory[key] = icon
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+        return icon
+
+    def _write(self, cache_file, icon):
+        IOManager.exist_or_mkdir([self.cache_dir])
+        with IOManager.open_writer(cache_file) as f:
+            np.save(f, icon)
+
+        files = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".npy")]
+        if len(files) > self.MAX_FILES:
+            files.sort(key=lambda e: e.stat().st_mtime_ns)
+            for entry in files[: len(files) - self.MAX_FILES]:
+                os.remove(entry.path)
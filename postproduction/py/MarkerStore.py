@@ -0,0 +1,242 @@
+import os
+import csv
+
+import numpy as np
+import pandas as pd
+
+from IOManager import IOManager
+
+
+class MarkerStore:
+    """
+    Every `markers/<type>/<n>.csv` compiled into one table.
+
+    Zencastr exports are tab-separated with a BOM. The table keeps the marker
+    name with its start and duration in integer milliseconds, in file order,
+    and is pickled with the mtime/size of each source so a refresh only
+    re-reads the CSVs that changed. Timecodes of all changed files are parsed
+    in one vectorized pass.
+
+    A file that cannot be parsed is skipped and its error kept in `errors`;
+    only asking for that episode's markers raises.
+    """
+
+    TABLE_PATH = "cache/markers.pkl"
+    TABLE_VERSION = 2
+    COLUMNS = ["type", "number", "name", "start_ms", "duration_ms"]
+    TIMECODE = r"^(?:(\d+):)?(\d+):(\d+)(?:\.(\d{1,3}))?$"
+
+    _instances = {}
+
+    def __init__(self, markers_dir="markers", table_path=TABLE_PATH):
+        self.markers_dir = markers_dir
+        self.table_path = table_path
+        self.sources = {}
+        self.errors = {}
+        self.table = pd.DataFrame(columns=self.COLUMNS)
+        self._rows = None
+
+    @classmethod
+    def load(cls, markers_dir="markers", table_path=TABLE_PATH):
+        """
+        Return the store for `markers_dir`, refreshed against the files on disk.
+        """
+        key = (markers_dir, table_path)
+        store = cls._instances.get(key)
+        if store is None:
+            store = cls(markers_dir, table_path)
+            store._read_table()
+            cls._instances[key] = store
+        if store.refresh():
+            store._write_table()
+        return store
+
+    @classmethod
+    def parse_timecodes(cls, values) -> np.ndarray:
+        """
+        Milliseconds in Zencastr timecodes such as `1:06:27.520` or `54:50.000`.
+        """
+        values = pd.Series(values, dtype=str)
+        millis, invalid = cls._timecodes(values)
+        if invalid.any():
+            raise ValueError(f"Invalid time format: {values[invalid].iloc[0]}")
+        return millis
+
+    @classmethod
+    def _timecodes(cls, values: pd.Series):
+        """
+        (milliseconds, invalid mask) of `values`; invalid timecodes give 0.
+        """
+        parts = values.str.extract(cls.TIMECODE)
+        invalid = parts[2].isna().to_numpy()
+        hours, minutes, seconds = (
+            parts[i].fillna("0").astype(np.int64).to_numpy() for i in range(3)
+        )
+        millis = parts[3].fillna("").str.ljust(3, "0").astype(np.int64).to_numpy()
+        return ((hours * 60 + minutes) * 60 + seconds) * 1000 + millis, invalid
+
+    def refresh(self) -> bool:
+        """
+        Re-read marker files whose mtime/size changed and drop deleted ones.
+
+        The raw rows of every changed file are gathered first and their
+        timecodes parsed in one pass; a file with an unreadable header or an
+        invalid timecode is then dropped and recorded in `errors`.
+
+        Returns:
+        - True if the table changed.
+        """
+        seen, changed, errors = {}, [], {}
+        files, rows = [], {"file": [], "name": [], "start": [], "duration": []}
+        for episode_type, number, path, stat in self._scan():
+            signature = (stat.st_mtime_ns, stat.st_size)
+            seen[path] = signature
+            if self.sources.get(path) == signature:
+                if path in self.errors:
+                    errors[path] = self.errors[path]
+                continue
+            changed.append(path)
+            try:
+                names, starts, durations = self._read_raw(path)
+            except (ValueError, KeyError) as e:
+                errors[path] = f"{type(e).__name__}: {e}"
+                continue
+            rows["file"] += [len(files)] * len(names)
+            rows["name"] += names
+            rows["start"] += starts
+            rows["duration"] += durations
+            files.append((episode_type, number, path))
+
+        removed = set(self.sources) - set(seen)
+        if not changed and not removed:
+            return False
+
+        stale = {
+            self._key(path) for path in changed + list(removed) if path in self.sources
+        }
+        keep = self.table
+        if stale:
+            keys = list(zip(keep["type"], keep["number"]))
+            keep = keep[[key not in stale for key in keys]]
+        if files:
+            new = self._compile(files, rows, errors)
+            keep = pd.concat([keep, new], ignore_index=True) if len(keep) else new
+        for path in changed:
+            if path in errors:
+                print(f"skipped {path}: {errors[path]}")
+        self.table = keep.reset_index(drop=True).astype(
+            {"start_ms": np.int64, "duration_ms": np.int64}
+        )
+        self.sources = seen
+        self.errors = errors
+        self._rows = None
+        return True
+
+    @staticmethod
+    def _read_raw(path):
+        """
+        Name, Start and Duration strings of one marker file, in file order.
+        """
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f, delimiter="\t")
+            header = next(reader, None)
+            if header is None:
+                raise ValueError("empty file")
+            columns = [header.index(c) for c in ("Name", "Start", "Duration")]
+            names, starts, durations = [], [], []
+            for row in reader:
+                if not row:
+                    continue
+                row += [""] * (max(columns) + 1 - len(row))
+                names.append(row[columns[0]])
+                starts.append(row[columns[1]])
+                durations.append(row[columns[2]])
+        return names, starts, durations
+
+    def _compile(self, files, rows, errors) -> pd.DataFrame:
+        """
+        Table rows of the gathered `files`, timecodes parsed in one pass.
+
+        Files with an invalid timecode are left out and added to `errors`.
+        """
+        file_index = np.asarray(rows["file"], np.int64)
+        start_ms, bad_start = self._timecodes(pd.Series(rows["start"], dtype=str))
+        duration_ms, bad_duration = self._timecodes(
+            pd.Series(rows["duration"], dtype=str)
+        )
+        invalid = bad_start | bad_duration
+        bad_files = set()
+        for i in np.flatnonzero(invalid):
+            f = file_index[i]
+            if f not in bad_files:
+                bad_files.add(f)
+                value = rows["start"][i] if bad_start[i] else rows["duration"][i]
+                errors[files[f][2]] = f"ValueError: Invalid time format: {value}"
+
+        good = ~np.isin(file_index, list(bad_files))
+        types = np.array([t for t, _, _ in files], dtype=object)
+        numbers = np.array([n for _, n, _ in files], dtype=object)
+        return pd.DataFrame(
+            {
+                "type": types[file_index[good]],
+                "number": numbers[file_index[good]],
+                "name": np.array(rows["name"], dtype=object)[good],
+                "start_ms": start_ms[good],
+                "duration_ms": duration_ms[good],
+            },
+            columns=self.COLUMNS,
+        )
+
+    def markers(self, episode_type, episode_number) -> pd.DataFrame:
+        """
+        Markers of one episode in file order: name, start_ms and duration_ms.
+        """
+        if self._rows is None:
+            self._rows = self.table.groupby(["type", "number"], sort=False).indices
+        path = os.path.join(self.markers_dir, episode_type, f"{episode_number}.csv")
+        if path in self.errors:
+            raise ValueError(f"{path}: {self.errors[path]}")
+        rows = self._rows.get((episode_type, str(episode_number)))
+        if rows is None and path in self.sources:
+            rows = []  # a marker file with a header only
+        if rows is None:
+            raise FileNotFoundError(
+                f"{self.markers_dir}/{episode_type}/{episode_number}.csv not found."
+            )
+        return self.table.iloc[rows][["name", "start_ms", "duration_ms"]]
+
+    def _key(self, path):
+        episode_type = os.path.basename(os.path.dirname(path))
+        return episode_type, os.path.splitext(os.path.basename(path))[0]
+
+    def _scan(self):
+        if not os.path.isdir(self.markers_dir):
+            return
+        for type_dir in os.scandir(self.markers_dir):
+            if not type_dir.is_dir():
+                continue
+            for file in os.scandir(type_dir.path):
+                if file.is_file() and file.name.endswith(".csv"):
+                    number = os.path.splitext(file.name)[0]
+                    yield type_dir.name, number, file.path, file.stat()
+
+    def _read_table(self):
+        if not os.path.exists(self.table_path):
+            return
+        snapshot = pd.read_pickle(self.table_path)
+        if snapshot.get("version") == self.TABLE_VERSION:
+            self.sources, self.table = snapshot["sources"], snapshot["table"]
+            self.errors = snapshot["errors"]
+
+    def _write_table(self):
+        IOManager.exist_or_mkdir([os.path.dirname(self.table_path) or "."])
+        with IOManager.open_writer(self.table_path) as f:
+            pd.to_pickle(
+                {
+                    "version": self.TABLE_VERSION,
+                    "sources": self.sources,
+                    "errors": self.errors,
+                    "table": self.table,
+                },
+                f,
+            )
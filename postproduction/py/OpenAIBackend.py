@@ -0,0 +1,80 @@
+import base64
+from contextlib import contextmanager
+
+import openai
+
+from RetryPolicy import RetryableError
+
+# OPENAI_API_BASE (read by openai itself) or `api_base` below points these at
+# another server, e.g. fake_api_server.py for tests and benchmarks.
+
+TRANSIENT = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+    openai.error.APIConnectionError,
+    openai.error.TryAgain,
+)
+
+
+@contextmanager
+def retryable_errors():
+    """
+    Re-raise rate limits, 5xx and timeouts as `RetryableError`.
+    """
+    try:
+        yield
+    except openai.error.OpenAIError as e:
+        status = e.http_status or 0
+        if not isinstance(e, TRANSIENT) and status != 429 and status < 500:
+            raise
+        retry_after = (e.headers or {}).get("retry-after")
+        try:
+            retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            retry_after = None
+        raise RetryableError(f"{type(e).__name__}: {e}", retry_after) from e
+
+
+class OpenAIImageBackend:
+    """
+    Image backend: `await generate(prompt, size)` returns the image bytes.
+
+    The image is requested as base64 in the response itself, so there is no
+    second request to download it.
+    """
+
+    def __init__(self, model="dall-e-2", api_base=None):
+        self.model = model
+        self.api_base = api_base
+        self.name = f"openai:{model}"
+
+    async def generate(self, prompt: str, size: str) -> bytes:
+        with retryable_errors():
+            response = await openai.Image.acreate(
+                prompt=prompt,
+                n=1,
+                size=size,
+                model=self.model,
+                response_format="b64_json",
+                api_base=self.api_base,
+            )
+        return base64.b64decode(response["data"][0]["b64_json"])
+
+
+class OpenAIChatBackend:
+    """
+    Chat backend: `await complete(messages)` returns the reply text.
+    """
+
+    def __init__(self, model="gpt-3.5-turbo-0613", api_base=None):
+        self.model = model
+        self.api_base = api_base
+        self.name = f"openai:{model}"
+
+    async def complete(self, messages: list) -> str:
+        with retryable_errors():
+            response = await openai.ChatCompletion.acreate(
+                model=self.model, messages=messages, api_base=self.api_base
+            )
+        return response.choices[0].message.content
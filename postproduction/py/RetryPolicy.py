@@ -0,0 +1,46 @@
+import random
+import asyncio
+
+
+class RetryableError(Exception):
+    """
+    A transient failure (rate limit, 5xx, timeout) worth another attempt.
+
+    `retry_after` is the server's Retry-After in seconds, when it sent one.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, never shorter than Retry-After.
+    """
+
+    def __init__(self, attempts: int = 5, base_delay: float = 1.0, max_delay=60.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after=None) -> float:
+        """
+        Seconds to wait before attempt `attempt + 1` (attempts count from 0).
+        """
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        return max(backoff, retry_after or 0)
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Await `function(*args, **kwargs)`, retrying on `RetryableError`.
+        """
+        for attempt in range(self.attempts):
+            try:
+                return await function(*args, **kwargs)
+            except RetryableError as e:
+                if attempt == self.attempts - 1:
+                    raise
+                delay = self.delay(attempt, e.retry_after)
+                print(f"{e}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+
+from IOManager import IOManager
+from operate_filename import episode_id
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index over episode JSONs, marker files and transcripts.
+
+    The trigram tokenizer is used because Japanese text has no word breaks.
+    Every indexed file is tracked with its mtime/size, and `sync` only
+    re-indexes the files that changed.
+    """
+
+    DB_PATH = "cache/search.sqlite3"
+    SOURCES = [
+        ("json", ".json", "episode"),
+        ("markers", ".csv", "markers"),
+        (os.path.join("..", "transcripts"), ".csv", "transcript"),
+    ]
+
+    def __init__(self, db_path=DB_PATH):
+        IOManager.exist_or_mkdir([os.path.dirname(db_path) or "."])
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS hits USING fts5(
+                episode, kind, label, body,
+                start UNINDEXED, source UNINDEXED,
+                tokenize = 'trigram'
+            );
+            """
+        )
+
+    @staticmethod
+    def parse_timecode(timestr: str) -> float:
+        """
+        Seconds in a Zencastr timecode such as `1:06:27.520` or `54:50.000`.
+        """
+        seconds = 0.0
+        for part in timestr.split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+
+    def _scan(self):
+        for folder, ext, kind in self.SOURCES:
+            if not os.path.isdir(folder):
+                continue
+            for type_dir in os.scandir(folder):
+                if not type_dir.is_dir():
+                    continue
+                for file in os.scandir(type_dir.path):
+                    if file.name.endswith(ext):
+                        yield kind, type_dir.name, file
+
+    def _rows(self, kind, episode_type, path):
+        number = os.path.splitext(os.path.basename(path))[0]
+        episode = episode_id(episode_type, number)
+        if kind == "episode":
+            data = IOManager.read(path)
+            yield episode, "title", "", data.get("Title", ""), None
+            for topic in data.get("Topics", []):
+                yield episode, "topic", "", topic, None
+            for text, link in data.get("References", {}).items():
+                yield episode, "reference", link, text, None
+        elif kind == "markers":
+            for row in IOManager.open_reader(path, delimiter="\t"):
+                start = row.get("Start")
+                start = self.parse_timecode(start) if start else None
+                yield episode, "marker", "", row.get("Name") or "", start
+        else:
+            for row in IOManager.open_reader(path):
+                yield episode, "transcript", "", row["text"], float(row["start"])
+
+    def sync(self) -> int:
+        """
+        Re-index new or changed files and forget deleted ones.
+
+        Returns:
+        - The number of files (re-)indexed or removed.
+        """
+        known = {
+            path: (mtime, size)
+            for path, mtime, size in self.db.execute("SELECT * FROM sources")
+        }
+        seen = set()
+        changed = 0
+        with self.db:
+            for kind, episode_type, file in self._scan():
+                stat = file.stat()
+                seen.add(file.path)
+                if known.get(file.path) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                self.db.execute("DELETE FROM hits WHERE source = ?", (file.path,))
+                self.db.executemany(
+                    "INSERT INTO hits VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        row + (file.path,)
+                        for row in self._rows(kind, episode_type, file.path)
+                    ),
+                )
+                self.db.execute(
+                    "INSERT OR REPLACE INTO sources VALUES (?, ?, ?)",
+                    (file.path, stat.st_mtime_ns, stat.st_size),
+                )
+                changed += 1
+            for path in set(known) - seen:
+                self.db.execute("DELETE FROM hits WHERE source = ?", (path,))
+                self.db.execute("DELETE FROM sources WHERE path = ?", (path,))
+                changed += 1
+        return changed
+
+    def search(self, query: str, limit: int = 20, kinds=None) -> list:
+        """
+        Ranked hits for `query`; every whitespace-separated term must match.
+
+        Returns:
+        - Dicts with episode, kind, label, start (seconds or None) and snippet.
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        kind_filter, params = "", []
+        if kinds:
+            kind_filter = f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params = list(kinds)
+
+        if all(len(term) >= 3 for term in terms):
+            phrases = " AND ".join('"' + t.replace('"', '""') + '"' for t in terms)
+            match = f"body : ({phrases})"
+            sql = (
+                "SELECT episode, kind, label, start,"
+                " snippet(hits, 3, '[', ']', '…', 48)"
+                " FROM hits WHERE hits MATCH ?"
+                + kind_filter
+                + " ORDER BY bm25(hits, 0, 0, 0.5, 1) LIMIT ?"
+            )
+            params = [match] + params + [limit]
+        else:
+            # trigrams cannot match terms shorter than three characters, and
+            # neither can LIKE on a trigram table, so scan with instr()
+            where = " AND ".join("instr(body, ?) > 0" for _ in terms)
+            sql = (
+                "SELECT episode, kind, label, start, body FROM hits WHERE "
+                + where
+                + kind_filter
+                + " LIMIT ?"
+            )
+            params = terms + params + [limit]
+
+        keys = ["episode", "kind", "label", "start", "snippet"]
+        return [dict(zip(keys, row)) for row in self.db.execute(sql, params)]
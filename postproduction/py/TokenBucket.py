@@ -0,0 +1,35 @@
+import time
+import asyncio
+
+
+class TokenBucket:
+    """
+    Async rate limiter: `rate` tokens per second, bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, requests: float, burst: float = None):
+        return cls(requests / 60, burst)
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """
+        Wait until `tokens` are available and take them; waiters queue in order.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
@@ -0,0 +1,167 @@
+import os
+import sys
+import mmap
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+
+from IOManager import IOManager
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for compressed stores
+    zstandard = None
+
+
+class Transcript:
+    """
+    Read-only view over one packed transcript.
+
+    File layout (little-endian):
+    - header: magic `CTSG`, version (u16), flags (u16), segment count n (u32),
+      text blob length (u32)
+    - start seconds float32[n], end seconds float32[n]
+    - text offsets uint32[n + 1] into the blob, then the UTF-8 text blob
+
+    Everything after the header is zstd-compressed when `FLAG_ZSTD` is set.
+    Uncompressed files are memory-mapped and nothing is decoded until a
+    segment is asked for.
+    """
+
+    MAGIC = b"CTSG"
+    VERSION = 1
+    FLAG_ZSTD = 1
+    HEADER = struct.Struct("<4sHHII")
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, count, blob_size = self.HEADER.unpack_from(self._mmap)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"Not a transcript store file: {path}")
+
+        payload = memoryview(self._mmap)[self.HEADER.size :]
+        if flags & self.FLAG_ZSTD:
+            if zstandard is None:
+                raise ImportError(f"zstandard is required to read {path}")
+            payload = memoryview(zstandard.ZstdDecompressor().decompress(payload))
+
+        n = count * 4
+        self.starts = self._array(payload[:n], "f")
+        self.ends = self._array(payload[n : 2 * n], "f")
+        self.offsets = self._array(payload[2 * n : 3 * n + 4], "I")
+        self.blob = payload[3 * n + 4 : 3 * n + 4 + blob_size]
+
+    @staticmethod
+    def _array(view, typecode):
+        if sys.byteorder == "little":
+            return view.cast(typecode)
+        values = array(typecode, view)
+        values.byteswap()
+        return values
+
+    def __len__(self):
+        return len(self.starts)
+
+    def segment(self, i):
+        text = bytes(self.blob[self.offsets[i] : self.offsets[i + 1]]).decode("utf-8")
+        return {"id": i, "start": self.starts[i], "end": self.ends[i], "text": text}
+
+    def at(self, seconds):
+        """
+        The segment being spoken at `seconds`, or None during a silence.
+        """
+        i = bisect_right(self.starts, seconds) - 1
+        if i < 0 or seconds >= self.ends[i]:
+            return None
+        return self.segment(i)
+
+    def slice(self, start, end):
+        """
+        Segments overlapping [start, end).
+        """
+        first = max(bisect_right(self.starts, start) - 1, 0)
+        if first < len(self) and self.ends[first] <= start:
+            first += 1
+        last = bisect_left(self.starts, end)
+        return [self.segment(i) for i in range(first, last)]
+
+
+class TranscriptStore:
+    """
+    Packed `<n>.seg` files stored next to the `<n>.csv` transcripts.
+    """
+
+    def __init__(self, root=os.path.join("..", "transcripts")):
+        self.root = root
+        self._open = {}
+
+    def path(self, episode_type, episode_number, ext="seg"):
+        return os.path.join(self.root, episode_type, f"{episode_number}.{ext}")
+
+    def open(self, episode_type, episode_number) -> Transcript:
+        path = self.path(episode_type, episode_number)
+        if path not in self._open:
+            if not os.path.exists(path):
+                self.convert(self.path(episode_type, episode_number, "csv"), path)
+            self._open[path] = Transcript(path)
+        return self._open[path]
+
+    @staticmethod
+    def pack(rows, compress=False) -> bytes:
+        """
+        Pack `rows` (dicts with start, end and text) into the store format.
+        """
+        starts, ends, offsets = array("f"), array("f"), array("I", [0])
+        blob = bytearray()
+        for row in rows:
+            starts.append(float(row["start"]))
+            ends.append(float(row["end"]))
+            blob += row["text"].encode("utf-8")
+            offsets.append(len(blob))
+        if sys.byteorder != "little":
+            for values in (starts, ends, offsets):
+                values.byteswap()
+
+        payload = starts.tobytes() + ends.tobytes() + offsets.tobytes() + bytes(blob)
+        flags = 0
+        if compress:
+            if zstandard is None:
+                raise ImportError("zstandard is required for compressed stores")
+            payload = zstandard.ZstdCompressor(level=10).compress(payload)
+            flags |= Transcript.FLAG_ZSTD
+        header = Transcript.HEADER.pack(
+            Transcript.MAGIC, Transcript.VERSION, flags, len(starts), len(blob)
+        )
+        return header + payload
+
+    def convert(self, csv_path, seg_path, compress=False):
+        rows = IOManager.open_reader(csv_path)
+        IOManager.save(self.pack(rows, compress), seg_path)
+
+    def sync(self, compress=False) -> list:
+        """
+        Convert every CSV transcript whose packed file is missing or older.
+
+        Returns:
+        - The converted CSV paths.
+        """
+        converted = []
+        for episode_type in sorted(os.listdir(self.root)):
+            type_dir = os.path.join(self.root, episode_type)
+            if not os.path.isdir(type_dir):
+                continue
+            for name in sorted(os.listdir(type_dir)):
+                if not name.endswith(".csv"):
+                    continue
+                csv_path = os.path.join(type_dir, name)
+                seg_path = csv_path[: -len(".csv")] + ".seg"
+                if os.path.exists(seg_path) and os.path.getmtime(
+                    seg_path
+                ) >= os.path.getmtime(csv_path):
+                    continue
+                self.convert(csv_path, seg_path, compress)
+                self._open.pop(seg_path, None)
+                converted.append(csv_path)
+        return converted
@@ -0,0 +1,214 @@
+import os
+import io
+import re
+import sys
+import json
+import fnmatch
+import argparse
+import traceback
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from operate_filename import determine_episode_type_and_number, episode_id
+from BuildManifest import BuildManifest
+import stages as pipeline
+
+SOURCE_DIRS = ["markers", "json"]
+
+
+def list_episode_ids() -> dict:
+    """
+    Map the id of every episode with markers or a JSON to its (type, file stem).
+    """
+    ids = {}
+    for folder in SOURCE_DIRS:
+        if not os.path.isdir(folder):
+            continue
+        for episode_type in sorted(os.listdir(folder)):
+            type_dir = os.path.join(folder, episode_type)
+            if not os.path.isdir(type_dir):
+                continue
+            for filename in os.listdir(type_dir):
+                stem, ext = os.path.splitext(filename)
+                if ext in (".csv", ".json"):
+                    id_ = episode_id(episode_type, stem)
+                    ids.setdefault(id_, (episode_type, stem))
+    return ids
+
+
+def leading_number(number: str):
+    match = re.match(r"\d+", number or "")
+    return int(match.group()) if match else None
+
+
+def expand_specs(specs: list) -> list:
+    """
+    Expand command line specs into episode ids.
+
+    Accepted forms:
+    - `<type> <start>-<end>`: e.g. `concast 100-150`, inclusive, aftertalks included.
+    - `<type>`: every episode of that type.
+    - a glob over ids: e.g. `football-*`, `12-*`.
+    - a single id: e.g. `100`, `football-16-1`.
+    """
+    available = list_episode_ids()
+    episode_types = {episode_type for episode_type, _ in available.values()}
+    selected = []
+    i = 0
+    while i < len(specs):
+        spec = specs[i]
+        if spec in episode_types:
+            next_spec = specs[i + 1] if i + 1 < len(specs) else ""
+            bounds = re.fullmatch(r"(\d+)-(\d+)", next_spec)
+            if bounds:
+                low, high = map(int, bounds.groups())
+                i += 1
+            else:
+                low, high = None, None
+            for id_, (id_type, stem) in available.items():
+                if id_type != spec:
+                    continue
+                number = leading_number(stem)
+                if low is None or (number is not None and low <= number <= high):
+                    selected.append(id_)
+        elif any(c in spec for c in "*?["):
+            selected.extend(fnmatch.filter(available, spec))
+        else:
+            selected.append(spec)
+        i += 1
+
+    # keep the first occurrence, in natural order
+    unique = list(dict.fromkeys(selected))
+    return sorted(
+        unique,
+        key=lambda s: [int(c) if c.isdigit() else c for c in re.split(r"(\d+)", s)],
+    )
+
+
+def run_episode(id_: str, stages: list, force: bool = False) -> dict:
+    """
+    Run `stages` for one episode and never raise, so one bad episode cannot stop the batch.
+    """
+    report = {"episode": id_, "status": "ok", "stage": None, "error": None}
+    log = io.StringIO()
+    try:
+        episode_type, episode_number = determine_episode_type_and_number(id_)
+        manifest = BuildManifest(episode_type, episode_number)
+        with redirect_stdout(log):
+            for stage in stages:
+                report["stage"] = stage
+                manifest.run(stage, pipeline.load(stage), force=force)
+        report["stage"] = None
+    except SystemExit:
+        # create_episode_data exits on episodes that are already edited
+        report["status"] = "skipped"
+    except BaseException as e:
+        report["status"] = "failed"
+        report["error"] = f"{type(e).__name__}: {e}"
+        report["traceback"] = traceback.format_exc()
+    report["log"] = log.getvalue()
+    return report
+
+
+def warm_caches(stages: list) -> None:
+    """
+    Build the shared caches the stages read, so workers load them instead of
+    each compiling them from a cold start.
+    """
+    if any(stage in pipeline.MARKER_STAGES for stage in stages):
+        from MarkerStore import MarkerStore
+
+        MarkerStore.load()
+
+
+def run_batch(ids: list, stages: list, workers: int, force: bool = False) -> list:
+    reports = []
+    warm_caches(stages)
+    workers = max(1, min(workers, len(ids)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_episode, id_, stages, force) for id_ in ids]
+        for future in as_completed(futures):
+            report = future.result()
+            print(f"[{report['status']:<7}] {report['episode']}")
+            reports.append(report)
+    order = {id_: i for i, id_ in enumerate(ids)}
+    return sorted(reports, key=lambda r: order[r["episode"]])
+
+
+def print_summary(reports: list) -> None:
+    print("-" * 40)
+    for report in reports:
+        if report["status"] == "failed":
+            print(f"{report['episode']: <24}{report['stage']}: {report['error']}")
+    counts = {}
+    for report in reports:
+        counts[report["status"]] = counts.get(report["status"], 0) + 1
+    print(", ".join(f"{status}: {n}" for status, n in sorted(counts.items())))
+
+
+def validate(ids: list) -> bool:
+    """
+    Lint the JSONs of `ids` and print the errors.
+
+    Returns:
+    - True if there is no error.
+    """
+    from validate_catalog import CatalogValidator
+
+    issues = CatalogValidator().validate(set(ids))
+    errors = [issue for issue in issues if issue["level"] == "error"]
+    for issue in errors:
+        print(f"{issue['file']}: [{issue['code']}] {issue['message']}")
+    if errors:
+        print(f"{len(errors)} validation errors, nothing was run.")
+    return not errors
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the non-interactive pipeline stages over many episodes."
+    )
+    parser.add_argument(
+        "specs", nargs="+", help="e.g. `concast 100-150`, `football-*`"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=min(4, os.cpu_count() or 1), help="pool size"
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=[s for s in pipeline.REGISTRY if s not in pipeline.SIDE_EFFECTS],
+        default=pipeline.NON_INTERACTIVE,
+    )
+    parser.add_argument("--report", help="write the per-episode report as JSON")
+    parser.add_argument(
+        "--force", action="store_true", help="run stages even if up to date"
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="lint the selected episode JSONs first and stop on errors",
+    )
+    args = parser.parse_args()
+
+    ids = expand_specs(args.specs)
+    if not ids:
+        print("No episodes matched.")
+        sys.exit(1)
+    if args.validate and not validate(ids):
+        sys.exit(1)
+    print(f"{len(ids)} episodes, stages: {', '.join(args.stages)}")
+
+    reports = run_batch(ids, args.stages, args.workers, args.force)
+    print_summary(reports)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=4, ensure_ascii=False)
+
+    if any(report["status"] == "failed" for report in reports):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
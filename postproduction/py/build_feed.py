@@ -0,0 +1,364 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+from datetime import datetime, timezone, timedelta
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from IOManager import IOManager
+from DiskCache import DiskCache
+from BuildManifest import BuildManifest
+from EpisodeCatalog import EpisodeCatalog
+from EpisodeManager import EpisodeManager
+from operate_filename import episode_id
+
+FEED_DIR = "../feed"
+CONFIG_PATH = "feed_config.json"
+# Channel settings, read from CONFIG_PATH or the matching --<key> flag. There
+# are no defaults: `base_url` is where the contents of FEED_DIR (including
+# the channel image), episodes/ and photos/artwork/ are published.
+CHANNEL_KEYS = [
+    "base_url",
+    "title",
+    "link",
+    "description",
+    "author",
+    "language",
+    "category",
+]
+# published next to the feeds as <base_url>/concast.png
+CHANNEL_IMAGE = "../concast.png"
+# Starr key of the host; everybody else is tagged as a guest
+HOST = "Gota"
+TIMEZONE = timezone(timedelta(hours=9))
+ITEM_VERSION = 1
+# namespace UUID of Podcasting 2.0 <podcast:guid>
+PODCAST_GUID_NAMESPACE = uuid.UUID("ead4c236-bf58-58c6-a2c6-a6b28d128cb6")
+NAMESPACES = {
+    "itunes": "http://www.itunes.com/dtds/podcast-1.0.dtd",
+    "podcast": "https://podcastindex.org/namespace/1.0",
+}
+
+
+def load_channel(path=CONFIG_PATH, overrides=None) -> dict:
+    """
+    The channel settings of `path` with the non-empty `overrides` applied.
+
+    Raises:
+    - ValueError if a setting of CHANNEL_KEYS is missing.
+    """
+    channel = IOManager.read(path) if os.path.exists(path) else {}
+    channel.update({k: v for k, v in (overrides or {}).items() if v})
+    missing = [key for key in CHANNEL_KEYS if not channel.get(key)]
+    if missing:
+        raise ValueError(
+            f"missing feed settings: {', '.join(missing)} "
+            f"(set them in {path} or pass --{missing[0].replace('_', '-')})"
+        )
+    channel["base_url"] = channel["base_url"].rstrip("/")
+    return channel
+
+
+def publish_date(audio, path) -> datetime:
+    """
+    The recording date of the ID3 tag (TDRL, then TDRC), else the file's mtime.
+    """
+    for frame in ("TDRL", "TDRC"):
+        if audio.tags is not None and frame in audio.tags:
+            try:
+                date = datetime.fromisoformat(str(audio.tags[frame].text[0]))
+            except ValueError:
+                continue
+            return date if date.tzinfo else date.replace(tzinfo=TIMEZONE)
+    mtime = int(os.path.getmtime(path))
+    return datetime.fromtimestamp(mtime, TIMEZONE)
+
+
+def read_chapters(episode_type, episode_number):
+    """
+    Podcasting 2.0 chapters from the markers, or None without markers.
+    """
+    from MarkerStore import MarkerStore
+
+    try:
+        markers = MarkerStore.load().markers(episode_type, episode_number)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"no chapters for {episode_type} {episode_number}: {e}")
+        return None
+    markers = markers.sort_values("start_ms", kind="stable")
+    return {
+        "version": "1.2.0",
+        "chapters": [
+            {"startTime": int(start) / 1000, "title": name}
+            for start, name in zip(markers["start_ms"], markers["name"])
+        ],
+    }
+
+
+class FeedItem:
+    """
+    The feed entries of one episode, rendered from its JSON, MP3 and markers.
+
+    `render()` returns the RSS `<item>` fragment, the JSON Feed item and the
+    chapters. Only the MP3 headers are read (mutagen never decodes audio), and
+    the result is cached by the hash of the inputs, so an unchanged episode
+    costs a few stat calls and one small file read.
+    """
+
+    def __init__(self, episode_type, episode_number, base_url):
+        self.episode_type = episode_type
+        self.episode_number = episode_number
+        self.id = episode_id(episode_type, episode_number)
+        self.base_url = base_url
+        self.json_path = f"json/{episode_type}/{episode_number}.json"
+        self.markers_path = f"markers/{episode_type}/{episode_number}.csv"
+        self.mp3_path = f"../episodes/{episode_type}/{episode_number}.mp3"
+        self.artwork_path = (
+            f"../photos/artwork/podcast/{episode_type}/{episode_number}.jpg"
+        )
+
+    def url(self, path):
+        return f"{self.base_url}/{path}"
+
+    def key(self):
+        stat = os.stat(self.mp3_path)
+        return DiskCache.key(
+            ITEM_VERSION,
+            self.base_url,
+            BuildManifest.hash_file(self.json_path),
+            BuildManifest.hash_file(self.markers_path),
+            stat.st_size,
+            stat.st_mtime_ns,
+            os.path.exists(self.artwork_path),
+        )
+
+    def render(self, cache=None):
+        """
+        Returns:
+        - ({"date", "xml", "item", "chapters"}, whether it came from the cache).
+        """
+        cache = cache or DiskCache("feed", ".json")
+        key = self.key()
+        cached = cache.get(key)
+        if cached is not None:
+            return cached, True
+        rendered = self._render()
+        cache.put(key, rendered)
+        return rendered, False
+
+    def _render(self):
+        from mutagen.mp3 import MP3
+
+        data = IOManager.read(self.json_path)
+        EpisodeManager.validate_episode(data, self.episode_type, self.episode_number)
+        audio = MP3(self.mp3_path)
+        date = publish_date(audio, self.mp3_path)
+        duration = int(round(audio.info.length))
+        size = os.path.getsize(self.mp3_path)
+        title = EpisodeManager.format_title(data)
+        description = EpisodeManager.format_comments_sns(data.get("Topics", []))
+        people = list(data.get("Starr", {}).items())
+        t, n = self.episode_type, self.episode_number
+        enclosure = self.url(f"episodes/{t}/{n}.mp3")
+        chapters = read_chapters(t, n)
+        image = self.url(f"artwork/podcast/{t}/{n}.jpg")
+        has_image = os.path.exists(self.artwork_path)
+
+        lines = [
+            "<item>",
+            f"<title>{escape(title)}</title>",
+            f'<guid isPermaLink="false">{escape(self.id)}</guid>',
+            f"<pubDate>{format_datetime(date)}</pubDate>",
+            f"<description>{escape(description)}</description>",
+            f"<enclosure url={quoteattr(enclosure)} length=\"{size}\" "
+            'type="audio/mpeg"/>',
+            f"<itunes:duration>{duration}</itunes:duration>",
+            "<itunes:author>"
+            f"{escape(', '.join(name for _, name in people))}</itunes:author>",
+        ]
+        if data["Number"].isdecimal():
+            lines.append(f"<itunes:episode>{data['Number']}</itunes:episode>")
+        if has_image:
+            lines.append(f"<itunes:image href={quoteattr(image)}/>")
+        if chapters:
+            chapters_url = self.url(f"chapters/{t}/{n}.json")
+            lines.append(
+                f"<podcast:chapters url={quoteattr(chapters_url)} "
+                'type="application/json+chapters"/>'
+            )
+        for short_name, name in people:
+            role = "host" if short_name == HOST else "guest"
+            lines.append(
+                f'<podcast:person role="{role}">{escape(name)}</podcast:person>'
+            )
+        lines.append("</item>")
+
+        item = {
+            "id": self.id,
+            "title": title,
+            "content_text": description,
+            "date_published": date.isoformat(),
+            "authors": [{"name": name} for _, name in people],
+            "attachments": [
+                {
+                    "url": enclosure,
+                    "mime_type": "audio/mpeg",
+                    "size_in_bytes": size,
+                    "duration_in_seconds": duration,
+                }
+            ],
+        }
+        if has_image:
+            item["image"] = image
+        return {
+            "date": date.isoformat(),
+            "xml": "\n".join(lines),
+            "item": item,
+            "chapters": chapters,
+        }
+
+
+def write_rss(path, items, channel):
+    """
+    Stream the channel header, the cached item fragments and the footer.
+    """
+    base_url = channel["base_url"]
+    feed_url = f"{base_url}/rss.xml"
+    guid = uuid.uuid5(PODCAST_GUID_NAMESPACE, feed_url.split("://", 1)[-1])
+    namespaces = " ".join(f"xmlns:{k}={quoteattr(v)}" for k, v in NAMESPACES.items())
+    last_build = ""
+    if items:
+        last_build = format_datetime(datetime.fromisoformat(items[0]["date"]))
+    header = f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" {namespaces}>
+<channel>
+<title>{escape(channel["title"])}</title>
+<link>{escape(channel["link"])}</link>
+<description>{escape(channel["description"])}</description>
+<language>{escape(channel["language"])}</language>
+<lastBuildDate>{last_build}</lastBuildDate>
+<itunes:author>{escape(channel["author"])}</itunes:author>
+<itunes:image href={quoteattr(f"{base_url}/concast.png")}/>
+<itunes:category text={quoteattr(channel["category"])}/>
+<itunes:explicit>false</itunes:explicit>
+<podcast:guid>{guid}</podcast:guid>
+"""
+    with IOManager.open_writer(path) as f:
+        f.write(header.encode("utf-8"))
+        for item in items:
+            f.write(item["xml"].encode("utf-8"))
+            f.write(b"\n")
+        f.write(b"</channel>\n</rss>\n")
+
+
+def write_json_feed(path, items, channel):
+    """
+    Stream a JSON Feed 1.1 document one item at a time.
+    """
+    base_url = channel["base_url"]
+    head = {
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": channel["title"],
+        "home_page_url": channel["link"],
+        "feed_url": f"{base_url}/feed.json",
+        "description": channel["description"],
+        "icon": f"{base_url}/concast.png",
+        "language": channel["language"],
+        "authors": [{"name": channel["author"]}],
+    }
+    with IOManager.open_writer(path) as f:
+        f.write(json.dumps(head, ensure_ascii=False)[:-1] + ', "items": [\n')
+        for i, item in enumerate(items):
+            f.write(",\n" if i else "")
+            f.write(json.dumps(item["item"], ensure_ascii=False))
+        f.write("\n]}\n")
+
+
+def build_feed(channel, feed_dir=FEED_DIR):
+    """
+    Write rss.xml, feed.json, concast.png and chapters/<type>/<n>.json into
+    `feed_dir`, with the settings of `channel` (see `load_channel`).
+
+    Every episode with an MP3 becomes an item, newest first. Items are taken
+    from the cache when their inputs did not change; chapter files are only
+    rewritten when their content changed.
+
+    Returns:
+    - {"items", "cached", "skipped": [ids without MP3], "failed": {id: error}}.
+    """
+    if not os.path.exists(CHANNEL_IMAGE):
+        raise FileNotFoundError(f"channel image {CHANNEL_IMAGE} not found.")
+    base_url = channel["base_url"]
+    catalog = EpisodeCatalog.load()
+    cache = DiskCache("feed", ".json")
+    rendered, report = [], {"items": 0, "cached": 0, "skipped": [], "failed": {}}
+    for path in sorted(catalog.entries, key=catalog.rank.__getitem__):
+        episode_type = catalog.entries[path]["type"]
+        episode_number = os.path.splitext(os.path.basename(path))[0]
+        item = FeedItem(episode_type, episode_number, base_url)
+        if not os.path.exists(item.mp3_path):
+            report["skipped"].append(item.id)
+            continue
+        try:
+            entry, cached = item.render(cache)
+        except Exception as e:
+            report["failed"][item.id] = f"{type(e).__name__}: {e}"
+            continue
+        report["cached"] += cached
+        rendered.append(entry)
+        if entry["chapters"]:
+            chapters_path = os.path.join(
+                feed_dir, "chapters", episode_type, f"{episode_number}.json"
+            )
+            IOManager.write_if_changed(entry["chapters"], chapters_path)
+
+    rendered.sort(key=lambda entry: entry["date"], reverse=True)
+    report["items"] = len(rendered)
+    IOManager.exist_or_mkdir([feed_dir])
+    IOManager.write_if_changed(
+        IOManager.read(CHANNEL_IMAGE), os.path.join(feed_dir, "concast.png")
+    )
+    write_rss(os.path.join(feed_dir, "rss.xml"), rendered, channel)
+    write_json_feed(os.path.join(feed_dir, "feed.json"), rendered, channel)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate the podcast RSS feed, JSON Feed and chapter files."
+    )
+    parser.add_argument("--out", default=FEED_DIR, help="output directory")
+    parser.add_argument(
+        "--config", default=CONFIG_PATH, help="JSON file with the channel settings"
+    )
+    for key in CHANNEL_KEYS:
+        parser.add_argument(f"--{key.replace('_', '-')}", help=f"channel {key}")
+    args = parser.parse_args()
+
+    try:
+        channel = load_channel(
+            args.config, {key: getattr(args, key) for key in CHANNEL_KEYS}
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    report = build_feed(channel, args.out)
+    for id_, error in report["failed"].items():
+        print(f"{id_: <24}{error}")
+    print(
+        f"{report['items']} items ({report['cached']} cached), "
+        f"{len(report['skipped'])} without MP3, {len(report['failed'])} failed "
+        f"({time.perf_counter() - start:.1f}s)"
+    )
+    if report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
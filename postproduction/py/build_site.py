@@ -0,0 +1,209 @@
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from IOManager import IOManager
+from HTMLBuilder import HTMLBuilder
+from EpisodeManager import EpisodeManager
+from EpisodeCatalog import EpisodeCatalog
+from operate_filename import episode_id
+
+SITE_DIR = "../site"
+# pages written by the last build, relative to the site root; only these are pruned
+OUTPUT_MANIFEST = ".build-manifest.json"
+
+
+def render_episode(episode_type: str, episode_number: str, related: list) -> str:
+    """
+    The page of one episode: topics, references and related episodes.
+
+    `related` is a list of (href, label) pairs, best first.
+    """
+    data = IOManager.read(f"json/{episode_type}/{episode_number}.json")
+    EpisodeManager.validate_episode(data, episode_type, episode_number)
+
+    body = []
+    if data.get("Topics"):
+        comments = EpisodeManager.format_comments(data["Topics"])
+        body.append(HTMLBuilder.create_header_html(comments))
+    body.append(HTMLBuilder.create_references_html(data.get("References", {})))
+    if related:
+        links = [
+            {"link": HTMLBuilder.create_link_item(href, label)}
+            for href, label in related
+        ]
+        body.append(HTMLBuilder.generate_related_episodes_header())
+        body.append(HTMLBuilder.generate_related_episodes_list(links))
+    return HTMLBuilder.create_page(
+        EpisodeManager.format_title(data),
+        "\n".join(body),
+        root="..",
+        breadcrumb=[("index.html", episode_type)],
+    )
+
+
+def render_index(title: str, items: list, root=".", breadcrumb=()) -> str:
+    links = [HTMLBuilder.create_link_item(href, label) for href, label in items]
+    body = "<ul>\n" + "\n".join(links) + "\n</ul>"
+    return HTMLBuilder.create_page(title, body, root, breadcrumb)
+
+
+def build_page(job):
+    """
+    Render one episode page and write it if it changed; never raises.
+
+    Returns:
+    - (path, "written" | "unchanged" | "failed", error or None).
+    """
+    episode_type, episode_number, related, path = job
+    try:
+        html = render_episode(episode_type, episode_number, related)
+        status = IOManager.write_if_changed(html.encode("utf-8"), path)
+        return path, "unchanged" if status == "unchanged" else "written", None
+    except Exception as e:
+        return path, "failed", f"{type(e).__name__}: {e}"
+
+
+def related_links(ranker, pages, episode_type, episode_number, n):
+    """
+    Returns:
+    - (href, label) pairs of the `n` most related episodes that have a page.
+    """
+    if ranker is None or n <= 0:
+        return []
+    return [
+        (f"../{pages[entry['id']]}", f"[#{entry['number']}] {entry['title']}")
+        for entry in ranker.related(episode_type, episode_number, n)
+        if entry["id"] in pages
+    ]
+
+
+def build_site(site_dir=SITE_DIR, workers=None, n_related=10, prune=True):
+    """
+    Render every episode page plus the index pages into `site_dir`.
+
+    Related episodes are ranked once here; the pages are rendered on a
+    process pool and only pages whose bytes changed are rewritten. With
+    `prune`, pages an earlier build recorded in `OUTPUT_MANIFEST` but this
+    one did not produce are removed; other files are never touched. A page
+    whose related episodes cannot be ranked is written without them and
+    reported under "failed".
+
+    Returns:
+    - {"written": [...], "unchanged": [...], "removed": [...], "failed": {...}}.
+    """
+    catalog = EpisodeCatalog.load()
+    ranker = None
+    related_errors = {}
+    if n_related > 0:
+        from EpisodeRanker import EpisodeRanker
+
+        try:
+            ranker = EpisodeRanker.load()
+        except Exception as e:
+            related_errors[EpisodeRanker.TABLE_PATH] = f"{type(e).__name__}: {e}"
+
+    episodes = []
+    for path in sorted(catalog.entries, key=catalog.rank.__getitem__):
+        episode_number = os.path.splitext(os.path.basename(path))[0]
+        episodes.append((catalog.entries[path], episode_number))
+    # episode id -> page path relative to the site root
+    pages = {
+        episode_id(entry["type"], number): f"{entry['type']}/{number}.html"
+        for entry, number in episodes
+    }
+
+    jobs, by_type = [], {}
+    for entry, episode_number in episodes:
+        episode_type = entry["type"]
+        page = os.path.join(site_dir, episode_type, f"{episode_number}.html")
+        try:
+            related = related_links(
+                ranker, pages, episode_type, episode_number, n_related
+            )
+        except Exception as e:
+            related = []
+            related_errors[page] = f"related episodes: {type(e).__name__}: {e}"
+        jobs.append((episode_type, episode_number, related, page))
+        data = {"Number": entry["number"], "Title": entry["title"]}
+        title = EpisodeManager.format_title(dict(data, Starr=entry["starrs"]))
+        by_type.setdefault(episode_type, []).append((f"{episode_number}.html", title))
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(build_page, jobs, chunksize=16))
+    else:
+        outcomes = [build_page(job) for job in jobs]
+
+    types = [(f"{t}/index.html", f"{t} ({len(items)})") for t, items in by_type.items()]
+    indexes = [(os.path.join(site_dir, "index.html"), render_index("concast", types))]
+    for episode_type, items in by_type.items():
+        html = render_index(episode_type, items, "..", [(None, episode_type)])
+        indexes.append((os.path.join(site_dir, episode_type, "index.html"), html))
+    for path, html in indexes:
+        status = IOManager.write_if_changed(html.encode("utf-8"), path)
+        status = "unchanged" if status == "unchanged" else "written"
+        outcomes.append((path, status, None))
+
+    results = {"written": [], "unchanged": [], "removed": [], "failed": {}}
+    for path, status, error in outcomes:
+        if status == "failed":
+            results["failed"][path] = error
+        else:
+            results[status].append(path)
+    for path, error in related_errors.items():
+        results["failed"].setdefault(path, error)
+
+    manifest_path = os.path.join(site_dir, OUTPUT_MANIFEST)
+    previous = IOManager.read(manifest_path) if os.path.exists(manifest_path) else []
+    generated = sorted(
+        os.path.relpath(path, site_dir)
+        for path, status, _ in outcomes
+        if status != "failed" or os.path.exists(path)
+    )
+    if prune:
+        # never touch files this build did not produce itself
+        for relpath in sorted(set(previous) - set(generated)):
+            path = os.path.join(site_dir, relpath)
+            if os.path.exists(path):
+                os.remove(path)
+                results["removed"].append(path)
+    else:
+        generated = sorted(set(generated) | set(previous))
+    if generated != previous:
+        IOManager.save(generated, manifest_path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render the episode pages and index pages of the site."
+    )
+    parser.add_argument("--out", default=SITE_DIR, help="output directory")
+    parser.add_argument("--workers", type=int, default=None, help="pool size")
+    parser.add_argument(
+        "--related", type=int, default=10, help="related episodes per page"
+    )
+    parser.add_argument(
+        "--keep-stale", action="store_true", help="keep pages of deleted episodes"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = build_site(args.out, args.workers, args.related, not args.keep_stale)
+    for path, error in results["failed"].items():
+        print(f"{path}: {error}")
+    print(
+        f"{len(results['written'])} written, {len(results['unchanged'])} unchanged, "
+        f"{len(results['removed'])} removed, {len(results['failed'])} failed "
+        f"({time.perf_counter() - start:.1f}s)"
+    )
+    if results["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from IOManager import IOManager
+
+CACHE_PATH = "cache/links.json"
+TTL = 7 * 24 * 3600
+TIMEOUT = (5, 15)
+# statuses some servers answer HEAD with although GET works
+HEAD_UNSUPPORTED = {403, 404, 405, 501}
+# 429 Too Many Requests: retried after Retry-After (capped), never "broken"
+RATE_LIMITED = 429
+RATE_LIMIT_RETRIES = 2
+MAX_RETRY_AFTER = 30
+
+
+class LinkChecker:
+    """
+    Checks URLs concurrently, at most `per_host` requests to one host at a time.
+
+    Each URL gets a HEAD first and a streamed GET (body never read) when the
+    server refuses HEAD. Working links are cached with their ETag and
+    Last-Modified; once older than `ttl` they are revalidated with a
+    conditional request, so an unchanged page costs a 304. Broken links are
+    always checked again. A host answering 429 is retried after its
+    Retry-After; if it keeps refusing, the link is reported as rate-limited
+    and its cached entry is left as it was.
+    """
+
+    def __init__(self, workers=16, per_host=2, ttl=TTL, cache_path=CACHE_PATH):
+        self.workers = workers
+        self.per_host = per_host
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self.cache = IOManager.read(cache_path) if os.path.exists(cache_path) else {}
+        self.hosts = {}
+        self.hosts_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = "Mozilla/5.0 (compatible; concast-links)"
+
+    def host_semaphore(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self.hosts_lock:
+            if host not in self.hosts:
+                self.hosts[host] = threading.Semaphore(self.per_host)
+            return self.hosts[host]
+
+    def request(self, method, url, headers):
+        response = self.session.request(
+            method,
+            url,
+            headers=headers,
+            timeout=TIMEOUT,
+            allow_redirects=True,
+            stream=method == "GET",
+        )
+        response.close()
+        return response
+
+    @staticmethod
+    def retry_after(response, attempt):
+        value = response.headers.get("Retry-After", "")
+        seconds = int(value) if value.isdigit() else 2**attempt
+        return min(seconds, MAX_RETRY_AFTER)
+
+    def fetch(self, url, headers):
+        """
+        HEAD (GET when refused) `url`, retrying while the host rate-limits us.
+        """
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            response = self.request("HEAD", url, headers)
+            if response.status_code in HEAD_UNSUPPORTED:
+                response = self.request("GET", url, headers)
+            if response.status_code != RATE_LIMITED or attempt == RATE_LIMIT_RETRIES:
+                return response
+            # still holding the host semaphore, so the whole host backs off
+            time.sleep(self.retry_after(response, attempt))
+
+    def check(self, url, refresh=False):
+        """
+        Check one URL, using the cached result when it is still fresh.
+
+        Returns:
+        - The cache entry: {"ok", "status", "error", "final_url", "etag",
+          "last_modified", "checked"}, or {"ok", "rate_limited", "status",
+          "error", "checked"} when the host kept answering 429.
+        """
+        entry = self.cache.get(url)
+        now = time.time()
+        if entry and entry["ok"] and not refresh and now - entry["checked"] < self.ttl:
+            return entry
+
+        headers = {}
+        if entry and entry["ok"] and not refresh:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        with self.host_semaphore(url):
+            try:
+                response = self.fetch(url, headers)
+            except requests.RequestException as e:
+                return {
+                    "ok": False,
+                    "status": None,
+                    "error": f"{type(e).__name__}: {e}",
+                    "checked": now,
+                }
+
+        if response.status_code == 304 and entry:
+            return dict(entry, checked=now)
+        if response.status_code == RATE_LIMITED:
+            return {
+                "ok": False,
+                "rate_limited": True,
+                "status": response.status_code,
+                "error": "rate limited",
+                "checked": now,
+            }
+        return {
+            "ok": response.status_code < 400,
+            "status": response.status_code,
+            "error": None if response.status_code < 400 else response.reason,
+            "final_url": response.url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "checked": now,
+        }
+
+    def check_all(self, urls, refresh=False):
+        """
+        Check every URL once and persist the cache.
+
+        Returns:
+        - {url: cache entry}.
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self.check, url, refresh): url
+                for url in dict.fromkeys(urls)
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        # a rate-limited check says nothing about the link: keep what we knew
+        self.cache.update(
+            {url: e for url, e in results.items() if not e.get("rate_limited")}
+        )
+        IOManager.exist_or_mkdir([os.path.dirname(self.cache_path)])
+        IOManager.save(self.cache, self.cache_path)
+        return results
+
+
+def collect_references(ids, available):
+    """
+    Gather the http(s) References of the episodes, deduplicated by URL.
+
+    `available` maps episode ids to their (type, file stem), as returned by
+    `batch.list_episode_ids`; ids without an episode JSON are skipped.
+
+    Returns:
+    - ({url: [(episode id, title), ...]}, [skipped episode ids]).
+    """
+    references, skipped = {}, []
+    for id_ in ids:
+        episode_type, stem = available.get(id_, (None, None))
+        path = f"json/{episode_type}/{stem}.json"
+        if episode_type is None or not os.path.exists(path):
+            skipped.append(id_)
+            continue
+        for title, url in IOManager.read(path).get("References", {}).items():
+            if urlsplit(url).scheme in ("http", "https"):
+                references.setdefault(url, []).append((id_, title))
+    return references, skipped
+
+
+def broken_by_episode(references, results):
+    """
+    Returns:
+    - {episode id: [{"title", "url", "status", "error"}, ...]} in `references` order.
+    """
+    report = {}
+    for url, uses in references.items():
+        result = results[url]
+        if result["ok"] or result.get("rate_limited"):
+            continue
+        for id_, title in uses:
+            report.setdefault(id_, []).append(
+                {
+                    "title": title,
+                    "url": url,
+                    "status": result["status"],
+                    "error": result["error"],
+                }
+            )
+    return report
+
+
+def main():
+    from batch import expand_specs, list_episode_ids
+
+    parser = argparse.ArgumentParser(
+        description="Check that the References of the episodes still resolve."
+    )
+    parser.add_argument("specs", nargs="*", help="default: every episode")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument(
+        "--per-host", type=int, default=2, help="concurrent requests per host"
+    )
+    parser.add_argument("--ttl-days", type=float, default=TTL / 86400)
+    parser.add_argument("--refresh", action="store_true", help="ignore the cache")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    available = list_episode_ids()
+    ids = expand_specs(args.specs or list(available))
+    references, skipped = collect_references(ids, available)
+    for id_ in skipped:
+        print(f"skipped {id_}: no episode JSON", file=sys.stderr)
+    checker = LinkChecker(args.workers, args.per_host, args.ttl_days * 86400)
+    start = time.perf_counter()
+    results = checker.check_all(references, args.refresh)
+    report = broken_by_episode(references, results)
+
+    if args.json:
+        print(json.dumps(report, indent=4, ensure_ascii=False))
+    else:
+        for id_, links in report.items():
+            print(id_)
+            for link in links:
+                print(f"\t{link['status'] or '---'} {link['title']}: {link['url']}")
+                if link["error"]:
+                    print(f"\t    {link['error']}")
+        limited = [url for url, result in results.items() if result.get("rate_limited")]
+        for url in limited:
+            print(f"rate limited: {url}")
+        broken = sum(not result["ok"] for result in results.values()) - len(limited)
+        print(
+            f"{len(references)} links in {len(ids)} episodes, {broken} broken, "
+            f"{len(limited)} rate limited ({time.perf_counter() - start:.1f}s)"
+        )
+    if report:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
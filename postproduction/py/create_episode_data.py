@@ -1,7 +1,14 @@
 from dotenv import load_dotenv
 import os
 import sys
+import asyncio
+import argparse
 from IOManager import IOManager
+from MarkerStore import MarkerStore
+from DiskCache import DiskCache
+from RetryPolicy import RetryPolicy
+from TokenBucket import TokenBucket
+from OpenAIBackend import OpenAIChatBackend
 from operate_filename import determine_episode_type_and_number
 
 import openai
@@ -9,33 +16,57 @@ import openai
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+MODEL = "gpt-3.5-turbo-0613"
+SYSTEM_PROMPT = "You are a professional podcast editor."
+USER_PROMPT = "I have a podcast episode memo. Please read and summarize it in a list format using main points and themes in JAPANESE. This will be captivating the potential listeners. The number of items should be 5 at most. Each item should contain a keyword, possibly with a verb if appropriate, and start with an emoji to represent it. DO NOT IN ANY CIRCUMSTANCES WRITE ANYTHING ELSE. Here's the memo:"
 
-def create_topics_from_markers(markers):
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo-0613",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a professional podcast editor.",
-            },
-            {
-                "role": "user",
-                "content": f"I have a podcast episode memo. Please read and summarize it in a list format using main points and themes in JAPANESE. This will be captivating the potential listeners. The number of items should be 5 at most. Each item should contain a keyword, possibly with a verb if appropriate, and start with an emoji to represent it. DO NOT IN ANY CIRCUMSTANCES WRITE ANYTHING ELSE. Here's the memo:{markers}",
-            },
-        ],
+
+def topics_key(backend, markers) -> str:
+    return DiskCache.key(
+        backend.name, SYSTEM_PROMPT, USER_PROMPT, DiskCache.key(*markers)
     )
-    return response.choices[0].message.content.split("\n")
+
+
+async def agenerate_topics(markers, backend=None, cache=None, retry=None, limiter=None):
+    """
+    Topics for `markers`, from the cache or else from the chat API.
+
+    Replies are cached by model, prompt and markers as soon as they arrive,
+    before any episode JSON is written, so a crash never loses a paid call.
+    """
+    backend = backend or OpenAIChatBackend(MODEL)
+    cache = cache or DiskCache("topics", ".json")
+    retry = retry or RetryPolicy()
+
+    key = topics_key(backend, markers)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached["topics"]
+
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"{USER_PROMPT}{markers}"},
+    ]
+
+    async def complete():
+        if limiter is not None:
+            await limiter.acquire()
+        return await backend.complete(messages)
+
+    topics = (await retry.run(complete)).split("\n")
+    cache.put(key, {"model": backend.name, "topics": topics})
+    return topics
+
+
+def create_topics_from_markers(markers):
+    return asyncio.run(agenerate_topics(markers))
 
 
 def get_json_file(path, template_path="json/template.json"):
     """
     Retrieve JSON data from a file or fall back to a template if the file doesn't exist.
     """
-    return (
-        IOManager.read_json(path)
-        if os.path.exists(path)
-        else IOManager.read_json(template_path)
-    )
+    return IOManager.read(path if os.path.exists(path) else template_path)
 
 
 def manage_episode_data(episode_type, episode_number, markers):
@@ -56,28 +87,88 @@ def manage_episode_data(episode_type, episode_number, markers):
         print(f"Episode {episode_number} is already edited.")
         sys.exit()
 
+    topics = create_topics_from_markers(markers)
+    return fill_episode_data(episode_data, episode_type, episode_number, topics)
+
+
+def fill_episode_data(episode_data, episode_type, episode_number, topics):
     episode_data["Number"] = episode_number
     episode_data["Genre"] = episode_type
-    episode_data["Topics"].extend(create_topics_from_markers(markers))
+    episode_data["Topics"].extend(topics)
     episode_data["Edited"] = True
 
     return episode_data
 
 
-def get_markers(path):
+def get_markers(episode_type, episode_number):
     """
-    Extract markers from a CSV file.
+    Marker names of an episode, from the marker store.
     """
-    return IOManager.read_csv(path, sep="\t")["Name"].tolist()
+    markers = MarkerStore.load().markers(episode_type, episode_number)
+    return markers["name"].tolist()
 
 
 def process(episode_type, episode_number):
-    markers = get_markers(f"markers/{episode_type}/{episode_number}.csv")
+    markers = get_markers(episode_type, episode_number)
     episode_data = manage_episode_data(episode_type, episode_number, markers)
     print(episode_data)
-    IOManager.save_to_json(episode_data, f"json/{episode_type}/{episode_number}.json")
+    IOManager.save(episode_data, f"json/{episode_type}/{episode_number}.json")
+
+
+async def generate_catalog(ids, concurrency=4, requests_per_minute=60, backend=None):
+    """
+    Fill the topics of many episodes, `concurrency` API calls at a time.
+
+    Returns:
+    - {episode id: "done", "cached", "skipped" (already edited) or the error}.
+    """
+    backend = backend or OpenAIChatBackend(MODEL)
+    cache, retry = DiskCache("topics", ".json"), RetryPolicy()
+    limiter = TokenBucket.per_minute(requests_per_minute, burst=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(id_):
+        try:
+            episode_type, episode_number = determine_episode_type_and_number(id_)
+            path = f"json/{episode_type}/{episode_number}.json"
+            episode_data = get_json_file(path)
+            if episode_data.get("Edited", False):
+                return id_, "skipped"
+            markers = get_markers(episode_type, episode_number)
+            cached = cache.get(topics_key(backend, markers))
+            async with semaphore:
+                topics = await agenerate_topics(
+                    markers, backend, cache, retry, limiter
+                )
+            fill_episode_data(episode_data, episode_type, episode_number, topics)
+            IOManager.save(episode_data, path)
+            return id_, "done" if cached is None else "cached"
+        except Exception as e:
+            return id_, f"{type(e).__name__}: {e}"
+
+    return dict(await asyncio.gather(*(one(id_) for id_ in ids)))
 
 
 if __name__ == "__main__":
-    episode_type, episode_number = determine_episode_type_and_number(sys.argv[1])
-    process(episode_type, episode_number)
+    from batch import expand_specs
+
+    parser = argparse.ArgumentParser(
+        description="Add AI-generated topics to the episode JSONs."
+    )
+    parser.add_argument("specs", nargs="+", help="e.g. `100`, `concast 100-150`")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--rpm", type=float, default=60, help="API requests per minute"
+    )
+    args = parser.parse_args()
+
+    ids = expand_specs(args.specs)
+    if len(ids) == 1:
+        process(*determine_episode_type_and_number(ids[0]))
+        sys.exit()
+
+    results = asyncio.run(generate_catalog(ids, args.concurrency, args.rpm))
+    for id_, result in results.items():
+        print(f"{id_: <24}{result}")
+    if any(r not in ("done", "cached", "skipped") for r in results.values()):
+        sys.exit(1)
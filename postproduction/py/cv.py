@@ -1,13 +1,21 @@
 import os
-import sys
+import re
 import json
+import zlib
+import argparse
 
 import cv2
 import numpy as np
 from typing import List, Tuple, Optional
+from IOManager import IOManager
+from IconCache import IconCache
+from Compositor import Compositor
 from operate_filename import determine_episode_type_and_number
 from ROISquareSelector import ROISquareSelector
 
+BASE_SIZE = Compositor.BASE_SIZE
+HOST = "Gota"
+
 
 class ConcastImageEditor:
     def __init__(
@@ -21,6 +29,8 @@ class ConcastImageEditor:
         self.parent_folder: str = parent_folder
         self.episode_type: str = episode_type
         self.episode_number: Optional[str] = episode_number
+        # crop selected in this session, stored once the result is confirmed
+        self.picked_roi: Optional[Tuple[int, int, int]] = None
         self.podcast_icon_path: str = os.path.join(self.parent_folder, "concast.png")
 
         self.episode_image_path: str = os.path.join(
@@ -51,40 +61,14 @@ class ConcastImageEditor:
         with open(path) as f:
             return json.load(f)["Starr"].keys()
 
-    @staticmethod
-    def get_icon(path: str, resolution: int = 128**2) -> np.ndarray:
-        print(path)
-        icon: np.ndarray = cv2.imread(path)
-        h, w, _ = icon.shape
-        scale: float = (resolution / (h * w)) ** 0.5
-        return cv2.resize(icon, None, fx=scale, fy=scale)
-
-    @staticmethod
-    def reverse_image(im: np.ndarray, mask: np.ndarray, reverse: bool) -> np.ndarray:
-        if reverse:
-            mask = im | mask
-            im |= mask
-            return 255 - im
-        return im & mask
-
     def check_paths(self) -> None:
         for name in ["parent_folder", "json_file", "episode_image_path"]:
             path = getattr(self, name)
             assert self.path_exists(path), f"path for `{name}`` not found: {path}"
 
-    def crop_circle(self, im: np.ndarray, reverse: bool = False) -> np.ndarray:
-        """正方形に画像をクロップ"""
-        h = im.shape[0]
-
-        center: int = int(h / 2)
-        mask: np.ndarray = np.zeros(im.shape, np.uint8)
-        cv2.circle(
-            mask, (center, center), radius=center, color=(255, 255, 255), thickness=-1
-        )
-
-        return self.reverse_image(im, mask, reverse)
-
-    def get_starr_images(self, host: str) -> List[np.ndarray]:
+    def get_starr_images(
+        self, host: str, resolution: int = 128**2
+    ) -> List[np.ndarray]:
         parent_folder: str = self.parent_folder
         json_file: str = self.json_file
 
@@ -94,15 +78,17 @@ class ConcastImageEditor:
 
         for starr in starrs:
             if starr == host:
-                starr += f"-{np.random.randint(1, 3)}"
+                # stable per episode, so re-rendering gives the same image
+                variant = zlib.crc32(str(self.episode_number).encode()) % 2 + 1
+                starr += f"-{variant}"
 
             icon_path: str = os.path.join(
                 parent_folder, f"photos/starrings/{starr}.jpg"
             )
             assert self.path_exists(json_file), f"path not found: {json_file}"
 
-            icon: np.ndarray = self.get_icon(icon_path)
-            icon: np.ndarray = self.crop_circle(icon)
+            # circle-masked BGRA, decoded once and then served from the cache
+            icon: np.ndarray = IconCache.load().get(icon_path, resolution)
             starr_images.append(icon)
         return starr_images
 
@@ -113,117 +99,172 @@ class ConcastImageEditor:
         selector = ROISquareSelector()
         return selector.select_roi(image)
 
-    def overlay_white_rectangle(
-        self, image: np.ndarray, x: int, y: int, size: int, alpha: float
-    ) -> np.ndarray:
+    def load_roi(self) -> Optional[Tuple[int, int, int]]:
         """
-        Overlay a semi-transparent white rectangle on a region of the image.
+        The square crop (x, y, size) stored in the episode JSON, if any.
         """
-        overlay = image.copy()
-        cv2.rectangle(
-            overlay, (x, y), (x + size, y + size), (255, 255, 255), cv2.FILLED
-        )
-        return cv2.addWeighted(overlay, alpha, image, 1 - alpha, 0)
-
-    def crop_episode_image_to_square(
-        self, episode_image: np.ndarray, podcast_icon_path: str, alpha: float = 0.3
-    ) -> np.ndarray:
-        # Constants
-        ICON_OFFSET_Y = 20
-        ICON_OFFSET_X = 30
-
-        # Get user-selected ROI and determine the square size
-        x, y, w, h = self.get_user_selected_roi(episode_image)
-        size: int = min(w, h)
+        roi = IOManager.read(self.json_file).get("ROI")
+        return tuple(roi) if roi else None
 
-        # Apply white rectangle overlay to the selected square region
-        episode_image = self.overlay_white_rectangle(episode_image, x, y, size, alpha)
-
-        # Crop the image to the selected square region
-        cropped_image = episode_image[y : y + size, x : x + size]
-
-        # resize
-        resized_image = cv2.resize(cropped_image, (1080, 1080))
-
-        # Add the podcast icon to the cropped image
-        concast_icon: np.ndarray = self.get_icon(podcast_icon_path)
-        resized_image[
-            -(ICON_OFFSET_Y + concast_icon.shape[0]) : -ICON_OFFSET_Y,
-            ICON_OFFSET_X : ICON_OFFSET_X + concast_icon.shape[1],
-        ] = concast_icon
-
-        return resized_image
-
-    def _add_single_starr_icon(
-        self,
-        image: np.ndarray,
-        starr: np.ndarray,
-        index: int,
-        start_x: int,
-        start_y: int,
-        step: int,
-    ) -> np.ndarray:
+    def save_roi(self, roi: Tuple[int, int, int]) -> None:
         """
-        Add a single starr icon to the image.
+        Store the crop in the episode JSON by patching only its `"ROI"` value,
+        so the hand-edited file keeps its indentation and key order.
         """
-        # Check if the starr image is square
-        if starr.shape[0] != starr.shape[1]:
-            raise ValueError(
-                f"starr icon has to be square ({starr.shape[0]}!={starr.shape[1]})"
-            )
-
-        # Determine the region of interest (ROI) in the main image where the starr image will be placed
-        y_end = -(start_y)
-        y_start = y_end - starr.shape[0]
-        x_end = -(start_x + step * index)
-        x_start = x_end - starr.shape[1]
-
-        roi = image[y_start:y_end, x_start:x_end]
+        value = json.dumps([int(v) for v in roi])
+        with open(self.json_file, "r", encoding="utf-8", newline="") as f:
+            text = f.read()
 
-        # Prepare the starr image and combine it with the corresponding ROI
-        cropped_mask = self.crop_circle(starr.copy(), reverse=True)
-        masked_roi = cv2.bitwise_and(roi, cropped_mask)
-        combined_roi = cv2.bitwise_or(masked_roi, starr)
+        pattern = r'("ROI"\s*:\s*)(?:null|\[[^\]]*\])'
+        if re.search(pattern, text):
+            patched = re.sub(pattern, lambda m: m.group(1) + value, text, count=1)
+        else:
+            # new key after the last one, indented like the other keys
+            indent = re.findall(r'\n([ \t]*)"', text)
+            end = text.rindex("}")
+            body = text[:end].rstrip()
+            newline = "\r\n" if "\r\n" in text else "\n"
+            patched = (
+                f"{body},{newline}{indent[-1] if indent else ''}\"ROI\": {value}"
+                f"{newline}{text[end:]}"
+            )
+        if json.loads(patched).get("ROI") != json.loads(value):
+            raise ValueError(f"Could not store the ROI in {self.json_file}")
 
-        # Place the processed starr image back into the main image
-        image[y_start:y_end, x_start:x_end] = combined_roi
+        with IOManager.open_writer(self.json_file) as f:
+            f.write(patched)
 
-        return image
+    @staticmethod
+    def clamp_roi(
+        roi: Tuple[int, int, int], shape: Tuple[int, ...]
+    ) -> Tuple[int, int, int]:
+        h, w = shape[:2]
+        x, y, size = roi
+        x, y = min(max(x, 0), w - 1), min(max(y, 0), h - 1)
+        return x, y, min(max(size, 1), w - x, h - y)
+
+    @classmethod
+    def _detect_faces(cls, gray: np.ndarray) -> np.ndarray:
+        if not hasattr(cls, "_face_cascade"):
+            # OpenCV 5 moved the Haar cascades out of the main package
+            cascade = None
+            data = getattr(cv2, "data", None)
+            if data is not None and hasattr(cv2, "CascadeClassifier"):
+                path = os.path.join(
+                    data.haarcascades, "haarcascade_frontalface_default.xml"
+                )
+                cascade = cv2.CascadeClassifier(path)
+                if cascade.empty():
+                    cascade = None
+            cls._face_cascade = cascade
+        if cls._face_cascade is None:
+            return np.zeros((0, 4), int)
+
+        scale = min(1.0, 640 / max(gray.shape))
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        faces = cls._face_cascade.detectMultiScale(
+            small, scaleFactor=1.1, minNeighbors=5, minSize=(24, 24)
+        )
+        return (np.asarray(faces, float).reshape(-1, 4) / scale).astype(int)
 
-    def add_starr_icons_to_episode_image(
-        self, episode_image: np.ndarray, starr_images: List[np.ndarray]
-    ) -> np.ndarray:
+    @classmethod
+    def auto_roi(cls, image: np.ndarray) -> Tuple[int, int, int]:
         """
-        出演者のアイコンをエピソード画像に追加する
+        Largest square centred on the detected faces, else on the centroid of
+        the gradient energy (where the detail is), else on the image centre.
         """
-
-        # Constants
-        START_X: int = 40
-        START_Y: int = 20
-        STEP: int = 168
-
-        result_image: np.ndarray = episode_image.copy()
-
-        for i, im_starr in enumerate(starr_images[::-1]):
-            result_image = self._add_single_starr_icon(
-                result_image, im_starr, i, START_X, START_Y, STEP
+        h, w = image.shape[:2]
+        size = min(h, w)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        cx, cy = w / 2, h / 2
+
+        faces = cls._detect_faces(gray)
+        if len(faces):
+            cx = (faces[:, 0].min() + (faces[:, 0] + faces[:, 2]).max()) / 2
+            cy = (faces[:, 1].min() + (faces[:, 1] + faces[:, 3]).max()) / 2
+        else:
+            scale = min(1.0, 256 / max(h, w))
+            small = cv2.resize(
+                gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            ).astype(np.float32)
+            energy = cv2.magnitude(
+                cv2.Sobel(small, cv2.CV_32F, 1, 0), cv2.Sobel(small, cv2.CV_32F, 0, 1)
             )
+            total = energy.sum()
+            if total > 0:
+                ys, xs = np.indices(energy.shape)
+                cx = (xs * energy).sum() / total / scale
+                cy = (ys * energy).sum() / total / scale
+
+        x = int(round(min(max(cx - size / 2, 0), w - size)))
+        y = int(round(min(max(cy - size / 2, 0), h - size)))
+        return x, y, size
+
+    def get_roi(
+        self, image: np.ndarray, interactive: bool = True, reselect: bool = False
+    ) -> Tuple[int, int, int]:
+        """
+        Square crop (x, y, size) of the eyecatch.
 
-        return result_image
-
-    def make_post_image(self, host: str) -> None:
+        The crop stored in the episode JSON is reused. Otherwise the user
+        selects one (kept in `picked_roi` until the result is confirmed), or
+        in headless mode it is chosen automatically and not stored.
+        """
+        roi = None if reselect else self.load_roi()
+        if roi is None and interactive:
+            x, y, w, h = self.get_user_selected_roi(image)
+            roi = self.clamp_roi((x, y, min(w, h)), image.shape)
+            self.picked_roi = roi
+        if roi is None:
+            roi = self.auto_roi(image)
+        return self.clamp_roi(roi, image.shape)
+
+    def render(
+        self,
+        host: str,
+        output_size: int = BASE_SIZE,
+        interactive: bool = True,
+        reselect: bool = False,
+    ) -> np.ndarray:
         episode_image: np.ndarray = cv2.imread(self.episode_image_path)
+        x, y, size = self.get_roi(episode_image, interactive, reselect)
+
+        compositor = Compositor(output_size)
+        logo: np.ndarray = IconCache.load().get(
+            self.podcast_icon_path, compositor.icon_resolution(), circle=False
+        )
+        starr_images: List[np.ndarray] = self.get_starr_images(
+            host, compositor.icon_resolution()
+        )
 
-        episode_image: np.ndarray = self.crop_episode_image_to_square(
-            episode_image, self.podcast_icon_path
+        # the crop is a view: nothing is copied before the resize
+        return compositor.compose(
+            episode_image[y : y + size, x : x + size], logo, starr_images
         )
 
-        starr_images: List[np.ndarray] = self.get_starr_images(host)
+    def save_image(self, image: np.ndarray) -> None:
+        IOManager.exist_or_mkdir([os.path.dirname(self.output_file)])
+        ok, encoded = cv2.imencode(".jpg", image)
+        if not ok:
+            raise ValueError(f"Could not encode {self.output_file}")
+        IOManager.save(encoded.tobytes(), self.output_file)
+        print(f"saved {self.output_file}")
 
-        episode_image: np.ndarray = self.add_starr_icons_to_episode_image(
-            episode_image, starr_images
+    def make_post_image(
+        self,
+        host: str,
+        headless: bool = False,
+        output_size: int = BASE_SIZE,
+        reselect: bool = False,
+    ) -> None:
+        episode_image: np.ndarray = self.render(
+            host, output_size, interactive=not headless, reselect=reselect
         )
 
+        if headless:
+            self.save_image(episode_image)
+            return
+
         cv2.imshow("Result", episode_image)
         k: int = cv2.waitKey(0)
 
@@ -231,27 +272,59 @@ class ConcastImageEditor:
             raise Exception("process cancelled.")
 
         else:
-            cv2.imwrite(self.output_file, episode_image)
-            print(f"saved {self.output_file}")
+            self.save_image(episode_image)
+            if self.picked_roi is not None:
+                self.save_roi(self.picked_roi)
 
         cv2.destroyAllWindows()
 
-    def make_concast_post_image(self) -> None:
+    def make_concast_post_image(
+        self,
+        headless: bool = False,
+        output_size: int = BASE_SIZE,
+        reselect: bool = False,
+    ) -> None:
         """
         run by main
         """
         self.check_paths()
 
-        self.make_post_image(self.host_name)
+        self.make_post_image(self.host_name, headless, output_size, reselect)
 
 
 def process(episode_type, episode_number):
     editor = ConcastImageEditor(
-        "Gota", os.path.abspath(".."), episode_type, episode_number
+        HOST, os.path.abspath(".."), episode_type, episode_number
     )
     editor.make_concast_post_image()
 
 
+def render(episode_type, episode_number, output_size=BASE_SIZE):
+    """
+    Headless `process`: stored or automatic crop, no window.
+    """
+    # one OpenCV thread per worker process when rendering in parallel
+    cv2.setNumThreads(1)
+    editor = ConcastImageEditor(
+        HOST, os.path.abspath(".."), episode_type, episode_number
+    )
+    editor.make_concast_post_image(headless=True, output_size=output_size)
+
+
 if __name__ == "__main__":
-    episode_type, episode_number = determine_episode_type_and_number(sys.argv[1])
-    process(episode_type, episode_number)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("episode", help="e.g. 100, football-16-1")
+    parser.add_argument(
+        "--headless", action="store_true", help="no window, stored or automatic crop"
+    )
+    parser.add_argument("--size", type=int, default=BASE_SIZE, help="output side")
+    parser.add_argument(
+        "--reselect", action="store_true", help="ignore the stored crop"
+    )
+    args = parser.parse_args()
+
+    episode_type, episode_number = determine_episode_type_and_number(args.episode)
+    editor = ConcastImageEditor(
+        HOST, os.path.abspath(".."), episode_type, episode_number
+    )
+    editor.make_concast_post_image(args.headless, args.size, args.reselect)
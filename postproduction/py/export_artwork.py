@@ -0,0 +1,216 @@
+import os
+import json
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from IOManager import IOManager
+from IconCache import IconCache
+from Compositor import Compositor
+from BuildManifest import BuildManifest
+from cv import ConcastImageEditor, HOST
+from operate_filename import determine_episode_type_and_number
+
+# name -> output size and {extension: encoder settings}. Files are written to
+# ../photos/artwork/<name>/<type>/<n>.<extension>.
+TARGETS = {
+    "podcast": {"size": (3000, 3000), "formats": {"jpg": {"quality": 92}}},
+    "post": {
+        "size": (1080, 1080),
+        "formats": {"jpg": {"quality": 90}, "webp": {"quality": 85}},
+    },
+    "ogp": {
+        "size": (1200, 630),
+        "formats": {"jpg": {"quality": 88}, "webp": {"quality": 82}},
+    },
+    "thumbnail": {
+        "size": (300, 300),
+        "formats": {"jpg": {"quality": 85}, "webp": {"quality": 80}, "png": {}},
+    },
+}
+STAMP_DIR = "cache/artwork"
+STAMP_VERSION = 1
+
+
+def encode_params(extension: str, settings: dict) -> list:
+    if extension in ("jpg", "jpeg"):
+        return [
+            cv2.IMWRITE_JPEG_QUALITY,
+            settings.get("quality", 90),
+            cv2.IMWRITE_JPEG_PROGRESSIVE,
+            1,
+            cv2.IMWRITE_JPEG_OPTIMIZE,
+            1,
+        ]
+    if extension == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, settings.get("quality", 85)]
+    if extension == "png":
+        return [cv2.IMWRITE_PNG_COMPRESSION, settings.get("compression", 6)]
+    raise ValueError(f"Unsupported artwork format: {extension}")
+
+
+def wide_crop(shape, roi, aspect: float):
+    """
+    Crop (x, y, w, h) of ratio `aspect` at the zoom and centre of the square
+    `roi`, shrunk and shifted as needed to stay inside the image.
+    """
+    height, width = shape[:2]
+    x, y, size = roi
+    h = min(size, height, int(width / aspect))
+    w = min(int(round(h * aspect)), width)
+    cx, cy = x + size / 2, y + size / 2
+    left = int(round(min(max(cx - w / 2, 0), width - w)))
+    top = int(round(min(max(cy - h / 2, 0), height - h)))
+    return left, top, w, h
+
+
+class ArtworkExporter:
+    """
+    Every configured size and format of one episode's artwork.
+
+    The eyecatch is decoded once. Square targets are composited once at the
+    largest size needed and the smaller ones are resized down from the level
+    above (a pyramid); other aspect ratios are composited from their own crop
+    of the same decoded image. Each target file is stamped with a hash of its
+    inputs and settings, and only targets whose stamp changed are rebuilt.
+    """
+
+    def __init__(self, episode_type, episode_number, targets=None, root=".."):
+        self.episode_type = episode_type
+        self.episode_number = episode_number
+        self.targets = TARGETS if targets is None else targets
+        self.root = root
+        self.stamp_path = os.path.join(
+            STAMP_DIR, episode_type, f"{episode_number}.json"
+        )
+        self.stamps = {}
+        if os.path.exists(self.stamp_path):
+            self.stamps = IOManager.read(self.stamp_path)
+
+    def path(self, name: str, extension: str) -> str:
+        return os.path.join(
+            self.root,
+            "photos/artwork",
+            name,
+            self.episode_type,
+            f"{self.episode_number}.{extension}",
+        )
+
+    def _source_hash(self) -> str:
+        manifest = BuildManifest(self.episode_type, self.episode_number, self.root)
+        hashes = manifest.input_hashes("export_artwork")
+        return hashlib.sha256(
+            json.dumps(hashes, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def plan(self, force: bool = False) -> dict:
+        """
+        Targets to rebuild: {(name, extension): (path, stamp)}.
+        """
+        source = self._source_hash()
+        todo = {}
+        for name, target in self.targets.items():
+            for extension, settings in target["formats"].items():
+                path = self.path(name, extension)
+                stamp = hashlib.sha256(
+                    json.dumps(
+                        [STAMP_VERSION, source, target["size"], extension, settings],
+                        sort_keys=True,
+                    ).encode("utf-8")
+                ).hexdigest()
+                if force or self.stamps.get(path) != stamp or not os.path.exists(path):
+                    todo[name, extension] = (path, stamp)
+        return todo
+
+    def render(self, sizes: set) -> dict:
+        """
+        Composite every (width, height) in `sizes` from one decode.
+        """
+        editor = ConcastImageEditor(
+            HOST, os.path.abspath(self.root), self.episode_type, self.episode_number
+        )
+        editor.check_paths()
+        image = cv2.imread(editor.episode_image_path)
+        roi = editor.get_roi(image, interactive=False)
+        icons = IconCache.load()
+
+        def compose(width, height, crop):
+            compositor = Compositor(width, height)
+            resolution = compositor.icon_resolution()
+            logo = icons.get(editor.podcast_icon_path, resolution, circle=False)
+            starrs = editor.get_starr_images(HOST, resolution)
+            return compositor.compose(crop, logo, starrs)
+
+        images = {}
+        squares = sorted((s for s in sizes if s[0] == s[1]), reverse=True)
+        if squares:
+            x, y, side = roi
+            level = compose(*squares[0], image[y : y + side, x : x + side])
+            images[squares[0]] = level
+            for size in squares[1:]:
+                level = cv2.resize(level, size, interpolation=cv2.INTER_AREA)
+                images[size] = level
+        for width, height in sizes:
+            if width != height:
+                x, y, w, h = wide_crop(image.shape, roi, width / height)
+                images[width, height] = compose(
+                    width, height, image[y : y + h, x : x + w]
+                )
+        return images
+
+    def export(self, workers: int = 4, force: bool = False) -> list:
+        """
+        Rebuild the changed targets, encoding them in parallel threads.
+
+        Returns:
+        - The written paths.
+        """
+        todo = self.plan(force)
+        if not todo:
+            return []
+        images = self.render({tuple(self.targets[name]["size"]) for name, _ in todo})
+
+        def encode(item):
+            (name, extension), (path, stamp) = item
+            settings = self.targets[name]["formats"][extension]
+            image = images[tuple(self.targets[name]["size"])]
+            ok, encoded = cv2.imencode(
+                f".{extension}", image, encode_params(extension, settings)
+            )
+            if not ok:
+                raise ValueError(f"Could not encode {path}")
+            IOManager.exist_or_mkdir([os.path.dirname(path)])
+            IOManager.save(encoded.tobytes(), path)
+            return path, stamp
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            written = list(executor.map(encode, todo.items()))
+
+        self.stamps.update(written)
+        IOManager.exist_or_mkdir([os.path.dirname(self.stamp_path)])
+        IOManager.save(self.stamps, self.stamp_path)
+        return [path for path, _ in written]
+
+
+def process(episode_type, episode_number, workers=4, force=False):
+    written = ArtworkExporter(episode_type, episode_number).export(workers, force)
+    for path in written:
+        print(f"saved {path}")
+    print(f"artwork: {len(written)} files written.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export every size and format of an episode's artwork."
+    )
+    parser.add_argument("episode", help="e.g. 100, football-16-1")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--force", action="store_true", help="rebuild targets even if up to date"
+    )
+    args = parser.parse_args()
+
+    episode_type, episode_number = determine_episode_type_and_number(args.episode)
+    process(episode_type, episode_number, args.workers, args.force)
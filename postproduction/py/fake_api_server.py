@@ -0,0 +1,144 @@
+"""
+Local stand-in for the OpenAI endpoints the pipeline uses, for tests and
+benchmarks that must not reach (or pay for) the real API.
+
+    python fake_api_server.py --port 8765 --latency 0.5 --fail-every 5
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake \
+        python generate_images.py concast 100-110
+
+Images are solid-colour PNGs picked from the prompt hash; chat completions
+echo the first items of the memo as topics. `--fail-every N` answers every
+Nth request with a 429 and a Retry-After header to exercise the retries.
+"""
+import json
+import time
+import zlib
+import base64
+import struct
+import hashlib
+import argparse
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def solid_png(width: int, height: int, rgb) -> bytes:
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    row = b"\0" + bytes(rgb) * width
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+            chunk(b"IDAT", zlib.compress(row * height, 6)),
+            chunk(b"IEND", b""),
+        ]
+    )
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        number = next(self.server.counter)
+        time.sleep(self.server.latency)
+
+        if self.server.fail_every and number % self.server.fail_every == 0:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                {"Retry-After": "1"},
+            )
+            return
+        if self.path.endswith("/images/generations"):
+            self._send_json(200, self.images(request))
+        elif self.path.endswith("/chat/completions"):
+            self._send_json(200, self.chat(request))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    @staticmethod
+    def images(request):
+        width, height = map(int, request.get("size", "256x256").split("x"))
+        digest = hashlib.sha256(request.get("prompt", "").encode("utf-8")).digest()
+        png = solid_png(width, height, digest[:3])
+        return {
+            "created": int(time.time()),
+            "data": [
+                {"b64_json": base64.b64encode(png).decode("ascii")}
+                for _ in range(request.get("n", 1))
+            ],
+        }
+
+    @staticmethod
+    def chat(request):
+        memo = request["messages"][-1]["content"]
+        memo = memo.split(":", 1)[-1] if ":" in memo else memo
+        items = [item.strip() for item in memo.replace("\n", ",").split(",")]
+        content = "\n".join([f"🎙️ {item}" for item in items if item][:5])
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+
+def serve(port=0, latency=0.0, fail_every=0, verbose=False):
+    """
+    Start the server on a background thread.
+
+    Returns:
+    - The server; its base URL is `http://127.0.0.1:<server.server_port>/v1`.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeAPIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.fail_every = fail_every
+    server.verbose = verbose
+    server.counter = itertools.count(1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI API for local runs.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument(
+        "--fail-every", type=int, default=0, help="answer every Nth request with 429"
+    )
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency, args.fail_every, verbose=True)
+    print(f"Serving on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
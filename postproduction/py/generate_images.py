@@ -2,19 +2,27 @@ import openai
 from dotenv import load_dotenv
 import os
 import sys
+import asyncio
+import argparse
 
 from operate_filename import determine_episode_type_and_number
 from IOManager import IOManager
+from DiskCache import DiskCache
+from RetryPolicy import RetryPolicy
+from OpenAIBackend import OpenAIImageBackend
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
 
 class ImageGenerator:
-    def __init__(self, topics, size="512x512"):
+    def __init__(self, topics, size="512x512", backend=None, cache=None, retry=None):
         self.topics = topics
         self.refuse_empty_topics()
         self.size = size
+        self.backend = backend or OpenAIImageBackend()
+        self.cache = cache or DiskCache("images", ".png")
+        self.retry = retry or RetryPolicy()
 
     def refuse_empty_topics(self):
         """
@@ -35,32 +43,79 @@ class ImageGenerator:
         """
         return ", ".join(self.topics)
 
-    def create_and_save_image(self, filepath):
+    async def acreate_and_save_image(self, filepath):
         """
-        Creates an image based on a given topic using OpenAI's Image API.
+        Creates an image for the topics and saves it to `filepath`.
+
+        An image already generated for the same backend, size and prompt is
+        reused from the cache instead of calling the API again.
 
         Returns:
-        - Response from the OpenAI API.
+        - True if the API was called, False on a cache hit.
         """
         prompt = self.create_prompt()
-        response = openai.Image.create(
-            prompt=prompt,
-            n=1,
-            size=self.size,
-        )
-        image_url = response["data"][0]["url"]
-        IOManager.save(image_url, filepath)
+        key = DiskCache.key(self.backend.name, self.size, prompt)
+        image = self.cache.get(key)
+        generated = image is None
+        if generated:
+            image = await self.retry.run(self.backend.generate, prompt, self.size)
+            self.cache.put(key, image)
 
+        IOManager.exist_or_mkdir([os.path.dirname(filepath)])
+        IOManager.save(image, filepath)
         print(f"Image saved to {filepath}!")
+        return generated
+
+    def create_and_save_image(self, filepath):
+        return asyncio.run(self.acreate_and_save_image(filepath))
+
+
+async def generate_catalog(ids, concurrency=4, size="512x512", backend=None):
+    """
+    Generate the images of many episodes, at most `concurrency` at a time.
+
+    Returns:
+    - {episode id: "generated", "cached" or the error}.
+    """
+    backend = backend or OpenAIImageBackend()
+    cache, retry = DiskCache("images", ".png"), RetryPolicy()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(id_):
+        async with semaphore:
+            try:
+                episode_type, episode_number = determine_episode_type_and_number(id_)
+                episode_data = IOManager.read(
+                    f"json/{episode_type}/{episode_number}.json"
+                )
+                generator = ImageGenerator(
+                    episode_data["Topics"], size, backend, cache, retry
+                )
+                generated = await generator.acreate_and_save_image(
+                    f"../photos/ai-generated/{episode_type}/{episode_number}.jpg"
+                )
+                return id_, "generated" if generated else "cached"
+            except Exception as e:
+                return id_, f"{type(e).__name__}: {e}"
+
+    return dict(await asyncio.gather(*(one(id_) for id_ in ids)))
 
 
 if __name__ == "__main__":
-    episode_type, episode_number = determine_episode_type_and_number(sys.argv[1])
-    episode_data = IOManager.read(f"json/{episode_type}/{episode_number}.json")
+    from batch import expand_specs
 
-    image_gen = ImageGenerator(episode_data["Topics"])
-    response = image_gen.create_and_save_image(
-        f"../photos/ai-generated/{episode_type}/{episode_number}.jpg"
+    parser = argparse.ArgumentParser(
+        description="Generate eyecatch candidates from the episode topics."
     )
+    parser.add_argument("specs", nargs="+", help="e.g. `100`, `concast 100-150`")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--size", default="512x512")
+    args = parser.parse_args()
 
-    print(episode_data, response)
+    results = asyncio.run(
+        generate_catalog(expand_specs(args.specs), args.concurrency, args.size)
+    )
+    for id_, result in results.items():
+        print(f"{id_: <24}{result}")
+    if any(result not in ("generated", "cached") for result in results.values()):
+        sys.exit(1)
@@ -1,20 +1,180 @@
-
+import os
 import re
-import pyperclip
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 
+from IOManager import IOManager
+from operate_filename import determine_episode_type_and_number
+
+CACHE_PATH = "cache/titles.json"
+TTL = 30 * 24 * 3600
+HEAD_LIMIT = 256 * 1024
+CHUNK_SIZE = 8 * 1024
+TIMEOUT = (5, 10)
+HEAD_END = re.compile(rb"</head\s*>|<body[\s>]", re.IGNORECASE)
+
+_session = None
+
+
+def get_session(workers=8):
+    """
+    One keep-alive session per process, pooled for `workers` threads.
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+        _session.headers["User-Agent"] = "Mozilla/5.0 (compatible; concast-titles)"
+    return _session
+
+
+def read_head(response):
+    """
+    The start of the page up to the end of its <head>, read in chunks.
+    """
+    # read1 returns whatever has arrived instead of waiting for a full chunk
+    read1 = getattr(response.raw, "read1", None)
+    if read1:
+        chunks = iter(lambda: read1(CHUNK_SIZE, decode_content=True), b"")
+    else:
+        chunks = response.iter_content(CHUNK_SIZE)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if HEAD_END.search(head, max(0, len(head) - len(chunk) - 16)):
+            break
+        if len(head) >= HEAD_LIMIT:
+            break
+    return head
+
+
 def get_title(url):
-    return BeautifulSoup(requests.get(url).text, 'html.parser').title.text
+    with get_session().get(url, stream=True, timeout=TIMEOUT) as response:
+        response.raise_for_status()
+        head = read_head(response)
+        # only trust a header charset; otherwise let the page's <meta> decide
+        content_type = response.headers.get("Content-Type", "")
+        encoding = response.encoding if "charset" in content_type else None
+    soup = BeautifulSoup(head, "html.parser", from_encoding=encoding)
+    title = soup.title.string if soup.title and soup.title.string else None
+    if not title:
+        meta = soup.find("meta", property="og:title")
+        title = meta.get("content") if meta else None
+    if not title:
+        raise ValueError(f"No title in {url}")
+    return " ".join(title.split())
+
+
+def resolve_titles(urls, workers=8, ttl=TTL, refresh=False):
+    """
+    Titles of `urls`, fetched concurrently unless cached within `ttl` seconds.
+
+    Returns:
+    - {url: title, or None if it could not be fetched}.
+    """
+    cache = IOManager.read(CACHE_PATH) if os.path.exists(CACHE_PATH) else {}
+    now = time.time()
+    titles, missing = {}, []
+    for url in dict.fromkeys(urls):
+        entry = cache.get(url)
+        if entry and not refresh and now - entry["fetched"] < ttl:
+            titles[url] = entry["title"]
+        else:
+            missing.append(url)
+
+    def fetch(url):
+        try:
+            return url, get_title(url)
+        except Exception as e:
+            print(f"{url}: {type(e).__name__}: {e}")
+            return url, None
+
+    if missing:
+        get_session(workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for url, title in executor.map(fetch, missing):
+                titles[url] = title
+                if title is not None:
+                    cache[url] = {"title": title, "fetched": now}
+        IOManager.exist_or_mkdir([os.path.dirname(CACHE_PATH)])
+        IOManager.save(cache, CACHE_PATH)
+    return titles
+
+
+def unresolved(title, url):
+    return bool(url) and (not title.strip() or title == url or title.startswith("http"))
+
+
+def fill_references(path, workers=8, ttl=TTL, refresh=False):
+    """
+    Replace empty or URL-only titles in the `References` of an episode JSON.
+
+    Returns:
+    - The number of titles filled in.
+    """
+    episode_data = IOManager.read(path)
+    references = episode_data.get("References", {})
+    urls = [url for title, url in references.items() if unresolved(title, url)]
+    if not urls:
+        return 0
+    titles = resolve_titles(urls, workers, ttl, refresh)
+
+    filled, updated = 0, {}
+    for title, url in references.items():
+        if unresolved(title, url) and titles.get(url) and titles[url] not in updated:
+            title = titles[url]
+            filled += 1
+        updated[title] = url
+    episode_data["References"] = updated
+    IOManager.save(episode_data, path)
+    return filled
+
 
 def copy_to_clipboard(title, url):
+    import pyperclip
+
     pyperclip.copy(f'"{title}": "{url}",')
-    print(f'A key-value pair was copied to clipboard!\ntitle:\n\t{title}\nurl:\n\t{url}')
+    print(
+        f"A key-value pair was copied to clipboard!\ntitle:\n\t{title}\nurl:\n\t{url}"
+    )
+
 
 def main():
-    url = pyperclip.paste()
-    title = get_title(url)
-    copy_to_clipboard(title, url)
+    parser = argparse.ArgumentParser(
+        description="Resolve page titles for References (default: the clipboard URL)."
+    )
+    parser.add_argument("urls", nargs="*", help="print `\"title\": \"url\",` lines")
+    parser.add_argument("--episode", help="fill the References of this episode JSON")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--ttl-days", type=float, default=TTL / 86400)
+    parser.add_argument("--refresh", action="store_true", help="ignore the cache")
+    args = parser.parse_args()
+    ttl = args.ttl_days * 86400
+
+    if args.episode:
+        episode_type, episode_number = determine_episode_type_and_number(args.episode)
+        path = f"json/{episode_type}/{episode_number}.json"
+        filled = fill_references(path, args.workers, ttl, args.refresh)
+        print(f"{path}: {filled} titles filled in.")
+    elif args.urls:
+        titles = resolve_titles(args.urls, args.workers, ttl, args.refresh)
+        for url, title in titles.items():
+            print(f'"{title}": "{url}",' if title else f"# failed: {url}")
+        if any(title is None for title in titles.values()):
+            sys.exit(1)
+    else:
+        import pyperclip
+
+        url = pyperclip.paste()
+        copy_to_clipboard(get_title(url), url)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,28 @@
-import sys
+import argparse
 from operate_filename import determine_episode_type_and_number
+from BuildManifest import BuildManifest
 
-import tag_episode
-import create_episode_data
-import post
-import cv
+import stages
 
 if __name__ == "__main__":
-    episode_type, episode_number = determine_episode_type_and_number(sys.argv[1])
+    parser = argparse.ArgumentParser()
+    parser.add_argument("episode", help="e.g. 100, 11-1, football-16-1")
+    parser.add_argument(
+        "--force", action="store_true", help="run every stage even if up to date"
+    )
+    parser.add_argument(
+        "--explain", action="store_true", help="only show what would rebuild and why"
+    )
+    args = parser.parse_args()
 
-    tag_episode.process(episode_type, episode_number)
-    create_episode_data.process(episode_type, episode_number)
-    post.process(episode_type, episode_number)
-    cv.process(episode_type, episode_number)
+    episode_type, episode_number = determine_episode_type_and_number(args.episode)
+    manifest = BuildManifest(episode_type, episode_number)
+
+    for stage in stages.PIPELINE:
+        # side-effect-only stages (the clipboard copy) have nothing to be up to date
+        always = stage in stages.SIDE_EFFECTS
+        if args.explain:
+            reasons = ["always runs"] if always else manifest.explain(stage)
+            print(f"{stage: <20}{', '.join(reasons) or 'up to date'}")
+            continue
+        manifest.run(stage, stages.load(stage), force=args.force or always)
@@ -45,6 +45,15 @@ def determine_episode_type_and_number(input_str: Union[str, int]) -> str:
     raise BaseException(f"invalid input: {input_str}")
 
 
+def episode_id(episode_type: str, episode_number: str) -> str:
+    """
+    inverse of determine_episode_type_and_number, e.g. ("football", "16-1") -> "football-16-1"
+    """
+    if episode_type == "concast":
+        return episode_number
+    return f"{episode_type}-{episode_number}"
+
+
 def omit_episode_type_from_filename(filename: str, type) -> str:
     """
     rename a file with a new name
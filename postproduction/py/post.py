@@ -1,5 +1,4 @@
 import sys
-import pyperclip
 
 from operate_filename import determine_episode_type_and_number
 
@@ -9,31 +8,52 @@ from EpisodeManager import EpisodeManager
 from EpisodeSearcher import EpisodeSearcher
 
 
+def format_post(data):
+    """
+    The blog post (title, topics and references) as markdown, or None without topics.
+    """
+    if "Topics" not in data:
+        return None
+    title = EpisodeManager.format_title(data)
+    topics_html = HTMLBuilder.create_header_html(
+        EpisodeManager.format_comments(data["Topics"])
+    )
+    references_html = HTMLBuilder.create_references_html(data["References"])
+    return f"# {title}{topics_html}{references_html}"
+
+
 def create_post(episode_type, episode_number):
+    """
+    Write the SNS post; nothing interactive, so it can run in batch workers.
+    """
     data = IOManager.read(f"json/{episode_type}/{episode_number}.json")
 
     EpisodeManager.validate_episode(data, episode_type, episode_number)
-    title = EpisodeManager.format_title(data)
-    references_html = HTMLBuilder.create_references_html(data["References"])
     if "Topics" in data:
-        topics_html = HTMLBuilder.create_header_html(
-            EpisodeManager.format_comments(data["Topics"])
-        )
-        pyperclip.copy(f"# {title}{topics_html}{references_html}")
-
         sns_post = EpisodeManager.create_sns_post(data)
 
         IOManager.save(sns_post, f"sns/{episode_type}/{episode_number}.txt")
 
 
-def get_related_episodes(episode_type, episode_number):
+def copy_post(episode_type, episode_number):
+    """
+    Copy the blog post to the clipboard and print the related episodes.
+    """
+    import pyperclip
+
     data = IOManager.read(f"json/{episode_type}/{episode_number}.json")
-    attrs = {
-        "episode-type": episode_type,
-        "starrs": list(data["Starr"].keys()),
-    }
-    related_episodes = EpisodeSearcher.search_episodes(attrs)
-    related_episodes.sort(key=EpisodeSearcher.natural_keys)
+
+    EpisodeManager.validate_episode(data, episode_type, episode_number)
+    post = format_post(data)
+    if post is not None:
+        pyperclip.copy(post)
+    get_related_episodes(episode_type, episode_number)
+
+
+def get_related_episodes(episode_type, episode_number):
+    related_episodes = EpisodeSearcher.rank_related_episodes(
+        episode_type, episode_number
+    )
 
     if related_episodes:
         print(HTMLBuilder.generate_related_episodes_header())
@@ -42,9 +62,9 @@ def get_related_episodes(episode_type, episode_number):
 
 def process(episode_type, episode_number):
     create_post(episode_type, episode_number)
-    get_related_episodes(episode_type, episode_number)
 
 
 if __name__ == "__main__":
     episode_type, episode_number = determine_episode_type_and_number(sys.argv[1])
     process(episode_type, episode_number)
+    copy_post(episode_type, episode_number)
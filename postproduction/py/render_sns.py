@@ -0,0 +1,156 @@
+import os
+import re
+import sys
+import time
+import argparse
+
+from IOManager import IOManager
+from EpisodeManager import EpisodeManager
+from EpisodeCatalog import EpisodeCatalog
+from operate_filename import episode_id
+
+URL = re.compile(r"https?://\S+")
+# code points X counts as one character; everything else (CJK, emoji) counts two
+X_LIGHT_RANGES = [(0, 4351), (8192, 8205), (8208, 8223), (8242, 8247)]
+X_URL_LENGTH = 23
+
+
+def x_length(text: str) -> int:
+    """
+    Length of `text` as X counts it: links are 23, CJK and emoji count double.
+    """
+    length = 0
+    for part in URL.split(text):
+        for char in part:
+            code = ord(char)
+            light = any(low <= code <= high for low, high in X_LIGHT_RANGES)
+            length += 1 if light else 2
+    return length + X_URL_LENGTH * len(URL.findall(text))
+
+
+# platform -> (character limit, length function); written to sns/<type>/<platform>/
+PLATFORMS = {
+    "x": (280, x_length),
+    "bluesky": (300, len),
+    "threads": (500, len),
+}
+
+
+def fit_sns_post(data: dict, limit: int, length=len) -> str:
+    """
+    The SNS post of `data` cut down to `limit` characters as `length` counts them.
+
+    Topics are dropped from the end first; only if the title, hashtags and link
+    alone are too long is the title shortened with an ellipsis.
+    """
+    topics = list(data.get("Topics", []))
+    for keep in range(len(topics), -1, -1):
+        post = EpisodeManager.create_sns_post(dict(data, Topics=topics[:keep]))
+        if length(post) <= limit:
+            return post
+
+    title = data["Title"]
+    while title:
+        title = title[:-1]
+        post = EpisodeManager.create_sns_post(dict(data, Title=f"{title}…", Topics=[]))
+        if length(post) <= limit:
+            return post
+    raise ValueError(f"Post does not fit in {limit} characters: {data['Number']}")
+
+
+def render_posts(data: dict, platforms=PLATFORMS) -> dict:
+    """
+    Returns:
+    - {None: the full post, platform: the post fitted to that platform}.
+    """
+    posts = {None: EpisodeManager.create_sns_post(data)}
+    for platform in platforms:
+        limit, length = PLATFORMS[platform]
+        posts[platform] = fit_sns_post(data, limit, length)
+    return posts
+
+
+def post_path(episode_type, episode_number, platform=None) -> str:
+    if platform is None:
+        return f"sns/{episode_type}/{episode_number}.txt"
+    return f"sns/{episode_type}/{platform}/{episode_number}.txt"
+
+
+def render_catalog(episodes, platforms=PLATFORMS, dry_run=False):
+    """
+    Render the posts of the (type, number) `episodes` one at a time, writing
+    only the files whose content changed.
+
+    Episodes without `Topics` are skipped, as in `post.create_post`.
+
+    Returns:
+    - {"created": [...], "updated": [...], "unchanged": int, "skipped": [...],
+      "failed": {id: error}}.
+    """
+    report = {"created": [], "updated": [], "unchanged": 0, "skipped": [], "failed": {}}
+    for episode_type, episode_number in episodes:
+        id_ = episode_id(episode_type, episode_number)
+        try:
+            data = IOManager.read(f"json/{episode_type}/{episode_number}.json")
+            if "Topics" not in data:
+                report["skipped"].append(id_)
+                continue
+            EpisodeManager.validate_episode(data, episode_type, episode_number)
+            posts = render_posts(data, platforms)
+        except Exception as e:
+            report["failed"][id_] = f"{type(e).__name__}: {e}"
+            continue
+        for platform, post in posts.items():
+            path = post_path(episode_type, episode_number, platform)
+            status = IOManager.write_if_changed(post, path, dry_run)
+            if status == "unchanged":
+                report["unchanged"] += 1
+            else:
+                report[status].append(path)
+    return report
+
+
+def main():
+    from batch import expand_specs
+
+    parser = argparse.ArgumentParser(
+        description="Render the SNS posts of many episodes, writing only changes."
+    )
+    parser.add_argument("specs", nargs="*", help="default: every episode")
+    parser.add_argument(
+        "--platforms", nargs="*", choices=list(PLATFORMS), default=list(PLATFORMS)
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="report changes without writing"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    catalog = EpisodeCatalog.load()
+    episodes = [
+        (catalog.entries[path]["type"], os.path.splitext(os.path.basename(path))[0])
+        for path in sorted(catalog.entries, key=catalog.rank.__getitem__)
+    ]
+    if args.specs:
+        selected = set(expand_specs(args.specs))
+        episodes = [e for e in episodes if episode_id(*e) in selected]
+    report = render_catalog(episodes, args.platforms, args.dry_run)
+
+    for status in ("created", "updated"):
+        for path in report[status]:
+            print(f"{status: <10}{path}")
+    for id_, error in report["failed"].items():
+        print(f"{'failed': <10}{id_}: {error}")
+    print(
+        f"{len(episodes)} episodes: {len(report['created'])} created, "
+        f"{len(report['updated'])} updated, {report['unchanged']} unchanged, "
+        f"{len(report['skipped'])} skipped, {len(report['failed'])} failed"
+        f"{' (dry run)' if args.dry_run else ''} "
+        f"({time.perf_counter() - start:.1f}s)"
+    )
+    if report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import sys
+import time
+import argparse
+
+from SearchIndex import SearchIndex
+
+KINDS = ["title", "topic", "reference", "marker", "transcript"]
+
+
+def format_hit(hit):
+    timestamp = ""
+    if hit["start"] is not None:
+        minutes, seconds = divmod(int(hit["start"]), 60)
+        hours, minutes = divmod(minutes, 60)
+        timestamp = f"{hours}:{minutes:02}:{seconds:02}"
+    line = f"{hit['episode']: <20}{hit['kind']: <12}{timestamp: <9}{hit['snippet']}"
+    return f"{line}\n{'': <41}{hit['label']}" if hit["label"] else line
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Search titles, topics, references, markers and transcripts."
+    )
+    parser.add_argument("query", nargs="+")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--kind", nargs="+", choices=KINDS, help="only these hits")
+    args = parser.parse_args()
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    changed = index.sync()
+    synced = time.perf_counter()
+    hits = index.search(" ".join(args.query), args.limit, args.kind)
+    searched = time.perf_counter()
+
+    for hit in hits:
+        print(format_hit(hit))
+    print(
+        f"\n{len(hits)} hits in {(searched - synced) * 1000:.1f} ms "
+        f"(sync: {changed} files, {(synced - started) * 1000:.1f} ms)"
+    )
+    if not hits:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import importlib
+
+# Stage name -> module providing `process(episode_type, episode_number)`, or
+# `module:function` for another entry point of the same signature.
+# Modules are imported only when a stage actually runs, so cv2, pandas,
+# mutagen and openai are never loaded for stages that are skipped.
+REGISTRY = {
+    "tag_episode": "tag_episode",
+    "create_episode_data": "create_episode_data",
+    "post": "post",
+    # copies the blog post to the clipboard; only meaningful in an interactive run
+    "clipboard": "post:copy_post",
+    "cv": "cv",
+    # headless icon render with the stored or automatic crop; run it through
+    # `batch.py ... --stages cv_headless` to render in parallel
+    "cv_headless": "cv:render",
+    "export_artwork": "export_artwork",
+}
+PIPELINE = ["tag_episode", "create_episode_data", "post", "clipboard", "cv"]
+# cv and clipboard are left out on purpose: cv blocks on an ROI selection
+# window and clipboard needs a desktop session. cv_headless and
+# export_artwork are opt-in, since not every episode has an eyecatch yet.
+NON_INTERACTIVE = ["tag_episode", "create_episode_data", "post"]
+# Stages that only act on the desktop session and write no file.
+SIDE_EFFECTS = ["clipboard"]
+# Stages reading the compiled marker table, built once before a batch fans out.
+MARKER_STAGES = ["tag_episode", "create_episode_data"]
+
+
+def load(stage: str):
+    """
+    Return a `process` function that imports the stage module on first call.
+    """
+    if stage not in REGISTRY:
+        raise ValueError(f"Unknown stage: {stage}")
+
+    module_name, _, function = REGISTRY[stage].partition(":")
+
+    def process(episode_type, episode_number):
+        module = importlib.import_module(module_name)
+        return getattr(module, function or "process")(episode_type, episode_number)
+
+    return process
@@ -0,0 +1,99 @@
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+HEAVY_MODULES = ["cv2", "numpy", "pandas", "torch", "whisper", "openai", "mutagen"]
+
+# Entry point -> import time budget (ms) and modules it must not import at startup.
+BUDGETS = {
+    "operate_filename": {"budget_ms": 30, "forbidden": HEAVY_MODULES},
+    "EpisodeSearcher": {"budget_ms": 30, "forbidden": HEAVY_MODULES},
+    "post": {"budget_ms": 80, "forbidden": HEAVY_MODULES},
+    "main": {"budget_ms": 80, "forbidden": HEAVY_MODULES},
+    "batch": {"budget_ms": 80, "forbidden": HEAVY_MODULES},
+}
+DEFAULT_BUDGET = {"budget_ms": 100, "forbidden": []}
+
+
+def measure_imports(module: str, py_dir: str) -> dict:
+    """
+    Import `module` in a fresh interpreter under `-X importtime`.
+
+    Returns:
+    - {name: cumulative import time in microseconds} for `module` and every
+      module it imported.
+    """
+    code = f"import sys; sys.path.insert(0, {py_dir!r}); import {module}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # nested imports are listed before the module that triggered them;
+        # restart at each top-level import so only `module`'s tree is kept
+        if not name.startswith("  ") and name.strip() != module:
+            timings = {}
+            continue
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def check_entry_point(module: str, budget: dict, py_dir: str, repeat: int) -> dict:
+    runs = [measure_imports(module, py_dir) for _ in range(repeat)]
+    elapsed_ms = statistics.median(run[module] for run in runs) / 1000
+    loaded = set(runs[0])
+    heavy = sorted(
+        m for m in budget["forbidden"] if any(n.split(".")[0] == m for n in loaded)
+    )
+    slowest = sorted(runs[0].items(), key=lambda x: x[1], reverse=True)[1:6]
+    return {
+        "module": module,
+        "elapsed_ms": elapsed_ms,
+        "budget_ms": budget["budget_ms"],
+        "heavy": heavy,
+        "slowest": slowest,
+        "ok": elapsed_ms <= budget["budget_ms"] and not heavy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the import time of each entry point against its budget."
+    )
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS))
+    parser.add_argument("--repeat", type=int, default=5, help="runs per module")
+    parser.add_argument("--verbose", action="store_true", help="show slowest imports")
+    args = parser.parse_args()
+
+    py_dir = os.path.dirname(os.path.abspath(__file__))
+    failed = False
+    print(f"{'entry point': <20}{'import ms': >10}{'budget': >10}  heavy imports")
+    for module in args.modules:
+        budget = BUDGETS.get(module, DEFAULT_BUDGET)
+        report = check_entry_point(module, budget, py_dir, args.repeat)
+        mark = "" if report["ok"] else "  <-- over budget"
+        print(
+            f"{module: <20}{report['elapsed_ms']: >10.1f}{report['budget_ms']: >10}"
+            f"  {', '.join(report['heavy']) or '-'}{mark}"
+        )
+        if args.verbose:
+            for name, us in report["slowest"]:
+                print(f"{'': <24}{us / 1000: >8.1f} ms  {name.strip()}")
+        failed |= not report["ok"]
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,126 @@
+import os
 import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-from mutagen.id3 import ID3, CTOCFlags, TIT2, CTOC, CHAP
+from mutagen.id3 import ID3, ID3NoHeaderError, CTOCFlags, TIT2, CTOC, CHAP
 from mutagen.mp3 import MP3
 import numpy as np
-import pandas as pd
 
 from typing import List, Tuple
 
-from operate_filename import determine_episode_type_and_number
+from MarkerStore import MarkerStore
+from operate_filename import determine_episode_type_and_number, episode_id
+
+# Room left in the tag when it has to grow, so later chapter edits fit in place.
+RESERVED_PADDING = 64 * 1024
+
+
+def keep_padding(info) -> int:
+    """
+    mutagen padding callback: reuse the existing padding whenever the new tag
+    fits, so only the tag bytes are rewritten and never the audio payload.
+    """
+    if info.padding >= 0:
+        return info.padding
+    return max(RESERVED_PADDING, info.get_default_padding())
 
 
 class AudioTagger:
     def __init__(self, episode_type: str, episode_number: str):
         self.episode_type = episode_type
         self.episode_number = episode_number
-        self.audio = ID3(f"../episodes/{episode_type}/{episode_number}.mp3")
+        self.path = f"../episodes/{episode_type}/{episode_number}.mp3"
+        try:
+            self.audio = ID3(self.path)
+        except ID3NoHeaderError:
+            self.audio = ID3()
 
     @staticmethod
     def parse_timestr_milliseconds(timestr: str) -> int:
-        time_list = [int(x) for x in timestr.split(".")[0].split(":")]
-
-        if len(time_list) == 2:
-            return (time_list[0] * 60 + time_list[1]) * 1000
-        elif len(time_list) == 3:
-            return (time_list[0] * 3600 + time_list[1] * 60 + time_list[2]) * 1000
-        else:
-            raise ValueError(f"Invalid time format: {timestr}")
-
-    def get_time_data_from_csv(self) -> Tuple[List[str], List[str], List[str]]:
-        df = pd.read_csv(
-            f"markers/{self.episode_type}/{self.episode_number}.csv", sep="\t"
+        return int(MarkerStore.parse_timecodes([timestr])[0])
+
+    def get_time_data_from_csv(self) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """
+        Start (ms), name and duration (ms) of the markers, from the marker store.
+        """
+        markers = MarkerStore.load().markers(self.episode_type, self.episode_number)
+        return (
+            markers["start_ms"].to_numpy(),
+            markers["name"].tolist(),
+            markers["duration_ms"].to_numpy(),
         )
-        return df["Start"].tolist(), df["Name"].tolist(), df["Duration"].tolist()
-
-    def add_tags(self):
-        print(self.audio)
 
-        start, title, duration = self.get_time_data_from_csv()
-
-        start_seconds = np.array([self.parse_timestr_milliseconds(t) for t in start])
-        duration_seconds = np.array(
-            [self.parse_timestr_milliseconds(t) for t in duration]
-        )
-        end_seconds = start_seconds + duration_seconds
-
-        child_elements = [f"chp{i}" for i in range(1, len(title) + 1)]
+    def get_chapters(self) -> List[Tuple[str, int, int, str]]:
+        """
+        Chapters from the markers, in playback order.
+
+        Zencastr cues have no duration, so a chapter without one ends where the
+        next one starts (the last one at the end of the audio). An empty marker
+        file gives no chapters.
+
+        Returns:
+        - (element id, start ms, end ms, title) tuples.
+        """
+        start_ms, title, duration_ms = self.get_time_data_from_csv()
+        if len(start_ms) == 0:
+            return []
+        order = np.argsort(start_ms, kind="stable")
+        start_ms, duration_ms = start_ms[order], duration_ms[order]
+        title = [title[i] for i in order]
+
+        audio_end = int(MP3(self.path).info.length * 1000)
+        next_start = np.append(start_ms[1:], max(audio_end, start_ms[-1]))
+        end_ms = np.where(duration_ms > 0, start_ms + duration_ms, next_start)
+
+        return [
+            (f"chp{i}", int(s), int(e), t)
+            for i, (s, e, t) in enumerate(zip(start_ms, end_ms, title), start=1)
+        ]
+
+    def read_chapters(self) -> List[Tuple[str, int, int, str]]:
+        """
+        Chapters currently in the file, in table-of-contents order.
+        """
+        try:
+            tags = ID3(self.path)
+        except ID3NoHeaderError:
+            return []
+        chapters = {frame.element_id: frame for frame in tags.getall("CHAP")}
+        tocs = tags.getall("CTOC")
+        order = tocs[0].child_element_ids if tocs else sorted(chapters)
+        result = []
+        for element_id in order:
+            frame = chapters.get(element_id)
+            if frame is None:
+                continue
+            title = frame.sub_frames.get("TIT2")
+            text = str(title.text[0]) if title else ""
+            result.append((element_id, frame.start_time, frame.end_time, text))
+        return result
 
+    def add_tags(self):
+        """
+        Replace any existing chapter set with the one from the markers.
+        """
+        chapters = self.get_chapters()
+        if not chapters:
+            print(f"{self.path}: no markers, chapters left as they are.")
+            return
+
+        self.audio.delall("CTOC")
+        self.audio.delall("CHAP")
         self.audio.add(
             CTOC(
                 element_id="toc",
                 flags=CTOCFlags.TOP_LEVEL | CTOCFlags.ORDERED,
-                child_element_ids=child_elements,
+                child_element_ids=[elem for elem, _, _, _ in chapters],
             )
         )
 
         print("-" * 40)
         print("Start   End     Title")
-        for elem, s, e, t in zip(child_elements, start_seconds, end_seconds, title):
+        for elem, s, e, t in chapters:
             print(s, e, t)
             self.audio.add(
                 CHAP(
@@ -66,8 +130,23 @@ class AudioTagger:
                     sub_frames=[TIT2(text=[t])],
                 )
             )
-        print(self.audio)
-        self.audio.save()
+        self.audio.save(self.path, padding=keep_padding)
+
+    def verify(self) -> bool:
+        """
+        Diff the chapters in the file against the markers without writing.
+        """
+        expected, actual = self.get_chapters(), self.read_chapters()
+        if expected == actual:
+            print(f"{self.path}: {len(actual)} chapters OK")
+            return True
+        print(f"{self.path}: chapters differ")
+        for i in range(max(len(expected), len(actual))):
+            want = expected[i] if i < len(expected) else None
+            got = actual[i] if i < len(actual) else None
+            if want != got:
+                print(f"  - {want}\n  + {got}")
+        return False
 
 
 def process(episode_type, episode_number):
@@ -75,6 +154,58 @@ def process(episode_type, episode_number):
     tagger.add_tags()
 
 
+def verify(episode_type, episode_number):
+    return AudioTagger(episode_type, episode_number).verify()
+
+
+def _run(args):
+    function, episode_type, episode_number = args
+    try:
+        return episode_number, function(episode_type, episode_number), None
+    except Exception as e:
+        return episode_number, False, f"{type(e).__name__}: {e}"
+
+
+def tag_catalog(episode_type, workers=4, verify_only=False) -> bool:
+    """
+    Tag (or only verify) every episode with markers in `markers/<episode_type>/`.
+    """
+    numbers = sorted(
+        os.path.splitext(name)[0]
+        for name in os.listdir(f"markers/{episode_type}")
+        if name.endswith(".csv")
+        and os.path.exists(f"../episodes/{episode_type}/{name[:-4]}.mp3")
+    )
+    function = verify if verify_only else process
+    # compile the marker table once here rather than in every worker
+    MarkerStore.load()
+    ok = True
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        jobs = [(function, episode_type, number) for number in numbers]
+        for number, result, error in executor.map(_run, jobs):
+            if error:
+                print(f"{episode_id(episode_type, number)}: {error}")
+            ok &= error is None and result is not False
+    return ok
+
+
 if __name__ == "__main__":
-    episode_type, episode_number = determine_episode_type_and_number(sys.argv[1])
-    process(episode_type, episode_number)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("episode", nargs="?", help="e.g. 100, football-16-1")
+    parser.add_argument("--all", metavar="TYPE", help="every episode of this type")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--verify", action="store_true", help="diff chapters against markers only"
+    )
+    args = parser.parse_args()
+
+    if args.all:
+        ok = tag_catalog(args.all, args.workers, args.verify)
+    else:
+        episode_type, episode_number = determine_episode_type_and_number(args.episode)
+        if args.verify:
+            ok = verify(episode_type, episode_number)
+        else:
+            process(episode_type, episode_number)
+            ok = True
+    sys.exit(0 if ok else 1)
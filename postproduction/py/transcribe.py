@@ -3,18 +3,31 @@ import torch
 import pandas as pd
 import whisper
 from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 import os
+import time
 
 from operate_filename import determine_episode_type_and_number
 
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+
 
 class WhisperAPI:
     def __init__(self, model_name, language, verbose=True):
         self.DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
         self.model_name = model_name
         self.language = language
-        self.model = self._load_model(model_name, self.DEVICE)
         self.verbose = verbose
+        self._model = None
+        self._pool = None
+        self._pool_workers = 0
+
+    @property
+    def model(self):
+        # loaded on first use: the chunked mode only needs it in the workers
+        if self._model is None:
+            self._model = self._load_model(self.model_name, self.DEVICE)
+        return self._model
 
     def _load_model(self, model_name, device):
         model = whisper.load_model(model_name, device)
@@ -38,6 +51,99 @@ class WhisperAPI:
     def transcribe(self, audio_file_path):
         return self._make_request(audio_file_path)
 
+    def transcribe_chunked(self, audio, workers=2, chunk_seconds=600):
+        """
+        Split the audio at silences and transcribe the chunks in parallel.
+
+        `audio` is a path or a 16 kHz waveform from `whisper.load_audio`. The
+        worker pool (one model per worker) is kept between calls.
+
+        Returns:
+        - A transcription dict shaped like `transcribe`'s, so `make_df` works on it.
+        """
+        if isinstance(audio, str):
+            audio = whisper.load_audio(audio)
+        bounds = find_split_points(audio, chunk_seconds)
+        chunks = [
+            (audio[start:end], start / SAMPLE_RATE, self.language)
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        results = list(self._get_pool(workers).map(_transcribe_chunk, chunks))
+        return stitch_segments(results, self.language)
+
+    def _get_pool(self, workers):
+        if self._pool is None or self._pool_workers != workers:
+            self.close()
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.model_name, self.DEVICE, threads),
+            )
+            self._pool_workers = workers
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def find_split_points(audio, chunk_seconds=600, search_seconds=30, frame_seconds=0.05):
+    """
+    Sample indices splitting `audio` into chunks of about `chunk_seconds`.
+
+    Each cut is moved to the quietest frame within `search_seconds` of the
+    target so that words are not cut in half.
+    """
+    frame = int(SAMPLE_RATE * frame_seconds)
+    n_frames = len(audio) // frame
+    frames = audio[: n_frames * frame].reshape(n_frames, frame)
+    energy = np.sqrt(np.mean(frames**2, axis=1))
+
+    target = int(chunk_seconds / frame_seconds)
+    search = int(search_seconds / frame_seconds)
+    points = [0]
+    while points[-1] + target + search < n_frames:
+        low = points[-1] + target - search
+        points.append(low + int(np.argmin(energy[low : low + 2 * search])))
+    return [p * frame for p in points] + [len(audio)]
+
+
+def stitch_segments(results, language):
+    """
+    Merge per-chunk segments: offsets are already applied, ids are renumbered.
+    """
+    segments = []
+    for chunk_segments in results:
+        for segment in chunk_segments:
+            segments.append(dict(segment, id=len(segments)))
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language,
+    }
+
+
+_worker_model = None
+
+
+def _init_worker(model_name, device, threads):
+    global _worker_model
+    torch.set_num_threads(threads)
+    _worker_model = whisper.load_model(model_name, device)
+
+
+def _transcribe_chunk(args):
+    audio, offset, language = args
+    result = _worker_model.transcribe(
+        audio, language=language, task="transcribe", verbose=None
+    )
+    return [
+        dict(segment, start=segment["start"] + offset, end=segment["end"] + offset)
+        for segment in result["segments"]
+    ]
+
 
 @contextmanager
 def timer(description="Time taken"):
@@ -48,24 +154,37 @@ def timer(description="Time taken"):
 
 
 if __name__ == "__main__":
-    import sys
-    import time
+    import argparse
     from IOManager import IOManager
 
-    episode_type, episode_number = determine_episode_type_and_number(sys.argv[1])
+    parser = argparse.ArgumentParser()
+    parser.add_argument("episode", help="e.g. 100, 11-1, football-16-1")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="transcribe in N parallel chunks"
+    )
+    parser.add_argument("--chunk-seconds", type=int, default=600)
+    args = parser.parse_args()
+
+    episode_type, episode_number = determine_episode_type_and_number(args.episode)
 
     whisper_api = WhisperAPI("large-v2", "ja", verbose=True)
 
     episodes_dir = os.path.join("..", "episodes", episode_type)
     transcripts_dir = os.path.join("..", "transcripts", episode_type)
 
-    audio_file_path = os.path.join(episodes_dir, f"{episode_number}.mp3.")
-    csv_file_path = os.path.join(transcripts_dir, f"{episode_number}.csv.")
+    audio_file_path = os.path.join(episodes_dir, f"{episode_number}.mp3")
+    csv_file_path = os.path.join(transcripts_dir, f"{episode_number}.csv")
 
     IOManager.exist_or_mkdir([episodes_dir, transcripts_dir])
 
     with timer("Transcription time"):
-        transcription = whisper_api.transcribe(audio_file_path)
+        if args.workers > 1:
+            transcription = whisper_api.transcribe_chunked(
+                audio_file_path, args.workers, args.chunk_seconds
+            )
+        else:
+            transcription = whisper_api.transcribe(audio_file_path)
 
     df = whisper_api.make_df(transcription)
-    IOManager.save_df_to_csv(df, csv_file_path)
+    IOManager.save(df, csv_file_path)
+    whisper_api.close()
@@ -0,0 +1,235 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import traceback
+
+from operate_filename import determine_episode_type_and_number
+from IOManager import IOManager
+
+SPOOL_DIR = os.path.join("..", "transcripts", "queue")
+# a running job whose lease was not renewed for this long is considered dead
+LEASE_SECONDS = 600
+
+
+class TranscriptionService:
+    """
+    Keeps one Whisper model resident and transcribes episodes from a spool folder.
+
+    A job is a `<episode>.job` file in `spool_dir`. Workers claim a job by
+    renaming it to `.running` (atomic, so several services can share a spool)
+    and leave a `.failed` file with the traceback when it cannot be processed.
+
+    The `.running` file records its owner (host and PID) and its mtime is a
+    lease renewed while the job runs, so `recover` only requeues jobs whose
+    owner is gone.
+    """
+
+    def __init__(self, whisper_api, spool_dir=SPOOL_DIR, workers=1):
+        self.whisper_api = whisper_api
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self.done = 0
+        self.audio_seconds = 0.0
+        self.busy_seconds = 0.0
+        self.started = time.time()
+
+    @staticmethod
+    def enqueue(episodes, spool_dir=SPOOL_DIR):
+        IOManager.exist_or_mkdir([spool_dir])
+        for episode in episodes:
+            determine_episode_type_and_number(episode)  # reject invalid ids early
+            with open(os.path.join(spool_dir, f"{episode}.job"), "w") as f:
+                f.write(episode)
+            print(f"queued {episode}")
+
+    def pending(self):
+        jobs = [f for f in os.listdir(self.spool_dir) if f.endswith(".job")]
+        return sorted(
+            jobs, key=lambda f: os.path.getmtime(os.path.join(self.spool_dir, f))
+        )
+
+    def claim(self):
+        for job in self.pending():
+            path = os.path.join(self.spool_dir, job)
+            running = path[: -len(".job")] + ".running"
+            try:
+                # rename keeps the mtime: start the lease before the job is visible
+                os.utime(path)
+                os.rename(path, running)
+            except FileNotFoundError:
+                continue  # taken by another service
+            episode = job[: -len(".job")]
+            with open(running, "w") as f:
+                f.write(f"{episode}\n{socket.gethostname()} {os.getpid()}\n")
+            return episode, running
+        return None, None
+
+    @staticmethod
+    def _pid_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def is_stale(self, running, lease_seconds=LEASE_SECONDS):
+        """
+        Whether the service that claimed `running` is gone.
+
+        A job owned by this host is stale when its PID is dead; a job owned
+        by another host (or with no owner yet) when its lease has expired.
+        """
+        with open(running) as f:
+            lines = f.read().splitlines()
+        if len(lines) > 1:
+            host, _, pid = lines[1].partition(" ")
+            if host == socket.gethostname() and pid.isdigit():
+                return not self._pid_alive(int(pid))
+        return time.time() - os.path.getmtime(running) > lease_seconds
+
+    def recover(self, lease_seconds=LEASE_SECONDS):
+        """
+        Put jobs left `.running` by a crashed service back in the queue.
+        """
+        for name in os.listdir(self.spool_dir):
+            if not name.endswith(".running"):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            try:
+                if not self.is_stale(path, lease_seconds):
+                    continue
+                os.rename(path, path[: -len(".running")] + ".job")
+            except FileNotFoundError:
+                continue  # finished or requeued meanwhile
+            print(f"requeued {name[: -len('.running')]}")
+
+    @staticmethod
+    def _keep_lease(running, stop, lease_seconds=LEASE_SECONDS):
+        while not stop.wait(lease_seconds / 4):
+            try:
+                os.utime(running)
+            except FileNotFoundError:
+                return
+
+    def process(self, episode):
+        import whisper
+
+        episode_type, episode_number = determine_episode_type_and_number(episode)
+        audio_path = os.path.join(
+            "..", "episodes", episode_type, f"{episode_number}.mp3"
+        )
+        transcripts_dir = os.path.join("..", "transcripts", episode_type)
+        IOManager.exist_or_mkdir([transcripts_dir])
+
+        started = time.time()
+        audio = whisper.load_audio(audio_path)
+        duration = len(audio) / whisper.audio.SAMPLE_RATE
+        if self.workers > 1:
+            transcription = self.whisper_api.transcribe_chunked(audio, self.workers)
+        else:
+            transcription = self.whisper_api.transcribe(audio)
+        df = self.whisper_api.make_df(transcription)
+        IOManager.save(df, os.path.join(transcripts_dir, f"{episode_number}.csv"))
+
+        elapsed = time.time() - started
+        self.done += 1
+        self.audio_seconds += duration
+        self.busy_seconds += elapsed
+        return duration, elapsed
+
+    def report(self, episode, duration, elapsed):
+        hours = (time.time() - self.started) / 3600
+        rtf = self.busy_seconds / self.audio_seconds if self.audio_seconds else 0
+        print(
+            f"done {episode}: {duration / 60:.1f} min audio in {elapsed:.0f} s "
+            f"(RTF {elapsed / duration if duration else 0:.2f}) | "
+            f"queue: {len(self.pending())} | "
+            f"done: {self.done} ({self.done / hours if hours else 0:.1f}/h) | "
+            f"overall RTF {rtf:.2f}"
+        )
+
+    def serve(self, poll_seconds=5, once=False):
+        IOManager.exist_or_mkdir([self.spool_dir])
+        print(f"watching {self.spool_dir}, queue: {len(self.pending())}")
+        while True:
+            episode, running = self.claim()
+            if episode is None:
+                if once:
+                    return
+                time.sleep(poll_seconds)
+                continue
+            stop = threading.Event()
+            lease = threading.Thread(
+                target=self._keep_lease, args=(running, stop), daemon=True
+            )
+            lease.start()
+            try:
+                duration, elapsed = self.process(episode)
+            except Exception:
+                failed = running[: -len(".running")] + ".failed"
+                with open(failed, "w") as f:
+                    f.write(traceback.format_exc())
+                os.remove(running)
+                print(f"failed {episode}, see {failed}")
+                continue
+            finally:
+                stop.set()
+                lease.join()
+            os.remove(running)
+            self.report(episode, duration, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident Whisper transcription")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = subparsers.add_parser("enqueue", help="add episodes to the queue")
+    enqueue.add_argument("episodes", nargs="+", help="e.g. 100 football-16-1")
+
+    serve = subparsers.add_parser("serve", help="transcribe queued episodes")
+    serve.add_argument("--model", default="large-v2")
+    serve.add_argument("--language", default="ja")
+    serve.add_argument(
+        "--workers", type=int, default=1, help="chunked mode if > 1"
+    )
+    serve.add_argument(
+        "--poll", type=float, default=5, help="seconds between scans"
+    )
+    serve.add_argument(
+        "--once", action="store_true", help="exit when the queue is empty"
+    )
+    serve.add_argument(
+        "--recover",
+        action="store_true",
+        help="requeue running jobs whose service is gone",
+    )
+
+    for subparser in [enqueue, serve]:
+        subparser.add_argument("--spool", default=SPOOL_DIR)
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        TranscriptionService.enqueue(args.episodes, args.spool)
+        return
+
+    from transcribe import WhisperAPI
+
+    whisper_api = WhisperAPI(args.model, args.language, verbose=False)
+    service = TranscriptionService(whisper_api, args.spool, args.workers)
+    if args.recover:
+        service.recover()
+    try:
+        service.serve(args.poll, args.once)
+    except KeyboardInterrupt:
+        sys.exit(0)
+    finally:
+        whisper_api.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import sys
+import argparse
+
+from operate_filename import determine_episode_type_and_number
+from TranscriptStore import TranscriptStore
+
+
+def format_segment(segment):
+    minutes, seconds = divmod(segment["start"], 60)
+    return f"{int(minutes):>3}:{seconds:05.2f}  {segment['text']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Packed transcript store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sync = subparsers.add_parser("sync", help="convert new or changed CSVs")
+    sync.add_argument("--zstd", action="store_true", help="compress packed files")
+
+    at = subparsers.add_parser("at", help="what was said at a given time")
+    at.add_argument("episode", help="e.g. 100, football-16-1")
+    at.add_argument("seconds", type=float)
+
+    range_ = subparsers.add_parser("range", help="segments between two times")
+    range_.add_argument("episode")
+    range_.add_argument("start", type=float)
+    range_.add_argument("end", type=float)
+    args = parser.parse_args()
+
+    store = TranscriptStore()
+    if args.command == "sync":
+        converted = store.sync(compress=args.zstd)
+        for path in converted:
+            print(f"packed {path}")
+        print(f"{len(converted)} transcripts converted.")
+        return
+
+    transcript = store.open(*determine_episode_type_and_number(args.episode))
+    if args.command == "at":
+        segment = transcript.at(args.seconds)
+        if segment is None:
+            print("(silence)")
+            sys.exit(1)
+        print(format_segment(segment))
+    else:
+        for segment in transcript.slice(args.start, args.end):
+            print(format_segment(segment))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import time
+import argparse
+from urllib.parse import urlsplit
+
+from EpisodeManager import EpisodeManager
+from operate_filename import episode_id
+
+TEMPLATE_PATH = "json/template.json"
+# keys every stage reads; the other template keys are only type-checked
+REQUIRED = ["Number", "Title", "Starr", "Topics", "References"]
+# keys older episodes carry that are not in the template
+EXTRA_KEYS = {"Effects": list, "Chapter": list, "RecDate": str, "PubDate": str}
+GENRES = ["con", "sports", "solo", "weshow"]
+GENRE_ALIASES = {"concast": "con", "sport": "sports"}
+PHOTO_DIR = "../photos/starrings"
+
+
+def compile_schema(template: dict) -> dict:
+    """
+    {key: (allowed types, required)} from the template: the type of each
+    template value, with `null` also allowing a list (e.g. ROI).
+    """
+    schema = {}
+    for key, value in template.items():
+        types = (type(None), list) if value is None else (type(value),)
+        schema[key] = (types, key in REQUIRED)
+    for key, value_type in EXTRA_KEYS.items():
+        schema.setdefault(key, ((value_type,), False))
+    return schema
+
+
+def list_stems(folder: str, extension: str) -> set:
+    """
+    Stems of the `extension` files in `folder`, read with one directory scan.
+    """
+    if not os.path.isdir(folder):
+        return set()
+    names = os.listdir(folder)
+    return {name[: -len(extension)] for name in names if name.endswith(extension)}
+
+
+class CatalogValidator:
+    """
+    Lints `json/<type>/*.json` against the compiled template schema and
+    cross-checks every episode against its markers, SNS post and photos.
+
+    Directory listings are taken once up front, so each episode check is a
+    JSON parse plus set lookups. Files are checked serially: the whole
+    catalog takes a few tens of milliseconds, and pure-Python parsing would
+    not run in parallel on threads anyway.
+    """
+
+    def __init__(self, json_dir="json", template_path=TEMPLATE_PATH):
+        self.json_dir = json_dir
+        with open(template_path, "r", encoding="utf-8") as f:
+            self.schema = compile_schema(json.load(f))
+        self.photos = list_stems(PHOTO_DIR, ".jpg")
+        self.has_photos = os.path.isdir(PHOTO_DIR)
+        self.markers, self.sns = {}, {}
+        self.checked = 0
+
+    def episodes(self):
+        """
+        (type, number, path) of every episode JSON, in directory order.
+
+        The markers and SNS folders of each type are listed on the way.
+        """
+        for episode_type in sorted(os.listdir(self.json_dir)):
+            type_dir = os.path.join(self.json_dir, episode_type)
+            if not os.path.isdir(type_dir):
+                continue
+            self.markers[episode_type] = list_stems(f"markers/{episode_type}", ".csv")
+            self.sns[episode_type] = list_stems(f"sns/{episode_type}", ".txt")
+            for number in sorted(list_stems(type_dir, ".json")):
+                yield episode_type, number, os.path.join(type_dir, f"{number}.json")
+
+    def check_file(self, episode_type, number, path) -> list:
+        issues = []
+
+        def report(level, code, message):
+            issues.append(
+                {"file": path, "level": level, "code": code, "message": message}
+            )
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (ValueError, UnicodeDecodeError) as e:
+            report("error", "invalid-json", str(e))
+            return issues
+        if not isinstance(data, dict):
+            report("error", "invalid-json", "top level is not an object")
+            return issues
+
+        for key, (types, required) in self.schema.items():
+            if key not in data:
+                if required:
+                    report("error", "missing-key", f"{key} is missing")
+            elif not isinstance(data[key], types):
+                expected = " or ".join(t.__name__ for t in types)
+                report("error", "type", f"{key} should be {expected}")
+        for key in data.keys() - self.schema.keys():
+            report("warning", "unknown-key", f"unknown key {key}")
+        if any(issue["level"] == "error" for issue in issues):
+            return issues
+
+        self._check_fields(data, episode_type, number, report)
+        self._check_cross_references(data, episode_type, number, report)
+        return issues
+
+    def _check_fields(self, data, episode_type, number, report):
+        if data["Number"] not in (number, episode_id(episode_type, number)):
+            message = f"Number {data['Number']} does not match {number}"
+            report("error", "number", message)
+
+        genre = data.get("Genre")
+        if genre:
+            canonical = GENRE_ALIASES.get(genre.lower(), genre.lower())
+            if canonical not in GENRES:
+                report("error", "genre", f"unknown Genre {genre}")
+            elif canonical != genre:
+                report("warning", "genre", f"Genre {genre} should be {canonical}")
+
+        if not data["Topics"]:
+            report("error", "topics", "Topics is empty")
+        elif not all(isinstance(t, str) and t.strip() for t in data["Topics"]):
+            report("error", "topics", "Topics has an empty or non-text item")
+
+        seen = set()
+        for title, url in data["References"].items():
+            parts = urlsplit(url) if isinstance(url, str) else None
+            if not parts or parts.scheme not in ("http", "https") or not parts.netloc:
+                report("error", "reference-url", f"malformed URL {url!r} ({title})")
+            elif url in seen:
+                report("warning", "reference-url", f"duplicate URL {url}")
+            if not title.strip():
+                report("warning", "reference-title", f"no title for {url}")
+            seen.add(url)
+
+        roi = data.get("ROI")
+        if roi is not None and not (
+            len(roi) == 3 and all(isinstance(v, int) and v >= 0 for v in roi)
+        ):
+            report("error", "roi", f"ROI should be [x, y, size], got {roi}")
+
+    def _check_cross_references(self, data, episode_type, number, report):
+        if self.has_photos:
+            for starr in data["Starr"]:
+                if starr not in self.photos:
+                    report("warning", "photo", f"no photo for {starr} in {PHOTO_DIR}")
+
+        if number not in self.markers.get(episode_type, ()):
+            report("warning", "markers", f"no markers/{episode_type}/{number}.csv")
+
+        sns_path = f"sns/{episode_type}/{number}.txt"
+        if number in self.sns.get(episode_type, ()):
+            with open(sns_path, "r", encoding="utf-8") as f:
+                first_line = f.readline().rstrip("\n")
+            if first_line != EpisodeManager.format_title(data):
+                report("warning", "sns", f"{sns_path} title differs from the JSON")
+        elif data["Topics"]:
+            report("warning", "sns", f"no {sns_path}")
+
+    def orphans(self) -> list:
+        """
+        Marker and SNS files without an episode JSON.
+        """
+        issues = []
+        for episode_type, markers in self.markers.items():
+            numbers = list_stems(os.path.join(self.json_dir, episode_type), ".json")
+            sns = self.sns[episode_type]
+            for folder, found, extension in (
+                ("markers", markers, ".csv"),
+                ("sns", sns, ".txt"),
+            ):
+                for number in sorted(found - numbers):
+                    issues.append(
+                        {
+                            "file": f"{folder}/{episode_type}/{number}{extension}",
+                            "level": "warning",
+                            "code": "orphan",
+                            "message": f"no json/{episode_type}/{number}.json",
+                        }
+                    )
+        return issues
+
+    def validate(self, ids=None) -> list:
+        """
+        Check the episodes (all, or only `ids`) and return their issues.
+        """
+        episodes = [
+            episode
+            for episode in self.episodes()
+            if ids is None or episode_id(episode[0], episode[1]) in ids
+        ]
+        issues = [issue for episode in episodes for issue in self.check_file(*episode)]
+        if ids is None:
+            issues.extend(self.orphans())
+        self.checked = len(episodes)
+        return issues
+
+
+def summarize(issues: list, checked: int, seconds: float) -> dict:
+    return {
+        "files": checked,
+        "errors": sum(issue["level"] == "error" for issue in issues),
+        "warnings": sum(issue["level"] == "warning" for issue in issues),
+        "seconds": round(seconds, 3),
+        "issues": issues,
+    }
+
+
+def main():
+    from batch import expand_specs
+
+    parser = argparse.ArgumentParser(
+        description="Lint the episode JSON catalog against json/template.json."
+    )
+    parser.add_argument("specs", nargs="*", help="default: every episode")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument(
+        "--errors-only", action="store_true", help="leave warnings out of the report"
+    )
+    parser.add_argument(
+        "--strict", action="store_true", help="exit non-zero on warnings too"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    validator = CatalogValidator()
+    ids = set(expand_specs(args.specs)) if args.specs else None
+    issues = validator.validate(ids)
+    if args.errors_only:
+        issues = [issue for issue in issues if issue["level"] == "error"]
+    report = summarize(issues, validator.checked, time.perf_counter() - start)
+
+    if args.json:
+        print(json.dumps(report, indent=4, ensure_ascii=False))
+    else:
+        for issue in issues:
+            file, level, code = issue["file"], issue["level"], issue["code"]
+            print(f"{file}: {level} [{code}] {issue['message']}")
+        print(
+            f"{report['files']} files: {report['errors']} errors, "
+            f"{report['warnings']} warnings ({report['seconds']:.2f}s)"
+        )
+    if report["errors"] or (args.strict and report["warnings"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The pipeline modules import each other by file name, as when run from py/.
+# py/ is a plain directory (no __init__.py), so `python -m pytest` run from
+# postproduction/ does not shadow pytest's own `py` module with it.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "py"))
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from BuildManifest import BuildManifest
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with open(path, mode) as f:
+        f.write(content)
+
+
+@pytest.fixture
+def episode(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write("markers/concast/100.csv", "Name\tStart\tDuration\n")
+    return BuildManifest("concast", "100", root=str(tmp_path / "root"))
+
+
+def create_json(episode_type, episode_number):
+    write(f"json/{episode_type}/{episode_number}.json", '{"Number": "100"}')
+
+
+def test_never_built_stage_runs_and_is_then_skipped(episode):
+    assert episode.explain("create_episode_data") == ["never built"]
+    assert episode.run("create_episode_data", create_json)
+    assert episode.explain("create_episode_data") == []
+    assert not episode.run("create_episode_data", create_json)
+
+
+def test_changed_input_and_missing_output_invalidate(episode):
+    episode.run("create_episode_data", create_json)
+
+    write("markers/concast/100.csv", "Name\tStart\tDuration\nA\t0:01.000\t0:00.000\n")
+    assert episode.explain("create_episode_data") == ["input markers changed"]
+    episode.run("create_episode_data", create_json)
+
+    os.remove("json/concast/100.json")
+    assert episode.explain("create_episode_data") == [
+        "input json changed",
+        "output json missing",
+    ]
+
+
+def test_force_runs_an_up_to_date_stage(episode):
+    episode.run("create_episode_data", create_json)
+    assert episode.run("create_episode_data", create_json, force=True)
+
+
+def test_manifest_is_persisted(episode, tmp_path):
+    episode.run("create_episode_data", create_json)
+    reloaded = BuildManifest("concast", "100", root=str(tmp_path / "root"))
+    assert reloaded.explain("create_episode_data") == []
+
+
+def test_stage_rewriting_its_input_is_rebuilt_next_time(episode):
+    create_json("concast", "100")
+
+    def rewrite_json(episode_type, episode_number):
+        write(f"json/{episode_type}/{episode_number}.json", '{"Number": "100", "ROI": [0, 0, 1]}')
+        write(f"sns/{episode_type}/{episode_number}.txt", "post")
+
+    episode.run("post", rewrite_json)
+    assert episode.explain("post") == ["input json changed"]
+
+
+def test_stage_rewriting_its_own_output_input_stays_up_to_date(episode, tmp_path):
+    mp3 = tmp_path / "root" / "episodes" / "concast" / "100.mp3"
+    write(str(mp3), b"ID3\x04\x00\x00\x00\x00\x00\x00" + b"audio")
+
+    def tag(episode_type, episode_number):
+        # a 1-byte tag body; the audio payload is not part of the hash
+        write(str(mp3), b"ID3\x04\x00\x00\x00\x00\x00\x01T" + b"audio")
+
+    episode.run("tag_episode", tag)
+    assert episode.explain("tag_episode") == []
+
+
+def test_hand_edited_json_reruns_create_episode_data(episode):
+    episode.run("create_episode_data", create_json)
+    assert episode.explain("create_episode_data") == []
+
+    write("json/concast/100.json", '{"Number": "100", "Title": "edited"}')
+    assert episode.explain("create_episode_data") == ["input json changed"]
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from EpisodeCatalog import EpisodeCatalog  # noqa: E402
+from EpisodeRanker import EpisodeRanker  # noqa: E402
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(EpisodeCatalog, "_instances", {})
+    episodes = [("concast", str(n), ["Gota", f"guest{n % 4}"]) for n in range(30)]
+    episodes += [("hwn", str(n), ["Gota", "hwn guest"]) for n in range(1, 4)]
+    for episode_type, number, starrs in episodes:
+        folder = tmp_path / "json" / episode_type
+        folder.mkdir(parents=True, exist_ok=True)
+        data = {
+            "Number": number if episode_type == "concast" else f"{episode_type}-{number}",
+            "Title": f"{episode_type} episode {number}",
+            "Starr": {name: name for name in starrs},
+            "Topics": [f"topic {number}"],
+        }
+        (folder / f"{number}.json").write_text(json.dumps(data), encoding="utf-8")
+    return str(tmp_path / "cache" / "related.npz")
+
+
+def test_related_after_reloading_the_table(catalog):
+    first = EpisodeRanker.load(catalog).related("hwn", "1", 5)
+
+    reloaded = EpisodeRanker.load(catalog)
+    assert reloaded.guests.shape == (33, len(reloaded.guest_names))
+    # hwn has fewer episodes than K, so the whole row is ranked again
+    related = reloaded.related("hwn", "1", 5)
+    assert related == first
+    assert [entry["id"] for entry in related] == ["hwn-2", "hwn-3"]
+
+
+def test_related_keeps_to_the_episode_type(catalog):
+    ranker = EpisodeRanker.load(catalog)
+    related = ranker.related("concast", "1", 10)
+    assert len(related) == 10
+    assert all(not entry["id"].startswith("hwn") for entry in related)
+    mixed = ranker.related("hwn", "1", 5, same_type=False)
+    assert any(not entry["id"].startswith("hwn") for entry in mixed)
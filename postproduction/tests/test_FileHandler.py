@@ -0,0 +1,81 @@
+import os
+import stat
+
+import pytest
+
+from FileHandler import atomic_open
+from IOManager import IOManager
+
+
+def test_atomic_open_replaces_the_file(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("old")
+    with atomic_open(str(path), encoding="utf-8") as f:
+        f.write("new")
+        assert path.read_text() == "old"
+    assert path.read_text() == "new"
+    assert os.listdir(tmp_path) == ["a.txt"]
+
+
+def test_atomic_open_leaves_the_target_untouched_on_error(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("old")
+    with pytest.raises(RuntimeError):
+        with atomic_open(str(path), encoding="utf-8") as f:
+            f.write("partial")
+            raise RuntimeError("boom")
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["a.txt"]
+
+
+def test_atomic_open_file_modes(tmp_path):
+    umask = os.umask(0o027)
+    try:
+        new = tmp_path / "new.bin"
+        with atomic_open(str(new), "wb") as f:
+            f.write(b"\x00")
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(new).st_mode) == 0o640
+
+    existing = tmp_path / "existing.bin"
+    existing.write_bytes(b"")
+    os.chmod(existing, 0o600)
+    with atomic_open(str(existing), "wb") as f:
+        f.write(b"\x01")
+    assert stat.S_IMODE(os.stat(existing).st_mode) == 0o600
+
+
+def test_write_if_changed(tmp_path):
+    path = str(tmp_path / "sub" / "post.txt")
+    assert IOManager.write_if_changed("a", path, dry_run=True) == "created"
+    assert not os.path.exists(path)
+    assert IOManager.write_if_changed("a", path) == "created"
+    mtime = os.stat(path).st_mtime_ns
+    assert IOManager.write_if_changed("a", path) == "unchanged"
+    assert os.stat(path).st_mtime_ns == mtime
+    assert IOManager.write_if_changed("b", path) == "updated"
+    assert IOManager.read(path) == "b"
+
+
+def test_write_if_changed_compares_the_written_bytes(tmp_path):
+    pd = pytest.importorskip("pandas")
+    path = str(tmp_path / "table.csv")
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    assert IOManager.write_if_changed(df, path) == "created"
+    assert IOManager.write_if_changed(df.copy(), path) == "unchanged"
+    assert IOManager.write_if_changed(df.astype({"a": float}), path) == "updated"
+    assert IOManager.write_if_changed({"a": 1}, str(tmp_path / "a.json")) == "created"
+    assert IOManager.write_if_changed({"a": 1}, str(tmp_path / "a.json")) == "unchanged"
+    with open(tmp_path / "a.json", encoding="utf-8") as f:
+        assert f.read() == '{\n    "a": 1\n}'
+
+
+def test_readers_match_writers(tmp_path):
+    text, binary = str(tmp_path / "a.txt"), str(tmp_path / "a.html")
+    with IOManager.open_writer(text) as f:
+        f.write("one\ntwo\n")
+    with IOManager.open_writer(binary) as f:
+        f.write(b"<p>")
+    assert list(IOManager.open_reader(text)) == ["one\n", "two\n"]
+    assert b"".join(IOManager.open_reader(binary)) == b"<p>"
@@ -0,0 +1,75 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from MarkerStore import MarkerStore  # noqa: E402
+
+HEADER = "﻿Name\tStart\tDuration\n"
+
+
+def test_parse_timecodes():
+    values = ["1:06:27.520", "54:50.000", "0:01.5", "0:00"]
+    assert MarkerStore.parse_timecodes(values).tolist() == [
+        3987520,
+        3290000,
+        1500,
+        0,
+    ]
+
+
+@pytest.mark.parametrize("value", ["bad", "1:2:3:4", "", "0:01.1234"])
+def test_parse_timecodes_rejects_invalid(value):
+    with pytest.raises(ValueError, match="Invalid time format"):
+        MarkerStore.parse_timecodes(["0:01.000", value])
+
+
+@pytest.fixture
+def markers_dir(tmp_path):
+    folder = tmp_path / "markers" / "concast"
+    folder.mkdir(parents=True)
+    (folder / "1.csv").write_text(
+        HEADER + "B\t0:10.000\t0:00.000\nA\t0:02.500\t0:01.000\n", encoding="utf-8"
+    )
+    (folder / "2.csv").write_text(HEADER + "C\tbad\t0:00.000\n", encoding="utf-8")
+    (folder / "3.csv").write_text(HEADER, encoding="utf-8")
+    (folder / "4.csv").write_text("", encoding="utf-8")
+    (folder / "5.csv").write_text(HEADER + "D\t0:01.000\t9:99:99:9\n", encoding="utf-8")
+    return tmp_path
+
+
+def test_broken_file_only_breaks_its_own_episode(markers_dir):
+    store = MarkerStore.load(
+        str(markers_dir / "markers"), str(markers_dir / "markers.pkl")
+    )
+    markers = store.markers("concast", "1")
+    assert markers["name"].tolist() == ["B", "A"]
+    assert markers["start_ms"].tolist() == [10000, 2500]
+    assert markers["duration_ms"].tolist() == [0, 1000]
+    assert len(store.markers("concast", "3")) == 0
+    with pytest.raises(ValueError, match="Invalid time format: bad"):
+        store.markers("concast", "2")
+    with pytest.raises(ValueError, match="empty file"):
+        store.markers("concast", "4")
+    with pytest.raises(ValueError, match="Invalid time format: 9:99:99:9"):
+        store.markers("concast", "5")
+    with pytest.raises(FileNotFoundError):
+        store.markers("concast", "6")
+
+
+def test_errors_survive_a_reload_and_clear_when_fixed(markers_dir):
+    table = str(markers_dir / "markers.pkl")
+    folder = str(markers_dir / "markers")
+    store = MarkerStore.load(folder, table)
+
+    reloaded = MarkerStore(folder, table)
+    reloaded._read_table()
+    assert not reloaded.refresh()
+    assert list(reloaded.errors) == list(store.errors)
+
+    (markers_dir / "markers" / "concast" / "2.csv").write_text(
+        HEADER + "C\t0:03.000\t0:00.000\n", encoding="utf-8"
+    )
+    assert reloaded.refresh()
+    assert not any(path.endswith("2.csv") for path in reloaded.errors)
+    assert len(reloaded.errors) == 2
+    assert reloaded.markers("concast", "2")["start_ms"].tolist() == [3000]
@@ -0,0 +1,127 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from check_links import LinkChecker
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    /no-head: 405 on HEAD, 200 on GET.
+    /etag: 200 with an ETag, 304 when it is sent back.
+    /busy: 429 with Retry-After once, then 200.
+    /always-busy: always 429.
+    /slow/...: 200 after a short delay, counting concurrent requests.
+    """
+
+    def do_HEAD(self):
+        self.respond()
+
+    def do_GET(self):
+        self.respond()
+
+    def respond(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            status, headers = self.route()
+        finally:
+            with server.lock:
+                server.active -= 1
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def route(self):
+        if self.path == "/no-head":
+            return (405 if self.command == "HEAD" else 200), {}
+        if self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.server.not_modified += 1
+                return 304, {}
+            return 200, {"ETag": '"v1"'}
+        if self.path == "/busy":
+            if sum(path == "/busy" for _, path in self.server.requests) == 1:
+                return 429, {"Retry-After": "0"}
+            return 200, {}
+        if self.path == "/always-busy":
+            return 429, {"Retry-After": "0"}
+        if self.path.startswith("/slow/"):
+            time.sleep(0.1)
+            return 200, {}
+        return 404, {}
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.lock = threading.Lock()
+    server.requests, server.active, server.max_active = [], 0, 0
+    server.not_modified = 0
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def checker(tmp_path, **kwargs):
+    return LinkChecker(cache_path=str(tmp_path / "cache" / "links.json"), **kwargs)
+
+
+def test_get_when_head_is_refused(server, tmp_path):
+    result = checker(tmp_path).check(url(server, "/no-head"))
+    assert result["ok"] and result["status"] == 200
+    assert server.requests == [("HEAD", "/no-head"), ("GET", "/no-head")]
+
+
+def test_expired_entry_is_revalidated_with_its_etag(server, tmp_path):
+    link = url(server, "/etag")
+    checker(tmp_path).check_all([link])
+    assert server.not_modified == 0
+
+    result = checker(tmp_path, ttl=0).check(link)
+    assert result["ok"] and result["status"] == 200 and result["etag"] == '"v1"'
+    assert server.requests == [("HEAD", "/etag")] * 2
+    assert server.not_modified == 1
+    # a fresh entry is not requested at all
+    checker(tmp_path).check(link)
+    assert len(server.requests) == 2
+
+
+def test_rate_limited_host_is_retried_after_retry_after(server, tmp_path):
+    links = checker(tmp_path)
+    assert links.check(url(server, "/busy"))["status"] == 200
+    assert server.requests == [("HEAD", "/busy")] * 2
+
+    results = links.check_all([url(server, "/always-busy")])
+    result = results[url(server, "/always-busy")]
+    assert result["rate_limited"] and not result["ok"]
+    # the first try and RATE_LIMIT_RETRIES retries
+    assert server.requests[2:] == [("HEAD", "/always-busy")] * 3
+    assert url(server, "/always-busy") not in links.cache
+
+
+def test_requests_to_one_host_are_limited(server, tmp_path):
+    links = checker(tmp_path, workers=8, per_host=2)
+    results = links.check_all([url(server, f"/slow/{i}") for i in range(8)])
+    assert all(result["ok"] for result in results.values())
+    assert server.max_active == 2
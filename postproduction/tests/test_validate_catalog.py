@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from validate_catalog import CatalogValidator
+
+TEMPLATE = {
+    "Number": "",
+    "Genre": "",
+    "GenreNumber": "",
+    "Title": "",
+    "Starr": {},
+    "Topics": [],
+    "References": {},
+    "Memo": "",
+    "ROI": None,
+    "Edited": False,
+}
+
+
+def episode(**changes):
+    data = {
+        "Number": "100",
+        "Genre": "con",
+        "Title": "title",
+        "Starr": {"Gota": "Gota Shirato"},
+        "Topics": ["topic"],
+        "References": {"page": "https://example.com/"},
+    }
+    data.update(changes)
+    return {key: value for key, value in data.items() if value is not ...}
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "json" / "concast").mkdir(parents=True)
+    (tmp_path / "json" / "template.json").write_text(json.dumps(TEMPLATE))
+
+    def check(data, number="100"):
+        path = tmp_path / "json" / "concast" / f"{number}.json"
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        issues = CatalogValidator().validate({number})
+        return {(issue["level"], issue["code"]) for issue in issues}
+
+    return check
+
+
+def test_valid_episode_has_no_errors(catalog):
+    assert not {code for level, code in catalog(episode()) if level == "error"}
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (episode(Title=...), ("error", "missing-key")),
+        (episode(Topics="topic"), ("error", "type")),
+        (episode(Extra=1), ("warning", "unknown-key")),
+        (episode(Number="101"), ("error", "number")),
+        (episode(Genre="concast"), ("warning", "genre")),
+        (episode(Genre="drama"), ("error", "genre")),
+        (episode(Topics=[]), ("error", "topics")),
+        (episode(Topics=[" "]), ("error", "topics")),
+        (episode(References={"page": "example.com"}), ("error", "reference-url")),
+        (episode(References={" ": "https://a/"}), ("warning", "reference-title")),
+        (episode(ROI=[1, 2]), ("error", "roi")),
+        (episode(ROI=[-1, 0, 10]), ("error", "roi")),
+    ],
+)
+def test_rules(catalog, data, expected):
+    assert expected in catalog(data)
+
+
+def test_stored_roi_is_accepted(catalog):
+    assert ("error", "roi") not in catalog(episode(ROI=[1, 2, 3]))
+
+
+def test_invalid_json(catalog, tmp_path):
+    (tmp_path / "json" / "concast" / "100.json").write_text("{")
+    issues = CatalogValidator().validate({"100"})
+    assert [issue["code"] for issue in issues] == ["invalid-json"]
+
+
+def test_orphan_markers_are_reported_on_full_runs(catalog, tmp_path):
+    catalog(episode())
+    (tmp_path / "markers" / "concast").mkdir(parents=True)
+    (tmp_path / "markers" / "concast" / "7.csv").write_text("")
+    issues = CatalogValidator().validate()
+    assert {
+        issue["file"] for issue in issues if issue["code"] == "orphan"
+    } == {"markers/concast/7.csv"}